@@ -233,6 +233,10 @@ EXAMPLES:
 
 STORAGE:
     Credentials are stored in: $CRED_FILE
+
+BULK:
+    Each call rewrites the whole file. To add many credentials at once, or to
+    back them up, use: credential-manager-mcp import FILE / export FILE
 EOF
 }
 
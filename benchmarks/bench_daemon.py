@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Daemon mode benchmark: memory and latency of N concurrent MCP stdio sessions
+
+Starts N sessions the way MCP clients do (one credential-manager-mcp
+process per session, talking JSON-RPC over stdio), once standalone (every
+process loads its own copy of the store) and once in daemon mode (every
+process is a thin proxy to one shared daemon). Each session then makes a
+mix of list_credentials, get_credential_details and update_credential
+calls concurrently with the others. Reports the total memory of all server
+processes (RSS, and PSS, which splits shared pages between the processes
+sharing them) and the median and p99 latency of a single call.
+
+Usage:
+    uv run python benchmarks/bench_daemon.py
+    uv run python benchmarks/bench_daemon.py --sessions 50 --calls 40 --size 10000 --json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+
+from fastmcp import Client
+from fastmcp.client.transports import StdioTransport
+
+from common import write_store
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+ENTRY_POINT = ["-c", "from credential_manager_mcp import main; main()"]
+
+
+def descendants(pid: int) -> list:
+    """Return the pids of every process below pid"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; the ppid follows its closing paren
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def memory_kb(pid: int) -> dict:
+    """Return the RSS and PSS of a process in KiB"""
+    usage = {"rss": 0, "pss": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in ("Rss", "Pss"):
+                    usage[name.lower()] = int(value.split()[0])
+    except OSError:
+        pass
+    return usage
+
+
+async def run_sessions(home: Path, daemon: bool, sessions: int, calls: int, write_ratio: float) -> dict:
+    """Open sessions clients against the store under home and have each make calls calls"""
+    env = {**os.environ, "HOME": str(home), "PYTHONPATH": str(PROJECT_ROOT),
+           "CREDENTIAL_MANAGER_READ_ONLY": "false", "CREDENTIAL_MANAGER_WATCH": "off",
+           "CREDENTIAL_MANAGER_DAEMON": "true" if daemon else "false",
+           "CREDENTIAL_MANAGER_DAEMON_SOCKET": str(home / "daemon.sock"),
+           "CREDENTIAL_MANAGER_DAEMON_IDLE_TIMEOUT": "1", "FASTMCP_LOG_LEVEL": "WARNING"}
+    with open(home / ".credential-manager-mcp" / "credentials.json") as f:
+        ids = list(json.load(f))
+    latencies = []
+
+    async def session(client: Client, rng: random.Random):
+        for i in range(calls):
+            cred_id = rng.choice(ids)
+            if rng.random() < write_ratio:
+                tool, arguments = "update_credential", {"credential_id": cred_id, "access_token": f"token-{i}"}
+            elif i % 2:
+                tool, arguments = "get_credential_details", {"credential_id": cred_id}
+            else:
+                tool, arguments = "list_credentials", {"limit": 20}
+            start = time.perf_counter()
+            await client.call_tool(tool, arguments)
+            latencies.append(time.perf_counter() - start)
+
+    async with AsyncExitStack() as stack:
+        start = time.perf_counter()
+        clients = await asyncio.gather(*(
+            stack.enter_async_context(Client(StdioTransport(sys.executable, ENTRY_POINT, env=env, keep_alive=False)))
+            for _ in range(sessions)
+        ))
+        startup = time.perf_counter() - start
+        start = time.perf_counter()
+        await asyncio.gather(*(session(client, random.Random(i)) for i, client in enumerate(clients)))
+        elapsed = time.perf_counter() - start
+        # Measured while every session is still open
+        processes = descendants(os.getpid())
+        usage = [memory_kb(pid) for pid in processes]
+
+    latencies.sort()
+    return {
+        "processes": len(processes),
+        "rss_mb": sum(u["rss"] for u in usage) / 1024,
+        "pss_mb": sum(u["pss"] for u in usage) / 1024,
+        "startup_s": startup,
+        "calls_per_second": len(latencies) / elapsed,
+        "median_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=20, help="calls per session")
+    parser.add_argument("--size", type=int, default=1000, help="credentials in the store")
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="fraction of calls that are updates")
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        template = Path(tmp) / "template"
+        write_store(template / ".credential-manager-mcp" / "credentials.json", args.size)
+        for label, daemon in (("standalone", False), ("daemon", True)):
+            home = Path(tmp) / label
+            shutil.copytree(template, home)
+            results[label] = asyncio.run(run_sessions(home, daemon, args.sessions, args.calls, args.write_ratio))
+
+    if args.json:
+        print(json.dumps({"sessions": args.sessions, "size": args.size, "results": results}, indent=2))
+        return
+
+    print(f"sessions={args.sessions} calls/session={args.calls} size={args.size} write_ratio={args.write_ratio}")
+    print(f"{'mode':>11} {'procs':>6} {'RSS MB':>8} {'PSS MB':>8} {'startup s':>10} "
+          f"{'calls/s':>8} {'median ms':>10} {'p99 ms':>8}")
+    for label, r in results.items():
+        print(f"{label:>11} {r['processes']:>6} {r['rss_mb']:>8.0f} {r['pss_mb']:>8.0f} {r['startup_s']:>10.2f} "
+              f"{r['calls_per_second']:>8.0f} {r['median_ms']:>10.2f} {r['p99_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
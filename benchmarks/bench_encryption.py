@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Encryption-at-rest overhead benchmark: plaintext vs encrypted tokens
+
+For each store size, writes the same synthetic store twice, once with
+plaintext tokens and once with every token encrypted, and times a cold load,
+list_credentials and get_credential (which decrypts one token) on each. Also
+reports the one-off key derivation cost, which is paid once per process.
+
+Usage:
+    uv run python benchmarks/bench_encryption.py
+    uv run python benchmarks/bench_encryption.py --sizes 1000 10000 100000 --json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import synthetic_credentials  # noqa: E402
+from credential_manager_mcp.encryption import TokenCipher, derive_key  # noqa: E402
+from credential_manager_mcp.server import CredentialStore  # noqa: E402
+
+SECRET = b"benchmark-key"
+
+
+def median_ms(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def measure(path: Path, cipher, repeat: int) -> dict:
+    """Time cold load, list and get on the store at path"""
+    store = CredentialStore(str(path), cipher=cipher)
+    ids = list(store.credentials)
+    return {
+        "load_cold": median_ms(lambda: store.load_credentials(force=True), repeat),
+        "list": median_ms(store.list_credentials, repeat),
+        "get": median_ms(lambda: store.get_credential(ids[len(ids) // 2]), repeat * 20),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    args = parser.parse_args()
+
+    derive_key.cache_clear()
+    start = time.perf_counter()
+    cipher = TokenCipher(SECRET)
+    derive_ms = (time.perf_counter() - start) * 1000
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            data = synthetic_credentials(size)
+            plain_path = Path(tmp) / f"plain-{size}.json"
+            plain_path.write_text(json.dumps(data, indent=2))
+            encrypted_path = Path(tmp) / f"encrypted-{size}.json"
+            encrypted_path.write_text(json.dumps({
+                cred_id: {**cred, "access_token": cipher.encrypt(cred_id, cred["access_token"])}
+                for cred_id, cred in data.items()
+            }, indent=2))
+            results.append({
+                "size": size,
+                "plaintext": measure(plain_path, None, args.repeat),
+                "encrypted": measure(encrypted_path, cipher, args.repeat),
+            })
+
+    if args.json:
+        print(json.dumps({"key_derivation_ms": derive_ms, "results": results}, indent=2))
+        return
+
+    print(f"key derivation (once per process): {derive_ms:.1f} ms")
+    print(f"{'size':>8} {'op':>10} {'plaintext ms':>13} {'encrypted ms':>13} {'overhead':>9}")
+    for row in results:
+        for op in ("load_cold", "list", "get"):
+            plain, encrypted = row["plaintext"][op], row["encrypted"][op]
+            print(f"{row['size']:>8} {op:>10} {plain:>13.3f} {encrypted:>13.3f} {encrypted / plain:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Loader benchmark: json.load() vs the streaming loader
+
+For each store size, writes a synthetic credentials.json and loads it into a
+dict of CredentialRecord objects twice: with json.load() followed by
+CredentialRecord.from_dict() (the previous read path, which holds the whole
+parsed document and the records at the same time) and with
+loader.iter_credentials() (the current read path). Reports the load time and
+the peak memory allocated during the load (measured with tracemalloc).
+
+Usage:
+    uv run python benchmarks/bench_loader.py
+    uv run python benchmarks/bench_loader.py --sizes 1000 10000 100000 --json
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import write_store  # noqa: E402
+from credential_manager_mcp.loader import LoadReport, iter_credentials  # noqa: E402
+from credential_manager_mcp.server import CredentialRecord  # noqa: E402
+
+
+def load_whole(path: Path) -> dict:
+    with open(path, "rb") as f:
+        data = json.load(f)
+    return {cred_id: CredentialRecord.from_dict(cred) for cred_id, cred in data.items()}
+
+
+def load_streaming(path: Path) -> dict:
+    with open(path, "rb") as f:
+        return dict(iter_credentials(f, LoadReport()))
+
+
+def measure(loader, path: Path) -> dict:
+    """Time one load, then measure the peak memory of another"""
+    gc.collect()
+    start = time.perf_counter()
+    result = loader(path)
+    elapsed = time.perf_counter() - start
+    del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = loader(path)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {"seconds": elapsed, "peak_bytes": peak, "retained_bytes": retained}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = Path(tmp) / f"credentials-{size}.json"
+            write_store(path, size)
+            results.append({
+                "size": size,
+                "file_bytes": path.stat().st_size,
+                "json_load": measure(load_whole, path),
+                "streaming": measure(load_streaming, path),
+            })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'size':>8} {'file MiB':>9} {'json.load ms':>13} {'streaming ms':>13} "
+          f"{'json.load peak MiB':>19} {'streaming peak MiB':>19} {'records MiB':>12}")
+    for row in results:
+        print(f"{row['size']:>8} {row['file_bytes'] / 2**20:>9.1f} "
+              f"{row['json_load']['seconds'] * 1000:>13.1f} {row['streaming']['seconds'] * 1000:>13.1f} "
+              f"{row['json_load']['peak_bytes'] / 2**20:>19.1f} {row['streaming']['peak_bytes'] / 2**20:>19.1f} "
+              f"{row['streaming']['retained_bytes'] / 2**20:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Load-time and memory benchmark: pydantic Credential models vs CredentialRecord
+
+For each store size, parses the same JSON document into a dict of pydantic
+Credential models (the previous read path) and into a dict of slotted
+CredentialRecord objects (the current read path), and reports the build time
+and the memory retained by the resulting dict (measured with tracemalloc).
+
+Usage:
+    uv run python benchmarks/bench_records.py
+    uv run python benchmarks/bench_records.py --sizes 1000 10000 100000 --json
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import synthetic_credentials  # noqa: E402
+from credential_manager_mcp.server import Credential, CredentialRecord  # noqa: E402
+
+
+def build_models(data: dict) -> dict:
+    return {cred_id: Credential(**cred) for cred_id, cred in data.items()}
+
+
+def build_records(data: dict) -> dict:
+    return {cred_id: CredentialRecord.from_dict(cred) for cred_id, cred in data.items()}
+
+
+def measure(builder, data: dict) -> dict:
+    """Time one build and measure the memory the result keeps alive"""
+    gc.collect()
+    start = time.perf_counter()
+    result = builder(data)
+    elapsed = time.perf_counter() - start
+    del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = builder(data)
+    retained, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {"seconds": elapsed, "retained_bytes": retained}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        data = synthetic_credentials(size)
+        results.append({
+            "size": size,
+            "pydantic": measure(build_models, data),
+            "record": measure(build_records, data),
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'size':>8} {'pydantic ms':>12} {'record ms':>10} {'pydantic MiB':>13} {'record MiB':>11}")
+    for row in results:
+        print(f"{row['size']:>8} "
+              f"{row['pydantic']['seconds'] * 1000:>12.1f} {row['record']['seconds'] * 1000:>10.1f} "
+              f"{row['pydantic']['retained_bytes'] / 2**20:>13.1f} {row['record']['retained_bytes'] / 2**20:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for the credential manager MCP server
+
+Measures, in a fresh interpreter per run, how long it takes to import
+credential_manager_mcp.server and to get the first tool response from an
+in-process FastMCP client, for stores of several sizes.
+
+Usage:
+    uv run python benchmarks/bench_startup.py
+    uv run python benchmarks/bench_startup.py --sizes 0 1000 100000 --repeat 5 --json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from common import write_store
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Runs in the child interpreter; prints one JSON line of timings in seconds
+CHILD_SCRIPT = """
+import asyncio, json, time
+t0 = time.perf_counter()
+import credential_manager_mcp.server as server
+t1 = time.perf_counter()
+from fastmcp import Client
+
+async def first_call():
+    async with Client(server.mcp) as client:
+        t2 = time.perf_counter()
+        await client.call_tool("list_credentials", {"limit": 1})
+        return t2, time.perf_counter()
+
+t2, t3 = asyncio.run(first_call())
+print(json.dumps({"import": t1 - t0, "first_tool_call": t3 - t2, "total": t3 - t0}))
+"""
+
+
+def run_once(home: Path) -> dict:
+    """Start a fresh interpreter against the store under home and return its timings"""
+    env = {**os.environ, "HOME": str(home), "PYTHONPATH": str(PROJECT_ROOT)}
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT],
+        env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per size; the median is reported")
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            home = Path(tmp)
+            write_store(home / ".credential-manager-mcp" / "credentials.json", size)
+            runs = [run_once(home) for _ in range(args.repeat)]
+        results.append({
+            "size": size,
+            **{key: statistics.median(run[key] for run in runs) for key in runs[0]},
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'size':>8} {'import (ms)':>12} {'first call (ms)':>16} {'total (ms)':>11}")
+    for row in results:
+        print(f"{row['size']:>8} {row['import'] * 1000:>12.1f} "
+              f"{row['first_tool_call'] * 1000:>16.1f} {row['total'] * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
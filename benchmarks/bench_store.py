@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Operation benchmark suite for the credential manager
+
+For every storage backend and store size, builds a synthetic store and times
+the core operations two ways:
+
+  * direct   - CredentialStore methods (load, get, list, find, add, update,
+               delete), with no MCP layer in between
+  * mcp      - full tool round trips through an in-process FastMCP client
+
+Results are printed as a table or written as JSON. A saved JSON run can be
+passed back with --baseline to compare medians and flag regressions; the
+script exits non-zero when any operation got slower than --threshold.
+
+Usage:
+    uv run python benchmarks/bench_store.py
+    uv run python benchmarks/bench_store.py --sizes 100 1000 100000 --backends json sqlite
+    uv run python benchmarks/bench_store.py --output baseline.json
+    uv run python benchmarks/bench_store.py --baseline baseline.json --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import write_store  # noqa: E402
+from credential_manager_mcp import server  # noqa: E402
+from credential_manager_mcp.server import STORAGE_BACKENDS, create_store  # noqa: E402
+
+
+def summarize(samples: list) -> dict:
+    """Reduce per-call timings (seconds) to summary statistics in milliseconds"""
+    ordered = sorted(samples)
+    return {
+        "calls": len(ordered),
+        "median_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "min_ms": ordered[0] * 1000,
+    }
+
+
+def timed(func, repeat: int, *args) -> list:
+    """Call func repeat times and return the per-call timings"""
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i, *args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_direct(store, ids: list, repeat: int, write_repeat: int) -> dict:
+    """Time the CredentialStore methods against a populated store"""
+    picks = [random.choice(ids) for _ in range(repeat)]
+    app = store.get_credential(ids[0]).app
+    added = []
+
+    def add(i):
+        added.append(store.add_credential(f"Bench {i}", "https://bench.example.com", f"token-{i}", "bench"))
+
+    return {
+        "load_cold": summarize(timed(lambda i: store.load_credentials(force=True), write_repeat)),
+        "load_cached": summarize(timed(lambda i: store.load_credentials(), repeat)),
+        "get_credential": summarize(timed(lambda i: store.get_credential(picks[i]), repeat)),
+        "list_credentials": summarize(timed(lambda i: store.list_credentials(), write_repeat)),
+        "list_credentials_page": summarize(timed(lambda i: store.list_credentials_page(100), repeat)),
+        "find_credentials": summarize(timed(lambda i: store.find_credentials(app=app), repeat)),
+        "add_credential": summarize(timed(add, write_repeat)),
+        "update_credential": summarize(
+            timed(lambda i: store.update_credential(added[i], access_token=f"rotated-{i}"), write_repeat)),
+        "delete_credential": summarize(timed(lambda i: store.delete_credential(added[i]), write_repeat)),
+    }
+
+
+async def bench_mcp(store, ids: list, repeat: int, write_repeat: int) -> dict:
+    """Time tool round trips through an in-process FastMCP client"""
+    from fastmcp import Client
+
+    picks = [random.choice(ids) for _ in range(repeat)]
+    app = store.get_credential(ids[0]).app
+    server.set_store(store)
+    try:
+        async with Client(server.mcp) as client:
+            async def run(tool, make_args, count):
+                samples = []
+                results = []
+                for i in range(count):
+                    start = time.perf_counter()
+                    result = await client.call_tool(tool, make_args(i))
+                    samples.append(time.perf_counter() - start)
+                    results.append(json.loads(result[0].text))
+                return summarize(samples), results
+
+            timings = {}
+            timings["list_credentials"], _ = await run("list_credentials", lambda i: {}, write_repeat)
+            timings["list_credentials_page"], _ = await run("list_credentials", lambda i: {"limit": 100}, repeat)
+            timings["get_credential_details"], _ = await run(
+                "get_credential_details", lambda i: {"credential_id": picks[i]}, repeat)
+            timings["find_credentials"], _ = await run("find_credentials", lambda i: {"app": app}, repeat)
+            timings["add_credential"], added = await run("add_credential", lambda i: {
+                "app": f"Bench {i}", "base_url": "https://bench.example.com",
+                "access_token": f"token-{i}", "user_name": "bench",
+            }, write_repeat)
+            added_ids = [result["credential_id"] for result in added]
+            timings["update_credential"], _ = await run("update_credential", lambda i: {
+                "credential_id": added_ids[i], "access_token": f"rotated-{i}",
+            }, write_repeat)
+            timings["delete_credential"], _ = await run(
+                "delete_credential", lambda i: {"credential_id": added_ids[i]}, write_repeat)
+            return timings
+    finally:
+        server.set_store(None)
+
+
+def run_suite(backends: list, sizes: list, repeat: int, write_repeat: int, mcp: bool) -> list:
+    """Run every backend/size combination and return one result row per operation"""
+    rows = []
+    for backend in backends:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = Path(tmp) / "credentials.json"
+                # Lookups need at least one credential to hit
+                ids = list(write_store(path, max(size, 1)))
+                store = create_store(backend, str(path), read_only=False)
+
+                layers = {"direct": bench_direct(store, ids, repeat, write_repeat)}
+                if mcp:
+                    layers["mcp"] = asyncio.run(bench_mcp(store, ids, repeat, write_repeat))
+
+            for layer, ops in layers.items():
+                for op, stats in ops.items():
+                    rows.append({"backend": backend, "size": size, "layer": layer, "op": op, **stats})
+            print(f"  {backend:>8} {size:>8}  done", file=sys.stderr)
+    return rows
+
+
+def row_key(row: dict) -> tuple:
+    return row["backend"], row["size"], row["layer"], row["op"]
+
+
+def compare(rows: list, baseline: dict, threshold: float) -> list:
+    """Attach baseline medians and ratios to rows; return the rows that regressed"""
+    previous = {row_key(row): row for row in baseline["results"]}
+    regressions = []
+    for row in rows:
+        base = previous.get(row_key(row))
+        if base is None or base["median_ms"] <= 0:
+            continue
+        row["baseline_median_ms"] = base["median_ms"]
+        row["ratio"] = row["median_ms"] / base["median_ms"]
+        if row["ratio"] > 1 + threshold:
+            regressions.append(row)
+    return regressions
+
+
+def print_table(rows: list):
+    has_baseline = any("ratio" in row for row in rows)
+    header = f"{'backend':>8} {'size':>8} {'layer':>6} {'op':>24} {'median ms':>10} {'p95 ms':>9}"
+    print(header + (f" {'baseline':>9} {'ratio':>6}" if has_baseline else ""))
+    for row in rows:
+        line = (f"{row['backend']:>8} {row['size']:>8} {row['layer']:>6} {row['op']:>24} "
+                f"{row['median_ms']:>10.3f} {row['p95_ms']:>9.3f}")
+        if "ratio" in row:
+            line += f" {row['baseline_median_ms']:>9.3f} {row['ratio']:>6.2f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--backends", nargs="+", choices=sorted(STORAGE_BACKENDS), default=["json"])
+    parser.add_argument("--repeat", type=int, default=200, help="calls per read operation")
+    parser.add_argument("--write-repeat", type=int, default=10,
+                        help="calls per write operation and per full load/list")
+    parser.add_argument("--no-mcp", action="store_true", help="skip the FastMCP client round trips")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    parser.add_argument("--baseline", help="JSON file from an earlier --output run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="relative median slowdown counted as a regression (default 0.25)")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    rows = run_suite(args.backends, args.sizes, args.repeat, args.write_repeat, not args.no_mcp)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(rows, json.load(f), args.threshold)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": args.repeat,
+            "write_repeat": args.write_repeat,
+        },
+        "results": rows,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_table(rows)
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}:", file=sys.stderr)
+        for row in regressions:
+            print(f"  {row['backend']} {row['size']} {row['layer']} {row['op']}: "
+                  f"{row['baseline_median_ms']:.3f} -> {row['median_ms']:.3f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
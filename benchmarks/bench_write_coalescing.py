@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Write coalescing load test: N concurrent writers, one save per write vs coalesced
+
+For each writer count, N asyncio tasks each update their own credential in a
+loop through an AsyncCredentialStore, the way concurrent tool calls reach the
+store. Runs once with coalescing off (max_batch_size=1: every write does its
+own lock, load and save, as before) and once coalesced, on a fresh copy of
+the same synthetic store, and reports writes per second, saves (fsyncs) and
+the median and p99 latency of a single write.
+
+Usage:
+    uv run python benchmarks/bench_write_coalescing.py
+    uv run python benchmarks/bench_write_coalescing.py --writers 1 8 64 --size 10000 --backend journal --json
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import write_store  # noqa: E402
+from credential_manager_mcp.async_store import AsyncCredentialStore  # noqa: E402
+from credential_manager_mcp.server import STORAGE_BACKENDS, create_store  # noqa: E402
+
+
+async def run_writers(store, writers: int, writes: int, max_batch_size: int, max_delay: float) -> dict:
+    """Have writers tasks update writes credentials between them; return throughput and latency"""
+    async_store = AsyncCredentialStore(store, max_batch_size=max_batch_size, max_delay=max_delay)
+    ids = sorted(store.credentials)[:writers]
+    latencies = []
+
+    async def writer(cred_id: str, count: int):
+        for i in range(count):
+            start = time.perf_counter()
+            assert await async_store.update_credential(cred_id, access_token=f"token-{i}")
+            latencies.append(time.perf_counter() - start)
+
+    fsyncs = store.fsyncs
+    start = time.perf_counter()
+    await asyncio.gather(*(writer(cred_id, writes // writers) for cred_id in ids))
+    elapsed = time.perf_counter() - start
+    async_store.close()
+    latencies.sort()
+    return {
+        "writes_per_second": len(latencies) / elapsed,
+        "saves": store.fsyncs - fsyncs,
+        "median_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--writes", type=int, default=512, help="total writes per run")
+    parser.add_argument("--size", type=int, default=1000, help="credentials in the store")
+    parser.add_argument("--backend", default="json", choices=list(STORAGE_BACKENDS))
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--delay-ms", type=float, default=0)
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        template = Path(tmp) / "template" / "credentials.json"
+        write_store(template, args.size)
+        for writers in args.writers:
+            row = {"writers": writers}
+            for label, batch_size in (("one_save_per_write", 1), ("coalesced", args.batch_size)):
+                run_dir = Path(tmp) / f"{label}-{writers}"
+                shutil.copytree(template.parent, run_dir)
+                store = create_store(args.backend, str(run_dir / "credentials.json"), read_only=False)
+                row[label] = asyncio.run(run_writers(store, writers, args.writes, batch_size, args.delay_ms / 1000))
+            results.append(row)
+
+    if args.json:
+        print(json.dumps({"backend": args.backend, "size": args.size, "results": results}, indent=2))
+        return
+
+    print(f"backend={args.backend} size={args.size} writes={args.writes}")
+    print(f"{'writers':>8} {'mode':>19} {'writes/s':>10} {'saves':>6} {'median ms':>10} {'p99 ms':>9}")
+    for row in results:
+        for label in ("one_save_per_write", "coalesced"):
+            r = row[label]
+            print(f"{row['writers']:>8} {label:>19} {r['writes_per_second']:>10.0f} {r['saves']:>6} "
+                  f"{r['median_ms']:>10.2f} {r['p99_ms']:>9.2f}")
+        speedup = row["coalesced"]["writes_per_second"] / row["one_save_per_write"]["writes_per_second"]
+        print(f"{'':>8} {'speedup':>19} {speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
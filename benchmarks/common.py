@@ -0,0 +1,36 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+
+import json
+import uuid
+from pathlib import Path
+from typing import Dict
+
+# Number of distinct app names in synthetic stores
+SYNTHETIC_APPS = 500
+
+
+def synthetic_credentials(size: int) -> Dict[str, dict]:
+    """Return the parsed JSON of a store with size credentials"""
+    data = {}
+    for i in range(size):
+        cred_id = str(uuid.uuid4())
+        data[cred_id] = {
+            "app": f"App {i % SYNTHETIC_APPS}",
+            "id": cred_id,
+            "base_url": f"https://api{i % SYNTHETIC_APPS}.example.com",
+            "access_token": uuid.uuid4().hex,
+            "user_name": f"user{i}",
+            "expires": "never" if i % 2 else "2030-01-01T00:00:00",
+        }
+    return data
+
+
+def write_store(path: Path, size: int) -> Dict[str, dict]:
+    """Write a synthetic credentials.json with size entries to path and return its data"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = synthetic_credentials(size)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+    return data
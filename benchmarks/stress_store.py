@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Multi-process contention stress harness with lost-update detection
+
+Spawns N worker processes that each open their own store on one shared path
+(the way separate MCP server instances do) and, released together, run a
+random mix of add, update, delete and read operations through the
+CredentialStore API. Every worker only modifies credentials it created, so
+it knows exactly what its own credentials must look like at every moment,
+whatever the others do; each operation goes to a per-worker JSONL operation
+log with its outcome, timings and lock wait.
+
+Afterwards the final store is checked against the logs, and the run reports
+throughput, latency and lock-wait percentiles plus any anomalies:
+
+    lost_writes       a credential's token isn't the last one its owner wrote
+                      (or an acknowledged credential is missing)
+    resurrected       a credential that was deleted is back
+    unexpected        a credential no worker ever created
+    torn              the final file doesn't load cleanly (quarantined
+                      records, or a load error)
+    stale_reads       a worker read back an older token than it last wrote
+    missing_reads     a worker's list or lookup didn't contain one of its live
+                      credentials (e.g. a reader saw an empty store)
+
+Operations that fail with "store busy" are counted, not treated as anomalies.
+Exits with status 1 when anything is found.
+
+Usage:
+    uv run python benchmarks/stress_store.py
+    uv run python benchmarks/stress_store.py --processes 32 --ops 500 --backend sqlite --json
+    uv run pytest -m stress
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from credential_manager_mcp.server import STORAGE_BACKENDS, StoreBusyError, create_store  # noqa: E402
+
+# Relative frequency of each operation
+OPERATION_MIX = {"add": 3, "update": 4, "delete": 1, "get": 2, "list": 1}
+
+ANOMALIES = ("lost_writes", "resurrected", "unexpected", "torn", "stale_reads", "missing_reads")
+
+
+def _lock_wait_total() -> float:
+    """Seconds this process has spent waiting for store locks so far"""
+    from credential_manager_mcp.metrics import metrics
+    return sum(histogram.sum for (family, _), histogram in list(metrics.histograms.items())
+               if family == "lock_wait")
+
+
+def worker(worker_id: int, store_path: str, backend: str, ops: int, seed: int,
+           lock_timeout: float, start_line, log_path: str):
+    """Run ops random operations against the store, logging each one to log_path"""
+    from credential_manager_mcp.metrics import metrics
+
+    metrics.enabled = True
+    store = create_store(backend, store_path, read_only=False, lock_timeout=lock_timeout)
+    rng = random.Random(seed * 1000 + worker_id)
+    operations, weights = zip(*OPERATION_MIX.items())
+    app = f"worker-{worker_id}"
+    # This worker's credentials and the token each must currently have
+    live: Dict[str, str] = {}
+    start_line.wait()
+
+    with open(log_path, "w") as log:
+        for seq in range(ops):
+            op = rng.choices(operations, weights)[0]
+            if op != "add" and not live:
+                op = "add"
+            token = f"{worker_id}:{seq}"
+            cred_id = rng.choice(sorted(live)) if op != "add" else None
+            entry = {"worker": worker_id, "seq": seq, "op": op, "id": cred_id, "ok": True}
+            waited = _lock_wait_total()
+            began = time.time()
+            try:
+                if op == "add":
+                    cred_id = entry["id"] = store.add_credential(app, "https://stress.example.com", token,
+                                                                 f"user-{seq}")
+                    entry["token"] = live[cred_id] = token
+                elif op == "update":
+                    if store.update_credential(cred_id, access_token=token):
+                        entry["token"] = live[cred_id] = token
+                    else:
+                        entry["anomaly"] = "missing_reads"
+                elif op == "delete":
+                    if store.delete_credential(cred_id):
+                        del live[cred_id]
+                    else:
+                        entry["anomaly"] = "missing_reads"
+                elif op == "get":
+                    credential = store.get_credential(cred_id)
+                    if credential is None:
+                        entry["anomaly"] = "missing_reads"
+                    elif credential.access_token != live[cred_id]:
+                        entry["anomaly"] = "stale_reads"
+                        entry["seen"] = credential.access_token
+                else:
+                    listed = {item["id"] for item in store.list_credentials()}
+                    if not live.keys() <= listed:
+                        entry["anomaly"] = "missing_reads"
+                        entry["missing"] = sorted(live.keys() - listed)
+            except StoreBusyError:
+                entry["ok"] = False
+                entry["error"] = "busy"
+            except Exception as e:
+                entry["ok"] = False
+                entry["error"] = f"{type(e).__name__}: {e}"
+            entry["seconds"] = time.time() - began
+            entry["lock_wait"] = _lock_wait_total() - waited
+            log.write(json.dumps(entry) + "\n")
+
+
+def read_logs(log_dir: Path) -> List[dict]:
+    """Return every logged operation"""
+    entries = []
+    for log_path in sorted(log_dir.glob("ops-*.jsonl")):
+        with open(log_path) as f:
+            entries.extend(json.loads(line) for line in f)
+    return entries
+
+
+def verify(store_path: str, backend: str, entries: List[dict]) -> Dict[str, list]:
+    """Check the final store against the operation log; returns the anomalies found"""
+    anomalies: Dict[str, list] = {name: [] for name in ANOMALIES}
+    expected: Dict[str, str] = {}
+    deleted = set()
+    # Credentials touched by an operation that failed in an unexpected way
+    # may legitimately be in either state
+    uncertain = set()
+    for entry in sorted(entries, key=lambda entry: (entry["worker"], entry["seq"])):
+        if entry.get("anomaly"):
+            anomalies[entry["anomaly"]].append(entry)
+        if not entry["ok"]:
+            if entry.get("error") != "busy" and entry["id"]:
+                uncertain.add(entry["id"])
+            continue
+        if entry.get("token") and entry["op"] in ("add", "update"):
+            expected[entry["id"]] = entry["token"]
+        elif entry["op"] == "delete" and not entry.get("anomaly"):
+            expected.pop(entry["id"], None)
+            deleted.add(entry["id"])
+
+    store = create_store(backend, store_path, read_only=True)
+    store.load_credentials(force=True)
+    if store._load_error is not None or store.quarantined:
+        anomalies["torn"].append({"load_error": str(store._load_error), "quarantined": len(store.quarantined)})
+    actual = {item["id"] for item in store.list_credentials()}
+    known = set(expected) | deleted | uncertain
+    for cred_id, token in expected.items():
+        if cred_id in uncertain:
+            continue
+        credential = store.get_credential(cred_id)
+        if credential is None or credential.access_token != token:
+            anomalies["lost_writes"].append({"id": cred_id, "expected": token,
+                                             "found": credential.access_token if credential else None})
+    anomalies["resurrected"] = [{"id": cred_id} for cred_id in sorted(actual & deleted - uncertain - set(expected))]
+    anomalies["unexpected"] = [{"id": cred_id} for cred_id in sorted(actual - known)]
+    return anomalies
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def run_stress(processes: int = 8, ops: int = 200, backend: str = "json", seed: int = 0,
+               lock_timeout: float = 30.0, work_dir: str = None) -> dict:
+    """Run the workers against a fresh store and return the report"""
+    work_dir = Path(work_dir or tempfile.mkdtemp())
+    store_path = str(work_dir / "credentials.json")
+    # Spawned rather than forked: the caller (e.g. pytest) may have threads running
+    context = multiprocessing.get_context("spawn")
+    # Every worker opens its store, then all are released together
+    start_line = context.Barrier(processes + 1)
+    workers = [context.Process(target=worker, args=(i, store_path, backend, ops, seed, lock_timeout, start_line,
+                                                    str(work_dir / f"ops-{i}.jsonl")))
+               for i in range(processes)]
+    for process in workers:
+        process.start()
+    try:
+        start_line.wait(timeout=120)
+    except threading.BrokenBarrierError:
+        # A worker died while opening its store; the rest give up and it shows as crashed
+        pass
+    began = time.perf_counter()
+    for process in workers:
+        process.join()
+    elapsed = time.perf_counter() - began
+
+    entries = read_logs(work_dir)
+    anomalies = verify(store_path, backend, entries)
+    crashed = [process.exitcode for process in workers if process.exitcode != 0]
+    succeeded = [entry for entry in entries if entry["ok"]]
+    writes = [entry for entry in succeeded if entry["op"] in ("add", "update", "delete")]
+    lock_waits = [entry["lock_wait"] for entry in entries]
+    latencies = [entry["seconds"] for entry in entries]
+    return {
+        "backend": backend,
+        "processes": processes,
+        "operations": len(entries),
+        "crashed_workers": len(crashed),
+        "busy": sum(1 for entry in entries if entry.get("error") == "busy"),
+        "errors": sum(1 for entry in entries if not entry["ok"] and entry.get("error") != "busy"),
+        "elapsed_seconds": elapsed,
+        "ops_per_second": len(succeeded) / elapsed if elapsed else 0.0,
+        "writes_per_second": len(writes) / elapsed if elapsed else 0.0,
+        "latency_ms": {name: percentile(latencies, q) * 1000
+                       for name, q in (("p50", 0.5), ("p99", 0.99), ("max", 1.0))},
+        "lock_wait_ms": {name: percentile(lock_waits, q) * 1000
+                         for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))},
+        "mean_lock_wait_ms": statistics.fmean(lock_waits) * 1000 if lock_waits else 0.0,
+        "anomalies": {name: len(found) for name, found in anomalies.items()},
+        "examples": {name: found[:3] for name, found in anomalies.items() if found},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=200, help="operations per process")
+    parser.add_argument("--backend", nargs="+", default=["json"], choices=list(STORAGE_BACKENDS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lock-timeout", type=float, default=30.0)
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    args = parser.parse_args()
+
+    reports = [run_stress(args.processes, args.ops, backend, args.seed, args.lock_timeout)
+               for backend in args.backend]
+    failed = any(sum(report["anomalies"].values()) or report["crashed_workers"] for report in reports)
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        sys.exit(1 if failed else 0)
+
+    print(f"processes={args.processes} ops/process={args.ops} seed={args.seed}")
+    print(f"{'backend':>8} {'ops/s':>8} {'writes/s':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'wait p50':>9} {'wait p90':>9} {'wait p99':>9} {'busy':>5} {'anomalies':>10}")
+    for report in reports:
+        wait = report["lock_wait_ms"]
+        print(f"{report['backend']:>8} {report['ops_per_second']:>8.0f} {report['writes_per_second']:>9.0f} "
+              f"{report['latency_ms']['p50']:>8.2f} {report['latency_ms']['p99']:>8.2f} "
+              f"{wait['p50']:>9.2f} {wait['p90']:>9.2f} {wait['p99']:>9.2f} "
+              f"{report['busy']:>5} {sum(report['anomalies'].values()):>10}")
+        for name, examples in report["examples"].items():
+            print(f"    {name}: {report['anomalies'][name]} (e.g. {examples[0]})")
+        if report["crashed_workers"] or report["errors"]:
+            print(f"    crashed workers: {report['crashed_workers']}, other errors: {report['errors']}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,22 @@ A FastMCP server for securely managing API credentials locally through the Model
 
 __version__ = "0.1.0"
 
-from .server import main
+
+def main():
+    """Entry point; imports the server lazily so importing the package stays cheap.
+
+    With CREDENTIAL_MANAGER_DAEMON=true, proxies stdio to the shared daemon
+    (starting it if needed) instead of loading the store in this process.
+    "import" and "export" run the bulk transfer commands instead of a server.
+    """
+    import sys
+    if sys.argv[1:2] in (["import"], ["export"]):
+        from .transfer import main as transfer_main
+        sys.exit(transfer_main())
+    from .daemon import get_daemon_enabled, proxy
+    if get_daemon_enabled():
+        return proxy()
+    from .server import main as server_main
+    return server_main()
 
 __all__ = ["main"] 
\ No newline at end of file
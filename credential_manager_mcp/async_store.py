@@ -0,0 +1,186 @@
+"""
+Async front end for a CredentialStore
+
+Every store call can block: on open/read/fsync, on JSON parsing and on the
+cross-process flock. AsyncCredentialStore runs those calls on a dedicated
+worker thread so the event loop keeps serving other requests while one
+waits. Calls are executed one at a time, in the order they were made, which
+is also how the synchronous server ran them.
+
+The flip side of running calls in order is that a read queues behind every
+call made before it. If a write is waiting for the cross-process lock
+(another process holds it), reads of the same store wait too, for up to
+lock_timeout, until the write gets the lock or raises StoreBusyError. Reads
+answered from the response cache are no exception, since they revalidate
+with load_credentials() first. Other stores have their own worker threads
+and are not held up.
+
+Single-credential writes (add, update, delete) are coalesced: writes that
+arrive within max_delay of each other, or while the previous batch is still
+being saved, are applied together with store.apply_writes(), so a burst of N
+writers costs one lock, load and save instead of N. Each caller still gets
+its own result or error.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from .responses import ResponseCache
+from .server import Credential, CredentialStore
+
+
+def get_write_batch_size() -> int:
+    """Get the most writes to coalesce into one save from the environment (1 turns coalescing off)"""
+    return int(os.getenv("CREDENTIAL_MANAGER_WRITE_BATCH_SIZE", "64"))
+
+
+def get_write_batch_delay() -> float:
+    """Get how long a write waits for others to join its batch, in seconds, from the environment"""
+    return float(os.getenv("CREDENTIAL_MANAGER_WRITE_BATCH_DELAY_MS", "0")) / 1000
+
+
+class AsyncCredentialStore:
+    """Awaitable wrapper around a CredentialStore.
+
+    The read/write methods mirror CredentialStore's and run on the worker
+    thread; any other attribute (read_only, store_path, credentials,
+    cache_stats(), ...) is read straight from the wrapped store.
+    """
+
+    def __init__(self, store: CredentialStore, executor: Optional[ThreadPoolExecutor] = None,
+                 max_batch_size: Optional[int] = None, max_delay: Optional[float] = None):
+        self.store = store
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="credential-store")
+        self.max_batch_size = get_write_batch_size() if max_batch_size is None else max_batch_size
+        self.max_delay = get_write_batch_delay() if max_delay is None else max_delay
+        # Coalesced writes waiting for the next batch: (method name, args, kwargs, future)
+        self._writes: List[tuple] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # The batch being saved, if any; writes arriving meanwhile wait for the next one
+        self._flush_task: Optional[asyncio.Task] = None
+        self.write_batches = 0
+        self.coalesced_writes = 0
+        # Serialized answers of the read tools and resources for this store
+        self.responses = ResponseCache()
+
+    def __getattr__(self, name: str):
+        return getattr(self.store, name)
+
+    async def _run(self, func, *args, **kwargs):
+        """Run a blocking store call on the worker thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def close(self, wait: bool = False):
+        """Stop the worker thread once queued calls finish (blocking until then if wait is set)"""
+        self._executor.shutdown(wait=wait)
+
+    async def _write(self, name: str, *args, **kwargs):
+        """Queue a single-credential write for the next batch and wait for its own result"""
+        if self.max_batch_size <= 1:
+            return await self._run(getattr(self.store, name), *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._writes.append((name, args, kwargs, future))
+        if self._flush_task is None:
+            if len(self._writes) >= self.max_batch_size:
+                self._start_batch()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.max_delay, self._start_batch)
+        return await future
+
+    def _start_batch(self):
+        """Hand the queued writes, up to max_batch_size, to the worker thread"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._flush_task is not None or not self._writes:
+            return
+        batch, self._writes = self._writes[:self.max_batch_size], self._writes[self.max_batch_size:]
+        self._flush_task = asyncio.ensure_future(self._apply_batch(batch))
+
+    async def _apply_batch(self, batch: List[tuple]):
+        try:
+            try:
+                results = await self._run(self.store.apply_writes,
+                                          [(name, args, kwargs) for name, args, kwargs, _ in batch])
+            except Exception as e:
+                # Nothing was saved (lock timeout, read-only, write error): every caller gets the error
+                results = [e] * len(batch)
+            self.write_batches += 1
+            self.coalesced_writes += len(batch)
+            for (_, _, _, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            self._flush_task = None
+        # Writes that arrived during the save have waited long enough
+        self._start_batch()
+
+    def write_stats(self) -> dict:
+        """Return write coalescing settings and counters"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_delay_ms": self.max_delay * 1000,
+            "batches": self.write_batches,
+            "writes": self.coalesced_writes
+        }
+
+    async def load_credentials(self, force: bool = False):
+        await self._run(self.store.load_credentials, force)
+
+    async def get_credential(self, cred_id: str) -> Optional[Credential]:
+        return await self._run(self.store.get_credential, cred_id)
+
+    async def get_credentials(self, cred_ids: List[str]) -> List[Optional[Credential]]:
+        return await self._run(self.store.get_credentials, cred_ids)
+
+    async def list_credentials(self, exclude_expired: bool = False) -> List[Dict]:
+        return await self._run(self.store.list_credentials, exclude_expired)
+
+    async def list_credentials_page(self, limit: int, cursor: Optional[str] = None,
+                                    exclude_expired: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        return await self._run(self.store.list_credentials_page, limit, cursor, exclude_expired)
+
+    async def find_credentials(self, app: Optional[str] = None, user_name: Optional[str] = None,
+                               host: Optional[str] = None, prefix: Optional[str] = None,
+                               exclude_expired: bool = False) -> List[Dict]:
+        return await self._run(self.store.find_credentials, app, user_name, host, prefix, exclude_expired)
+
+    async def changed_ids_since(self, version: int) -> Optional[Set[str]]:
+        return await self._run(self.store.changed_ids_since, version)
+
+    async def changes_since(self, version: int) -> Optional[Tuple[List[Dict], List[str]]]:
+        return await self._run(self.store.changes_since, version)
+
+    async def expiring_credentials(self, within_seconds: float) -> List[Dict]:
+        return await self._run(self.store.expiring_credentials, within_seconds)
+
+    async def add_credential(self, app: str, base_url: str, access_token: str,
+                             user_name: Optional[str] = None, expires: Optional[str] = None) -> str:
+        return await self._write("add_credential", app, base_url, access_token, user_name, expires)
+
+    async def update_credential(self, cred_id: str, **updates) -> bool:
+        return await self._write("update_credential", cred_id, **updates)
+
+    async def delete_credential(self, cred_id: str) -> bool:
+        return await self._write("delete_credential", cred_id)
+
+    async def add_credentials(self, items: List[dict], atomic: bool = True) -> List[dict]:
+        return await self._run(self.store.add_credentials, items, atomic)
+
+    async def update_credentials(self, items: List[dict], atomic: bool = True) -> List[dict]:
+        return await self._run(self.store.update_credentials, items, atomic)
+
+    async def delete_credentials(self, cred_ids: List[str], atomic: bool = True) -> List[dict]:
+        return await self._run(self.store.delete_credentials, cred_ids, atomic)
+
+    async def import_credentials(self, items: List[dict], on_duplicate: str = "skip") -> List[dict]:
+        return await self._run(self.store.import_credentials, items, on_duplicate)
@@ -0,0 +1,339 @@
+"""
+Local daemon: one in-memory store shared by many MCP stdio sessions
+
+Every MCP client starts its own credential-manager-mcp process, so N
+sessions normally mean N parsed copies of the store and N-way lock
+contention on the file. With CREDENTIAL_MANAGER_DAEMON=true the entry point
+is instead a thin proxy that copies stdin/stdout to and from a Unix domain
+socket, starting the daemon behind it if it isn't running. The daemon loads
+the store once, serves every connection as its own MCP session, and applies
+all writes through one AsyncCredentialStore (one worker thread, coalesced
+saves), so sessions never wait on each other's file locks.
+
+Each configuration gets its own daemon: the default socket name is derived
+from the CREDENTIAL_MANAGER_* environment, so a read-only and a read-write
+client never share one. The daemon inherits the environment of the proxy
+that started it and exits after CREDENTIAL_MANAGER_DAEMON_IDLE_TIMEOUT
+seconds without sessions.
+
+This module only imports the server (and FastMCP) inside the daemon, so the
+proxy starts fast and stays small.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
+
+# Largest JSON-RPC message accepted from a session
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+# How long the proxy waits for a daemon it started to accept connections
+DAEMON_START_TIMEOUT = 10.0
+
+
+def get_daemon_enabled() -> bool:
+    """Whether the entry point should proxy to a shared daemon (CREDENTIAL_MANAGER_DAEMON)"""
+    return os.getenv("CREDENTIAL_MANAGER_DAEMON", "false").lower() in ("true", "1", "yes")
+
+
+def get_daemon_idle_timeout() -> float:
+    """Get the seconds the daemon keeps running without sessions from the environment"""
+    return float(os.getenv("CREDENTIAL_MANAGER_DAEMON_IDLE_TIMEOUT", "300"))
+
+
+def get_socket_path() -> Path:
+    """Get the daemon's socket from the environment, or the default one for this configuration.
+
+    The default lives in a private per-user directory and is named after a
+    hash of the CREDENTIAL_MANAGER_* variables and HOME, which together
+    decide which store the daemon serves and how.
+    """
+    value = os.getenv("CREDENTIAL_MANAGER_DAEMON_SOCKET")
+    if value:
+        return Path(value).expanduser()
+    config = sorted((name, value) for name, value in os.environ.items()
+                    if name.startswith("CREDENTIAL_MANAGER_") and not name.startswith("CREDENTIAL_MANAGER_DAEMON"))
+    digest = hashlib.sha256(repr((str(Path.home()), config)).encode()).hexdigest()[:16]
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return Path(runtime_dir) / f"credential-manager-mcp-{os.getuid()}" / f"{digest}.sock"
+
+
+def _private_dir(path: Path):
+    """Create the socket's directory; refuse one other users could reach into"""
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    st = path.parent.stat()
+    if st.st_uid != os.getuid():
+        raise PermissionError(f"Daemon socket directory {path.parent} is owned by another user")
+    if path.parent.name.startswith("credential-manager-mcp-") and st.st_mode & 0o077:
+        raise PermissionError(f"Daemon socket directory {path.parent} must not be accessible to other users")
+
+
+@asynccontextmanager
+async def socket_streams(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Turn a newline-delimited JSON-RPC connection into the (read, write) streams MCP sessions use.
+
+    The same framing as the stdio transport, so the proxy only has to copy
+    bytes. The connection is closed on exit.
+    """
+    import anyio
+    import mcp.types as types
+    from mcp.shared.message import SessionMessage
+
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+
+    async def socket_reader():
+        try:
+            async with read_stream_writer:
+                while line := await reader.readline():
+                    try:
+                        message = types.JSONRPCMessage.model_validate_json(line)
+                    except Exception as exc:
+                        await read_stream_writer.send(exc)
+                        continue
+                    await read_stream_writer.send(SessionMessage(message))
+        except (anyio.ClosedResourceError, ConnectionError):
+            await anyio.lowlevel.checkpoint()
+
+    async def socket_writer():
+        try:
+            async with write_stream_reader:
+                async for session_message in write_stream_reader:
+                    json = session_message.message.model_dump_json(by_alias=True, exclude_none=True)
+                    writer.write(json.encode() + b"\n")
+                    await writer.drain()
+        except (anyio.ClosedResourceError, ConnectionError):
+            await anyio.lowlevel.checkpoint()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(socket_reader)
+        tg.start_soon(socket_writer)
+        try:
+            yield read_stream, write_stream
+        finally:
+            tg.cancel_scope.cancel()
+            writer.close()
+
+
+class CredentialDaemon:
+    """Serves the server's MCP tools and resources to every connection on a Unix socket.
+
+    All sessions share the process's store (server.get_store()), so they see
+    one in-memory copy and their writes are serialized by its
+    AsyncCredentialStore.
+    """
+
+    def __init__(self, socket_path: Optional[Path] = None, idle_timeout: Optional[float] = None):
+        self.socket_path = Path(socket_path) if socket_path else get_socket_path()
+        self.idle_timeout = get_daemon_idle_timeout() if idle_timeout is None else idle_timeout
+        self.sessions = 0
+        self.active_sessions = 0
+        self._stopped: Optional[asyncio.Event] = None
+        self._idle_handle: Optional[asyncio.TimerHandle] = None
+
+    def bind(self) -> socket.socket:
+        """Create the listening socket, readable and writable by this user only"""
+        _private_dir(self.socket_path)
+        self.socket_path.unlink(missing_ok=True)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+        try:
+            sock.bind(str(self.socket_path))
+        finally:
+            os.umask(umask)
+        sock.listen(128)
+        return sock
+
+    async def serve(self, sock: Optional[socket.socket] = None):
+        """Accept sessions until stop() or the idle timeout"""
+        self._stopped = asyncio.Event()
+        server = await asyncio.start_unix_server(self._handle, sock=sock or self.bind(), limit=MAX_MESSAGE_SIZE)
+        self._schedule_idle_stop()
+        try:
+            await self._stopped.wait()
+        finally:
+            server.close()
+            self.socket_path.unlink(missing_ok=True)
+
+    def stop(self):
+        """Stop accepting sessions (safe to call from signal handlers on the loop)"""
+        if self._stopped is not None:
+            self._stopped.set()
+
+    def _schedule_idle_stop(self):
+        if self.active_sessions == 0 and self.idle_timeout >= 0:
+            self._idle_handle = asyncio.get_running_loop().call_later(self.idle_timeout, self.stop)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Run one MCP session over a connection"""
+        from mcp.server.lowlevel import NotificationOptions
+        from .server import mcp
+
+        self.sessions += 1
+        self.active_sessions += 1
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        try:
+            async with socket_streams(reader, writer) as (read_stream, write_stream):
+                await mcp._mcp_server.run(
+                    read_stream,
+                    write_stream,
+                    mcp._mcp_server.create_initialization_options(NotificationOptions(tools_changed=True)),
+                )
+        except Exception as e:
+            print(f"Error in daemon session: {e}", file=sys.stderr)
+        finally:
+            self.active_sessions -= 1
+            self._schedule_idle_stop()
+
+    def stats(self) -> dict:
+        """Return the socket and session counters"""
+        return {
+            "socket": str(self.socket_path),
+            "sessions": self.sessions,
+            "active_sessions": self.active_sessions,
+            "idle_timeout_seconds": self.idle_timeout
+        }
+
+
+def run_daemon(socket_path: Optional[Path] = None, idle_timeout: Optional[float] = None) -> int:
+    """Run the daemon in this process; returns 0 when it stops, 1 if another daemon owns the socket"""
+    import fcntl
+
+    daemon = CredentialDaemon(socket_path, idle_timeout)
+    _private_dir(daemon.socket_path)
+    # The lock file decides which of several racing daemons gets the socket;
+    # it holds the winner's pid
+    lock_file = open(daemon.socket_path.with_suffix(".lock"), "a+")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return 1
+    lock_file.truncate(0)
+    lock_file.write(f"{os.getpid()}\n")
+    lock_file.flush()
+
+    from .server import get_async_store
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, daemon.stop)
+        await daemon.serve(sock)
+
+    try:
+        # Bind first so proxies can connect (and queue) while the store loads
+        sock = daemon.bind()
+        store = get_async_store().store
+        print(f"🔐 Credential Manager daemon serving {store.store_path} "
+              f"({'read-only' if store.read_only else 'read-write'}) on {daemon.socket_path}", file=sys.stderr)
+        asyncio.run(serve())
+    finally:
+        lock_file.close()
+    return 0
+
+
+def start_daemon(socket_path: Path) -> subprocess.Popen:
+    """Start a detached daemon for socket_path with this process's environment"""
+    _private_dir(socket_path)
+    with open(socket_path.with_suffix(".log"), "ab") as log:
+        return subprocess.Popen(
+            [sys.executable, "-m", "credential_manager_mcp.daemon", "--socket", str(socket_path)],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=log,
+            start_new_session=True, close_fds=True
+        )
+
+
+def _daemon_starting(socket_path: Path) -> bool:
+    """Whether a daemon holds the lock for socket_path (running, or still loading the store)"""
+    import fcntl
+
+    try:
+        with open(socket_path.with_suffix(".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    except OSError:
+        pass
+    return False
+
+
+def connect(socket_path: Optional[Path] = None, start: bool = True,
+            timeout: float = DAEMON_START_TIMEOUT) -> socket.socket:
+    """Connect to the daemon, starting one if start is set and none is listening"""
+    socket_path = Path(socket_path) if socket_path else get_socket_path()
+    deadline = None
+    while True:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(str(socket_path))
+            return sock
+        except (FileNotFoundError, ConnectionRefusedError):
+            sock.close()
+            if not start:
+                raise
+        if deadline is None:
+            deadline = time.monotonic() + timeout
+            # Proxies starting together would each launch one; the losers exit at once
+            process = None if _daemon_starting(socket_path) else start_daemon(socket_path)
+        elif time.monotonic() > deadline:
+            raise TimeoutError(f"Credential Manager daemon did not start on {socket_path}; "
+                               f"see {socket_path.with_suffix('.log')}")
+        elif process is not None and process.poll() not in (None, 0, 1):
+            raise RuntimeError(f"Credential Manager daemon exited with status {process.returncode}; "
+                               f"see {socket_path.with_suffix('.log')}")
+        time.sleep(0.02)
+
+
+def proxy(socket_path: Optional[Path] = None) -> int:
+    """Copy stdin to the daemon and its answers to stdout until either side closes"""
+    sock = connect(socket_path)
+
+    def pump_stdin():
+        try:
+            while data := os.read(sys.stdin.fileno(), 65536):
+                sock.sendall(data)
+        except OSError:
+            pass
+        finally:
+            try:
+                sock.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+    threading.Thread(target=pump_stdin, name="credential-proxy-stdin", daemon=True).start()
+    stdout = sys.stdout.fileno()
+    try:
+        while data := sock.recv(65536):
+            while data:
+                data = data[os.write(stdout, data):]
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        sock.close()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Credential Manager daemon in the foreground")
+    parser.add_argument("--socket", type=Path, help="socket path (default: derived from the environment)")
+    parser.add_argument("--idle-timeout", type=float, help="seconds without sessions before exiting")
+    args = parser.parse_args()
+    sys.exit(run_daemon(args.socket, args.idle_timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Encryption at rest for access tokens
+
+When a key is configured (CREDENTIAL_MANAGER_ENCRYPTION_KEY, or a file named
+by CREDENTIAL_MANAGER_KEY_FILE), each credential's access_token is stored as
+
+    enc:v1:<base64url(nonce + AES-256-GCM ciphertext)>
+
+with the credential ID as associated data, so a token can't be moved to
+another record. Everything else (id, app, base_url, user_name, expires)
+stays plaintext: loading, listing and searching never decrypt anything, and
+only the records whose details are requested are decrypted.
+
+The key is stretched with scrypt once per process and cached. Plaintext
+tokens already in the store stay readable and are encrypted the next time
+their credential is written.
+
+Needs the optional 'cryptography' package (pip install
+"credential-manager-mcp[encryption]").
+"""
+
+import base64
+import functools
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional
+
+ENCRYPTED_PREFIX = "enc:v1:"
+
+# scrypt parameters for stretching the configured secret; the salt is fixed
+# because the key is derived once per process, not once per record
+KDF_SALT = b"credential-manager-mcp/token-key/v1"
+KDF_N = 2 ** 15
+KDF_R = 8
+KDF_P = 1
+
+NONCE_SIZE = 12
+
+
+class DecryptionError(ValueError):
+    """An encrypted token can't be decrypted (no key, or the wrong one)"""
+
+
+def get_encryption_secret() -> Optional[bytes]:
+    """Get the configured key material from the environment, or None if encryption is off"""
+    secret = os.getenv("CREDENTIAL_MANAGER_ENCRYPTION_KEY")
+    if secret:
+        return secret.encode()
+    key_file = os.getenv("CREDENTIAL_MANAGER_KEY_FILE")
+    if key_file:
+        data = Path(key_file).expanduser().read_bytes().strip()
+        if not data:
+            raise ValueError(f"CREDENTIAL_MANAGER_KEY_FILE is empty: {key_file}")
+        return data
+    return None
+
+
+@functools.lru_cache(maxsize=4)
+def derive_key(secret: bytes) -> bytes:
+    """Stretch key material into a 256-bit key (scrypt; cached, so it runs once per secret)"""
+    return hashlib.scrypt(secret, salt=KDF_SALT, n=KDF_N, r=KDF_R, p=KDF_P,
+                          maxmem=2 ** 26, dklen=32)
+
+
+def is_encrypted(token: str) -> bool:
+    return token.startswith(ENCRYPTED_PREFIX)
+
+
+class TokenCipher:
+    """Encrypts and decrypts access tokens, bound to their credential IDs"""
+
+    def __init__(self, secret: bytes):
+        try:
+            from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        except ImportError:
+            raise ImportError("Encryption needs the 'cryptography' package: "
+                              "pip install 'credential-manager-mcp[encryption]'") from None
+        self._aead = AESGCM(derive_key(secret))
+
+    def encrypt(self, cred_id: str, token: str) -> str:
+        """Return the stored form of a token; already-encrypted tokens are returned as they are"""
+        if is_encrypted(token):
+            return token
+        nonce = os.urandom(NONCE_SIZE)
+        sealed = self._aead.encrypt(nonce, token.encode(), cred_id.encode())
+        return ENCRYPTED_PREFIX + base64.urlsafe_b64encode(nonce + sealed).decode()
+
+    def decrypt(self, cred_id: str, token: str) -> str:
+        """Return the plaintext of a stored token; plaintext tokens are returned as they are"""
+        if not is_encrypted(token):
+            return token
+        from cryptography.exceptions import InvalidTag
+        try:
+            data = base64.urlsafe_b64decode(token[len(ENCRYPTED_PREFIX):])
+            return self._aead.decrypt(data[:NONCE_SIZE], data[NONCE_SIZE:], cred_id.encode()).decode()
+        except (InvalidTag, ValueError):
+            raise DecryptionError(f"Could not decrypt the access token of credential {cred_id} "
+                                  f"(wrong encryption key?)") from None
+
+
+@functools.lru_cache(maxsize=1)
+def _cipher_for(secret: bytes) -> TokenCipher:
+    return TokenCipher(secret)
+
+
+def get_cipher() -> Optional[TokenCipher]:
+    """Return the process-wide cipher for the configured key, or None if encryption is off"""
+    secret = get_encryption_secret()
+    return _cipher_for(secret) if secret else None
@@ -0,0 +1,219 @@
+"""
+In-memory secondary indexes for credential lookups
+
+Maps case-folded app names, user names and base_url hosts to credential IDs
+so that lookups cost O(result) instead of a scan over the whole store, and
+keeps parsed expiry times in sorted order so expiring credentials can be
+found without parsing every record. Bulk imports look up duplicates by
+identity, (app, user_name, base_url), through a further index built on
+first use.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+
+def app_key(app: str) -> str:
+    """Normalize an app name for indexing"""
+    return app.casefold()
+
+
+def host_key(base_url: str) -> Optional[str]:
+    """Extract the lower-cased host from a base URL, tolerating a missing scheme"""
+    try:
+        parts = urlsplit(base_url)
+        if not parts.netloc:
+            parts = urlsplit("//" + base_url)
+        return parts.hostname
+    except ValueError:
+        return None
+
+
+def identity_key(app: str, user_name: Optional[str], base_url: str) -> Tuple[str, str, str]:
+    """Normalize the fields that make two credentials the same account: (app, user_name, base_url)"""
+    return (app_key(app), (user_name or "").casefold(), base_url.strip().rstrip("/").casefold())
+
+
+def expiry_timestamp(expires: Optional[str]) -> Optional[float]:
+    """Parse an expires value to a POSIX timestamp; None for "never", unset or unparseable.
+    
+    Datetimes without a UTC offset are taken to be UTC.
+    """
+    if not expires or expires == "never":
+        return None
+    try:
+        parsed = datetime.fromisoformat(expires.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _remove_sorted(keys: list, key):
+    """Remove key from a sorted list if present"""
+    pos = bisect_left(keys, key)
+    if pos < len(keys) and keys[pos] == key:
+        del keys[pos]
+
+
+class CredentialIndex:
+    """Secondary indexes over a store's credentials, maintained incrementally"""
+
+    def __init__(self):
+        self.by_app: Dict[str, Set[str]] = defaultdict(set)
+        self.by_user: Dict[str, Set[str]] = defaultdict(set)
+        self.by_host: Dict[str, Set[str]] = defaultdict(set)
+        # Exact (not case-folded) app name counts, for username disambiguation
+        self.app_counts: Counter = Counter()
+        # Sorted distinct app keys, for prefix range lookups
+        self._app_keys: List[str] = []
+        # The indexed credentials and their IDs in sorted order for keyset
+        # pagination; the sorted list is built lazily after bulk changes
+        self._credentials: dict = {}
+        self._sorted_ids: Optional[List[str]] = None
+        # (expiry timestamp, ID) pairs in sorted order, "never" excluded;
+        # built lazily like _sorted_ids so a full load doesn't parse every date
+        self._expiry: Optional[List[Tuple[float, str]]] = None
+        # identity_key() -> IDs, built on the first duplicate lookup
+        self._identities: Optional[Dict[Tuple[str, str, str], Set[str]]] = None
+
+    def clear(self):
+        """Drop every index entry"""
+        self.by_app.clear()
+        self.by_user.clear()
+        self.by_host.clear()
+        self.app_counts.clear()
+        self._app_keys = []
+        self._credentials = {}
+        self._sorted_ids = None
+        self._expiry = None
+        self._identities = None
+
+    def rebuild(self, credentials: dict):
+        """Index every credential from scratch"""
+        self.clear()
+        self._credentials = credentials
+        for cred_id, cred in credentials.items():
+            self.add(cred_id, cred)
+
+    def _keys(self, cred):
+        """Return the (index, key) pairs a credential is filed under"""
+        keys = [(self.by_app, app_key(cred.app))]
+        if cred.user_name:
+            keys.append((self.by_user, cred.user_name.casefold()))
+        host = host_key(cred.base_url)
+        if host:
+            keys.append((self.by_host, host))
+        return keys
+
+    def add(self, cred_id: str, cred):
+        """Index one credential"""
+        for index, key in self._keys(cred):
+            if index is self.by_app and key not in index:
+                insort(self._app_keys, key)
+            index[key].add(cred_id)
+        self.app_counts[cred.app] += 1
+        if self._sorted_ids is not None:
+            insort(self._sorted_ids, cred_id)
+        if self._expiry is not None:
+            expires_at = expiry_timestamp(cred.expires)
+            if expires_at is not None:
+                insort(self._expiry, (expires_at, cred_id))
+        if self._identities is not None:
+            self._identities.setdefault(identity_key(cred.app, cred.user_name, cred.base_url), set()).add(cred_id)
+
+    def remove(self, cred_id: str, cred):
+        """Remove one credential from the indexes, using the field values it was added with"""
+        for index, key in self._keys(cred):
+            ids = index.get(key)
+            if ids is None:
+                continue
+            ids.discard(cred_id)
+            if not ids:
+                del index[key]
+                if index is self.by_app:
+                    _remove_sorted(self._app_keys, key)
+        self.app_counts[cred.app] -= 1
+        if self.app_counts[cred.app] <= 0:
+            del self.app_counts[cred.app]
+        if self._sorted_ids is not None:
+            _remove_sorted(self._sorted_ids, cred_id)
+        if self._expiry is not None:
+            expires_at = expiry_timestamp(cred.expires)
+            if expires_at is not None:
+                _remove_sorted(self._expiry, (expires_at, cred_id))
+        if self._identities is not None:
+            key = identity_key(cred.app, cred.user_name, cred.base_url)
+            ids = self._identities.get(key)
+            if ids is not None:
+                ids.discard(cred_id)
+                if not ids:
+                    del self._identities[key]
+
+    def page_ids(self, after: Optional[str], limit: int) -> List[str]:
+        """Return up to limit IDs in sorted order, starting after the given ID"""
+        if self._sorted_ids is None:
+            self._sorted_ids = sorted(self._credentials)
+        start = bisect_right(self._sorted_ids, after) if after is not None else 0
+        return self._sorted_ids[start:start + limit]
+
+    def expiring(self, before: float) -> List[Tuple[float, str]]:
+        """Return the (expiry timestamp, ID) pairs expiring at or before the given time, soonest first"""
+        if self._expiry is None:
+            self._expiry = sorted(
+                (expires_at, cred_id)
+                for cred_id, cred in self._credentials.items()
+                if (expires_at := expiry_timestamp(cred.expires)) is not None
+            )
+        return self._expiry[:bisect_right(self._expiry, before, key=lambda entry: entry[0])]
+
+    def find_identity(self, key: Tuple[str, str, str]) -> Set[str]:
+        """Return the IDs of the credentials with the given identity_key()"""
+        if self._identities is None:
+            self._identities = {}
+            for cred_id, cred in self._credentials.items():
+                self._identities.setdefault(identity_key(cred.app, cred.user_name, cred.base_url),
+                                            set()).add(cred_id)
+        return self._identities.get(key, set())
+
+    def expired_ids(self, now: float) -> Set[str]:
+        """Return the IDs of credentials whose expiry time has passed"""
+        return {cred_id for expires_at, cred_id in self.expiring(now) if expires_at < now}
+
+    def _prefix_ids(self, prefix: str) -> Set[str]:
+        """Return the IDs of every credential whose app starts with prefix"""
+        prefix = app_key(prefix)
+        ids: Set[str] = set()
+        pos = bisect_left(self._app_keys, prefix)
+        while pos < len(self._app_keys) and self._app_keys[pos].startswith(prefix):
+            ids |= self.by_app[self._app_keys[pos]]
+            pos += 1
+        return ids
+
+    def find(self, app: Optional[str] = None, user_name: Optional[str] = None,
+             host: Optional[str] = None, prefix: Optional[str] = None) -> Set[str]:
+        """Return the IDs matching every given criterion (app and user_name are case-insensitive)"""
+        candidates: List[Set[str]] = []
+        if app is not None:
+            candidates.append(self.by_app.get(app_key(app), set()))
+        if user_name is not None:
+            candidates.append(self.by_user.get(user_name.casefold(), set()))
+        if host is not None:
+            candidates.append(self.by_host.get(host_key(host) or host.lower(), set()))
+        if prefix is not None:
+            candidates.append(self._prefix_ids(prefix))
+        if not candidates:
+            raise ValueError("At least one of app, user_name, host or prefix is required")
+
+        # Intersect starting from the smallest set so the cost tracks the result size
+        candidates.sort(key=len)
+        result = set(candidates[0])
+        for ids in candidates[1:]:
+            if not result:
+                break
+            result.intersection_update(ids)
+        return result
@@ -0,0 +1,264 @@
+"""
+Append-only journal storage backend
+
+Instead of rewriting credentials.json on every change, each mutation appends a
+single JSON-lines record to credentials.json.journal. credentials.json becomes
+a snapshot that is rebuilt from the journal ("compacted") in the background
+once the journal grows past a size threshold or a ratio of the snapshot size.
+State is rebuilt by loading the snapshot and replaying the journal on top of
+it.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import metrics
+from .server import CredentialRecord, CredentialStore, fsync_dir, get_credentials_path
+
+# Compact once the journal is at least this large...
+DEFAULT_COMPACT_MIN_BYTES = 1024 * 1024
+# ...or at least this fraction of the snapshot size (mostly superseded records)
+DEFAULT_COMPACT_RATIO = 0.5
+# Journals smaller than this are never compacted for their ratio alone, so a
+# small store isn't rewritten after every write
+COMPACT_RATIO_FLOOR_BYTES = 64 * 1024
+
+
+class JournalCredentialStore(CredentialStore):
+    """Credential store whose writes cost O(1) regardless of store size"""
+
+    backend_name = "journal"
+
+    def __init__(self, store_path: Optional[str] = None, read_only: bool = True,
+                 compact_min_bytes: int = DEFAULT_COMPACT_MIN_BYTES,
+                 compact_ratio: float = DEFAULT_COMPACT_RATIO,
+                 background_compaction: bool = True, **kwargs):
+        path = Path(store_path) if store_path else get_credentials_path()
+        self.journal_path = path.with_name(path.name + ".journal")
+
+        self.compact_min_bytes = compact_min_bytes
+        self.compact_ratio = compact_ratio
+        self.background_compaction = background_compaction
+        self.compactions = 0
+        self._compaction_thread: Optional[threading.Thread] = None
+
+        # How far into which journal file self.credentials has been replayed
+        self._journal_ino: Optional[int] = None
+        self._journal_offset = 0
+
+        super().__init__(store_path, read_only, **kwargs)
+
+    def _ensure_file_exists(self):
+        """Create the snapshot and journal files if they don't exist"""
+        super()._ensure_file_exists()
+        os.close(os.open(self.journal_path, os.O_RDWR | os.O_CREAT, 0o600))
+
+    @metrics.timed("operation")
+    def load_credentials(self, force: bool = False):
+        """Load the snapshot and replay the journal, reading only the new tail when possible"""
+        with self._shared_lock():
+            if self._watch_hit(force):
+                self.cache_hits += 1
+                return
+            generation = self._watch_generation
+
+            snapshot_fingerprint = self._file_fingerprint()
+            try:
+                journal_stat = os.stat(self.journal_path)
+                journal_ino, journal_size = journal_stat.st_ino, journal_stat.st_size
+            except FileNotFoundError:
+                journal_ino, journal_size = None, 0
+
+            if (not force
+                    and self._cache_fingerprint is not None
+                    and snapshot_fingerprint == self._cache_fingerprint
+                    and journal_ino == self._journal_ino
+                    and journal_size >= self._journal_offset):
+                # Same snapshot and the journal only grew: apply just the new records
+                if journal_size > self._journal_offset:
+                    self._replay_journal(self._journal_offset)
+                    self._reapply_pending()
+                self.cache_hits += 1
+                self._watch_loaded(generation)
+                return
+
+            self.cache_misses += 1
+            self._cache_fingerprint = None
+            try:
+                self._load_error = None
+                self._reset_credentials(self._read_snapshot())
+                self._journal_ino = journal_ino
+                self._replay_journal(0)
+                self._reapply_pending()
+                self._cache_fingerprint = self._cacheable(snapshot_fingerprint)
+                self._watch_loaded(generation)
+            except (json.JSONDecodeError, Exception) as e:
+                print(f"Warning: Could not load credentials file: {e}")
+                self._reset_credentials({})
+                self._load_error = e
+
+    def _reapply_pending(self):
+        """Put changes queued for group commit back on top of records other processes appended"""
+        if self._pending:
+            self._reset_credentials(self._with_pending(dict(self.credentials)))
+
+    def watched_files(self) -> List[Path]:
+        """Report changes to the journal as well as the snapshot"""
+        return [self.store_path, self.journal_path]
+
+    def _read_snapshot(self) -> Dict[str, CredentialRecord]:
+        """Parse the snapshot file"""
+        if not self.store_path.exists():
+            return {}
+        with open(self.store_path, 'rb') as f:
+            credentials = self._parse_file(f)
+            metrics.add("bytes_read", f.tell())
+        return credentials
+
+    def _replay_journal(self, offset: int):
+        """Apply journal records from offset onwards to self.credentials"""
+        try:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        metrics.add("bytes_read", len(data))
+
+        # A record without its trailing newline was torn by a crash mid-append
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                self._apply_record(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"Warning: Skipping invalid journal record: {e}")
+        self._journal_offset = offset + end
+
+    def _apply_record(self, record: dict):
+        """Apply one journal record"""
+        op = record["op"]
+        if op == "put":
+            self._put(record["id"], CredentialRecord.from_dict(record["credential"]))
+        elif op == "delete":
+            self._drop(record["id"])
+        else:
+            raise ValueError(f"Unknown journal operation: {op}")
+
+    @metrics.timed("operation", "flush")
+    def _flush_changes(self, changes: List[Tuple[Dict[str, CredentialRecord], List[str]]]):
+        """Append one record per changed credential to the journal and fsync it once"""
+        records = []
+        for upserts, deletes in changes:
+            records.extend(
+                {"op": "put", "id": cred_id, "credential": cred.to_dict()}
+                for cred_id, cred in upserts.items()
+            )
+            records.extend({"op": "delete", "id": cred_id} for cred_id in deletes)
+        payload = "".join(json.dumps(record) + "\n" for record in records).encode()
+
+        with self._write_lock():
+            fd = os.open(self.journal_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                size = os.fstat(fd).st_size
+                # Terminate a torn record so it can't swallow ours
+                if size and os.pread(fd, 1, size - 1) != b"\n":
+                    payload = b"\n" + payload
+                os.write(fd, payload)
+                with metrics.timer("operation", "fsync"):
+                    os.fsync(fd)
+                metrics.add("bytes_written", len(payload))
+                self.fsyncs += 1
+                journal_stat = os.fstat(fd)
+            finally:
+                os.close(fd)
+
+            # The caller loaded under this same lock, so we are caught up
+            self._journal_ino = journal_stat.st_ino
+            self._journal_offset = journal_stat.st_size
+
+        if self._should_compact(journal_stat.st_size):
+            self._schedule_compaction()
+
+    def save_credentials(self):
+        """Persist the full in-memory state by compacting it into a new snapshot"""
+        self.compact()
+
+    def _should_compact(self, journal_size: int) -> bool:
+        """Check the journal against the size threshold, then the ratio threshold"""
+        if journal_size >= self.compact_min_bytes:
+            return True
+        if journal_size < min(COMPACT_RATIO_FLOOR_BYTES, self.compact_min_bytes):
+            return False
+        try:
+            snapshot_size = self.store_path.stat().st_size
+        except FileNotFoundError:
+            snapshot_size = 0
+        return journal_size >= self.compact_ratio * snapshot_size
+
+    def _schedule_compaction(self):
+        """Compact in a background thread unless one is already running"""
+        if not self.background_compaction:
+            self.compact()
+            return
+        if self._compaction_thread and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(
+            target=self._run_compaction, name="credential-journal-compaction", daemon=True
+        )
+        self._compaction_thread.start()
+
+    def _run_compaction(self):
+        """Background thread body"""
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"Error compacting credential journal: {e}")
+
+    def wait_for_compaction(self, timeout: Optional[float] = None):
+        """Block until a running background compaction finishes"""
+        if self._compaction_thread:
+            self._compaction_thread.join(timeout)
+
+    @metrics.timed("operation")
+    def compact(self):
+        """Fold the journal into a fresh snapshot and truncate it"""
+        if self.read_only:
+            raise RuntimeError("Cannot save credentials in read-only mode")
+
+        with self._write_lock():
+            self.load_credentials()
+            if self._load_error is not None:
+                raise RuntimeError(f"Refusing to overwrite unreadable credentials file: {self._load_error}")
+            data = {
+                cred_id: cred.to_dict()
+                for cred_id, cred in self.credentials.items()
+            }
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.store_path.parent, prefix=f".{self.store_path.name}.")
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(data, f, indent=2)
+                    f.flush()
+                    with metrics.timer("operation", "fsync"):
+                        os.fsync(f.fileno())
+                    metrics.add("bytes_written", f.tell())
+                self._save_quarantine()
+                os.replace(tmp_path, self.store_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+
+            # Make the rename durable before dropping the records it replaces
+            fsync_dir(self.store_path.parent)
+            os.truncate(self.journal_path, 0)
+
+            self._journal_offset = 0
+            self._cache_fingerprint = self._cacheable(self._file_fingerprint())
+            self.compactions += 1
@@ -0,0 +1,276 @@
+"""
+Streaming loader for credentials.json
+
+json.load() materializes the whole document before a single record is built,
+so loading a store used to hold two full copies of it at once, and one
+malformed entry made the whole file unreadable. iter_credentials() instead
+reads the file in chunks and decodes one top-level entry at a time, so only
+the records themselves (plus one chunk) stay in memory.
+
+Each entry is checked as it arrives. An entry that decodes but isn't a valid
+credential, or a stretch of text that doesn't decode at all, is reported as a
+QuarantinedRecord and skipped; loading resumes at the next entry. Older stores
+never checked an entry's "id" field against its key, so an entry whose id is
+missing or different takes its key as ID and is reported in LoadReport.rekeyed.
+"""
+
+import codecs
+import json
+import re
+from datetime import datetime
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from .server import CredentialRecord
+
+CHUNK_SIZE = 64 * 1024
+
+# An entry that doesn't decode within this many bytes is treated as malformed
+MAX_ENTRY_SIZE = 1024 * 1024
+
+REQUIRED_FIELDS = ("app", "id", "base_url", "access_token")
+OPTIONAL_FIELDS = ("user_name", "expires")
+_OPTIONAL_TYPES = (str, type(None))
+
+_WHITESPACE = re.compile(r"\s*")
+# Where the next top-level entry starts: a comma, then a key and an object
+_NEXT_ENTRY = re.compile(r',\s*(?="(?:[^"\\]|\\.)*"\s*:\s*\{)')
+
+_decoder = json.JSONDecoder()
+
+
+def _last_entry_end(text: str, start: int, end: int) -> int:
+    """Return the position of the last separator between entries in text[start:end], or -1"""
+    while True:
+        end = text.rfind(",", start, end)
+        if end < 0:
+            return end
+        before = end - 1
+        while before > start and text[before] in " \t\r\n":
+            before -= 1
+        if text[before] == "}" and _NEXT_ENTRY.match(text, end):
+            return end
+
+
+class QuarantinedRecord(NamedTuple):
+    """A stored entry that could not be loaded"""
+    key: Optional[str]
+    error: str
+    raw: str
+
+
+class LoadReport:
+    """What iter_credentials found besides valid records"""
+
+    def __init__(self):
+        self.quarantined: List[QuarantinedRecord] = []
+        # Whether the document's closing brace was reached; a file that ends
+        # early was cut short and must not be rewritten from what was read
+        self.complete = False
+        # (key, stored id) of the entries whose id field was missing or differed from their key
+        self.rekeyed: List[Tuple[str, Optional[str]]] = []
+
+
+def _field_problem(key: str, data) -> str:
+    """Describe what is wrong with an entry check_record() rejected"""
+    if not isinstance(data, dict):
+        return "credential must be a JSON object"
+    for field in REQUIRED_FIELDS:
+        if not isinstance(data.get(field), str):
+            return f"credential field {field!r} must be a string"
+    for field in OPTIONAL_FIELDS:
+        if not isinstance(data.get(field), (str, type(None))):
+            return f"credential field {field!r} must be a string or null"
+    return "credential ID must be a string"
+
+
+def check_record(key: str, data, report: Optional[LoadReport] = None) -> CredentialRecord:
+    """Build a record from one stored entry, raising ValueError if it isn't a valid credential.
+
+    An entry whose id field is missing or differs from its key gets the key
+    as ID (the store finds it by its key) and is added to report.rekeyed.
+    """
+    # One flat test for the common, valid case; runs once per stored record
+    if not (type(data) is dict and type(data.get("app")) is str and data.get("id") == key
+            and type(data.get("base_url")) is str and type(data.get("access_token")) is str
+            and type(data.get("user_name")) in _OPTIONAL_TYPES and type(data.get("expires")) in _OPTIONAL_TYPES
+            and type(key) is str):
+        if type(data) is dict and type(key) is str and data.get("id") != key and type(data.get("id")) in _OPTIONAL_TYPES:
+            record = check_record(key, {**data, "id": key})
+            if report is not None:
+                report.rekeyed.append((key, data.get("id")))
+            return record
+        raise ValueError(_field_problem(key, data))
+    expires = data.get("expires")
+    if expires and expires != "never":
+        try:
+            datetime.fromisoformat(expires.replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError(f"expires must be ISO datetime format or 'never', got: {expires}")
+    return CredentialRecord.from_dict(data)
+
+
+class _Malformed(ValueError):
+    pass
+
+
+class _ChunkReader:
+    """A decoded text buffer over a binary file, refilled a chunk at a time"""
+
+    def __init__(self, f, chunk_size: int):
+        self._file = f
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        # Start of the entry being read; text before it can be dropped
+        self.mark = 0
+        self.eof = False
+        # Whether skip_entry() found the document's closing brace
+        self.closed = False
+
+    def fill(self) -> bool:
+        """Drop the text before the mark and append the next chunk; False at end of file"""
+        if self.eof:
+            return False
+        data = self._file.read(self._chunk_size)
+        self.eof = not data
+        self.buffer = self.buffer[self.mark:] + self._decoder.decode(data, final=self.eof)
+        self.pos -= self.mark
+        self.mark = 0
+        return not self.eof
+
+    def skip_whitespace(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self.fill():
+                return
+
+    def peek(self) -> str:
+        self.skip_whitespace()
+        return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise _Malformed(f"expected {char!r}")
+        self.pos += 1
+
+    def decode(self):
+        """Decode the JSON value at the current position, reading more text as needed"""
+        self.skip_whitespace()
+        while True:
+            try:
+                value, self.pos = _decoder.raw_decode(self.buffer, self.pos)
+                return value
+            except json.JSONDecodeError as e:
+                # Running out of text just means the entry continues in the next
+                # chunk, unless this is the end of the file or the entry has
+                # grown implausibly large
+                truncated = e.pos >= len(self.buffer) - 6 or e.msg.startswith("Unterminated string")
+                if not truncated or len(self.buffer) - self.pos > MAX_ENTRY_SIZE or not self.fill():
+                    raise _Malformed(e.msg) from None
+
+    def decode_batch(self) -> Optional[dict]:
+        """Decode every whole entry from here to the last entry separator in the buffer at once.
+
+        This is the fast path; returns None, leaving the position alone, if
+        there is no whole entry before the first malformed one.
+        """
+        if len(self.buffer) - self.pos < self._chunk_size // 2:
+            self.fill()
+        end = _last_entry_end(self.buffer, self.pos, len(self.buffer))
+        while end > 0:
+            try:
+                batch = json.loads("{" + self.buffer[self.pos:end] + "}")
+            except json.JSONDecodeError as e:
+                # Retry with just the entries before the error
+                end = _last_entry_end(self.buffer, self.pos, min(self.pos + e.pos - 1, end))
+                continue
+            self.pos = end
+            return batch
+        return None
+
+    def skip_entry(self) -> Tuple[str, bool]:
+        """Skip from the mark to the start of the next entry.
+
+        Returns the skipped text and whether another entry follows.
+        """
+        self.pos = self.mark
+        while True:
+            match = _NEXT_ENTRY.search(self.buffer, self.pos)
+            if match:
+                raw = self.buffer[self.pos:match.start()]
+                self.pos = match.end()
+                return raw, True
+            if not self.fill():
+                raw = self.buffer[self.pos:].rstrip()
+                # Leave out the brace that closes the whole document
+                self.closed = raw.endswith("}")
+                raw = raw[:-1].rstrip() if self.closed else raw
+                self.pos = len(self.buffer)
+                return raw, False
+
+
+def iter_credentials(f, report: LoadReport,
+                     chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, CredentialRecord]]:
+    """Yield (id, record) for each valid entry of a credentials.json file opened in binary mode.
+
+    Invalid entries are added to report.quarantined. Raises ValueError if the
+    file isn't a JSON object at all.
+    """
+    quarantine = report.quarantined
+    reader = _ChunkReader(f, chunk_size)
+    if reader.peek() != "{":
+        raise ValueError("credentials file must contain a JSON object")
+    reader.pos += 1
+    if reader.peek() == "}":
+        report.complete = True
+        return
+
+    while True:
+        reader.skip_whitespace()
+        reader.mark = reader.pos
+        batch = reader.decode_batch()
+        if batch is not None:
+            entries = batch.items()
+        else:
+            # Slow path: one entry at a time, so a malformed one can be set aside
+            key = None
+            try:
+                key = reader.decode()
+                if not isinstance(key, str):
+                    raise _Malformed("expected a credential ID")
+                reader.expect(":")
+                entries = ((key, reader.decode()),)
+            except _Malformed as e:
+                # Set the undecodable text aside and resume at the next entry
+                raw, found = reader.skip_entry()
+                quarantine.append(QuarantinedRecord(key if isinstance(key, str) else None,
+                                                    f"invalid JSON: {e}", raw))
+                if not found:
+                    report.complete = reader.closed
+                    return
+                continue
+
+        for key, data in entries:
+            try:
+                record = check_record(key, data, report)
+            except (ValueError, KeyError) as e:
+                quarantine.append(QuarantinedRecord(key, str(e), json.dumps(data)))
+            else:
+                yield key, record
+
+        separator = reader.peek()
+        if separator == ",":
+            reader.pos += 1
+        elif separator == "}":
+            report.complete = True
+            return
+        elif not separator:
+            return
+        else:
+            reader.mark = reader.pos
+            raw, found = reader.skip_entry()
+            quarantine.append(QuarantinedRecord(None, "invalid JSON: expected ',' or '}'", raw))
+            if not found:
+                report.complete = reader.closed
+                return
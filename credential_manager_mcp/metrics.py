@@ -0,0 +1,241 @@
+"""
+Low-overhead latency and I/O metrics
+
+A process-wide Metrics instance collects latency histograms (per store
+operation, per MCP tool and for lock waits) and counters (bytes read and
+written, tool errors). Collection is off unless CREDENTIAL_MANAGER_METRICS is
+set; when off, every instrumentation point is a single attribute check.
+"""
+
+import functools
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Histogram families and their Prometheus metric names and label names
+FAMILIES = {
+    "operation": ("credential_manager_operation_seconds", "operation"),
+    "tool": ("credential_manager_tool_seconds", "tool"),
+    "lock_wait": ("credential_manager_lock_wait_seconds", "lock"),
+}
+
+PROMETHEUS_PREFIX = "credential_manager_"
+
+
+def metrics_enabled_from_environment() -> bool:
+    """Read the CREDENTIAL_MANAGER_METRICS switch"""
+    return os.getenv("CREDENTIAL_MANAGER_METRICS", "false").lower() in ("true", "1", "yes")
+
+
+class Histogram:
+    """Latency histogram with fixed buckets"""
+
+    __slots__ = ("buckets", "count", "sum", "max")
+
+    def __init__(self):
+        # One slot per bound plus the overflow (+Inf) slot; not cumulative
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket it falls in"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_seconds": self.sum,
+            "mean_seconds": self.sum / self.count if self.count else 0.0,
+            "p50_seconds": self.quantile(0.5),
+            "p99_seconds": self.quantile(0.99),
+            "max_seconds": self.max,
+        }
+
+
+class _Timer:
+    """Context manager that records its duration into a histogram"""
+
+    __slots__ = ("metrics", "key", "start")
+
+    def __init__(self, metrics: "Metrics", key: Tuple[str, str]):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.key[0], self.key[1], time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    """Shared do-nothing timer handed out while metrics are off"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Process-wide metrics registry"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop everything collected so far"""
+        with self._lock:
+            self.histograms: Dict[Tuple[str, str], Histogram] = {}
+            self.counters: Dict[str, int] = {}
+            self.tool_errors: Dict[str, int] = {}
+
+    def observe(self, family: str, name: str, seconds: float):
+        """Record one duration"""
+        with self._lock:
+            histogram = self.histograms.get((family, name))
+            if histogram is None:
+                histogram = self.histograms[(family, name)] = Histogram()
+            histogram.observe(seconds)
+
+    def add(self, counter: str, amount: int = 1):
+        """Increase a counter (no-op while disabled)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def _tool_error(self, tool: str):
+        with self._lock:
+            self.tool_errors[tool] = self.tool_errors.get(tool, 0) + 1
+
+    def timer(self, family: str, name: str):
+        """Return a context manager that times its block (a no-op while disabled)"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, (family, name))
+
+    def timed(self, family: str, name: Optional[str] = None):
+        """Decorator that times every call of a function.
+
+        The switch is checked on each call, so toggling `enabled` takes effect
+        immediately; while off the wrapper only adds that check.
+        """
+        def decorator(func):
+            key = (family, name or func.__name__)
+            counts_errors = family == "tool"
+
+            def finish(start: float, result=None, failed: bool = False):
+                self.observe(key[0], key[1], time.perf_counter() - start)
+                # Tools report most failures in the result rather than raising
+                if counts_errors and (failed or isinstance(result, dict) and "error" in result):
+                    self._tool_error(key[1])
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    start = time.perf_counter()
+                    try:
+                        result = await func(*args, **kwargs)
+                    except BaseException:
+                        finish(start, failed=True)
+                        raise
+                    finish(start, result)
+                    return result
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException:
+                    finish(start, failed=True)
+                    raise
+                finish(start, result)
+                return result
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> dict:
+        """Return every metric as plain data"""
+        with self._lock:
+            result: Dict[str, dict] = {family: {} for family in FAMILIES}
+            for (family, name), histogram in sorted(self.histograms.items()):
+                result.setdefault(family, {})[name] = histogram.to_dict()
+            for name, stats in result["tool"].items():
+                stats["errors"] = self.tool_errors.get(name, 0)
+            counters = dict(sorted(self.counters.items()))
+        return {"enabled": self.enabled, **result, "counters": counters}
+
+    def prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+            tool_errors = sorted(self.tool_errors.items())
+
+        for family, (metric, label) in FAMILIES.items():
+            entries = [(name, histogram) for (fam, name), histogram in histograms if fam == family]
+            if not entries:
+                continue
+            lines.append(f"# TYPE {metric} histogram")
+            for name, histogram in entries:
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.buckets):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{label}="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{{label}="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{{label}="{name}"}} {histogram.sum}')
+                lines.append(f'{metric}_count{{{label}="{name}"}} {histogram.count}')
+
+        if tool_errors:
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}tool_errors_total counter")
+            lines.extend(f'{PROMETHEUS_PREFIX}tool_errors_total{{tool="{name}"}} {value}' for name, value in tool_errors)
+        for key, value in counters:
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}{key}_total counter")
+            lines.append(f"{PROMETHEUS_PREFIX}{key}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+# The process-wide registry every store and tool reports to
+metrics = Metrics(enabled=metrics_enabled_from_environment())
@@ -0,0 +1,98 @@
+"""
+Cache of serialized tool and resource answers
+
+list_credentials, credential://help and credential://store/info used to
+rebuild (and FastMCP to re-serialize) the same answer on every call, although
+it only changes when the store does. Each store's AsyncCredentialStore has a
+ResponseCache holding the serialized JSON text, keyed by the store version,
+the read-only mode and the call's arguments, so a repeated read is a
+dictionary lookup. Every write bumps the store version, so a write makes
+exactly the answers built before it unreachable; they are dropped as soon as
+an answer for the new version is stored.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import pydantic_core
+
+
+def get_response_cache_size() -> int:
+    """Get how many answers to keep from the environment (0 turns the cache off)"""
+    return int(os.getenv("CREDENTIAL_MANAGER_RESPONSE_CACHE_SIZE", "64"))
+
+
+def serialize(response) -> str:
+    """Serialize an answer exactly the way FastMCP serializes a returned dict"""
+    return pydantic_core.to_json(response, fallback=str, indent=2).decode()
+
+
+class ResponseCache:
+    """Bounded LRU of serialized answers.
+
+    Keys are (version, ...): the store version the answer was built from, or
+    None for answers that don't depend on the store's contents.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = get_response_cache_size() if max_entries is None else max_entries
+        self._entries: "OrderedDict[Tuple, str]" = OrderedDict()
+        # Newest store version an answer was stored for
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[str]:
+        """Return the stored answer for key, or None"""
+        with self._lock:
+            text = self._entries.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key: Tuple, response) -> str:
+        """Serialize (unless it is text already) and store an answer; returns the serialized text"""
+        text = response if isinstance(response, str) else serialize(response)
+        if self.max_entries <= 0:
+            return text
+        version = key[0]
+        with self._lock:
+            if version is not None and self._version is not None:
+                if version < self._version:
+                    # Built from a store that has moved on; nobody will ask for it
+                    return text
+                if version > self._version:
+                    self._drop_versions(version)
+            if version is not None:
+                self._version = version
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return text
+
+    def _drop_versions(self, version: int):
+        """Drop the answers built from versions before version"""
+        for key in [key for key in self._entries if key[0] is not None and key[0] < version]:
+            del self._entries[key]
+
+    def clear(self):
+        """Drop every stored answer"""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def stats(self) -> dict:
+        """Return size and hit/miss counters"""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses
+        }
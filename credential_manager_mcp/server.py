@@ -1,25 +1,30 @@
+import asyncio
+import atexit
+import base64
+import importlib
 import json
 import os
+import sys
 import uuid
 import fcntl
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
 from datetime import datetime
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 from pathlib import Path
-from collections import Counter
 
 from fastmcp import FastMCP
-from pydantic import BaseModel
-from contextlib import contextmanager
-
-@contextmanager
-def fcntl_lock(file_path, mode='r'):
-    """Context manager for file locking"""
-    with open(file_path, mode) as f:
-        fcntl.flock(f.fileno(), fcntl.LOCK_EX if 'w' in mode else fcntl.LOCK_SH)
-        try:
-            yield f
-        finally:
-            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+from pydantic import AnyUrl, BaseModel
+from contextlib import asynccontextmanager, contextmanager
+
+from .encryption import DecryptionError, TokenCipher, get_cipher, is_encrypted
+from .index import CredentialIndex, app_key, expiry_timestamp, identity_key
+from .metrics import metrics
+from .transfer import FORMATS, ImportReport, format_records, read_chunks
 
 # Data models
 class Credential(BaseModel):
@@ -39,19 +44,239 @@ class Credential(BaseModel):
             except ValueError:
                 raise ValueError(f"expires must be ISO datetime format (YYYY-MM-DDTHH:MM:SS) or 'never', got: {self.expires}")
 
+class CredentialRecord:
+    """Compact in-memory form of a Credential.
+    
+    Records are validated once, when they are written; loading, listing and
+    lookups use these plain slotted objects, and Credential models are only
+    built at the API boundary.
+    """
+    __slots__ = ("app", "id", "base_url", "access_token", "user_name", "expires")
+    
+    def __init__(self, app: str, id: str, base_url: str, access_token: str,
+                 user_name: Optional[str] = None, expires: Optional[str] = None):
+        self.app = app
+        self.id = id
+        self.base_url = base_url
+        self.access_token = access_token
+        self.user_name = user_name
+        self.expires = expires
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "CredentialRecord":
+        """Build a record from stored data without revalidating it"""
+        try:
+            return cls(data["app"], data["id"], data["base_url"], data["access_token"],
+                       data.get("user_name"), data.get("expires"))
+        except KeyError as e:
+            raise ValueError(f"credential is missing required field {e.args[0]!r}")
+    
+    @classmethod
+    def validated(cls, **fields) -> "CredentialRecord":
+        """Build a record, running the full Credential validation"""
+        return cls(**Credential(**fields).model_dump())
+    
+    def to_dict(self) -> dict:
+        """Return the stored (JSON) form of the record"""
+        return {
+            "app": self.app,
+            "id": self.id,
+            "base_url": self.base_url,
+            "access_token": self.access_token,
+            "user_name": self.user_name,
+            "expires": self.expires
+        }
+
+def _record_fields(record: CredentialRecord) -> tuple:
+    """Return every field of a record, for comparing two versions of it"""
+    return (record.app, record.id, record.base_url, record.access_token, record.user_name, record.expires)
+
+class CredentialInput(BaseModel):
+    """A new credential in a batch add"""
+    app: str
+    base_url: str
+    access_token: str
+    user_name: Optional[str] = None
+    expires: Optional[str] = None
+
+class CredentialUpdate(BaseModel):
+    """Changes to one credential in a batch update; omitted fields are left as they are"""
+    credential_id: str
+    app: Optional[str] = None
+    base_url: Optional[str] = None
+    access_token: Optional[str] = None
+    user_name: Optional[str] = None
+    expires: Optional[str] = None
+
 def get_credentials_path() -> Path:
     """Get the credentials storage path"""
     return Path.home() / '.credential-manager-mcp' / 'credentials.json'
 
+# Files modified this recently may still change without their mtime moving
+# (filesystem timestamps are only as fine as the kernel clock tick), so their
+# fingerprint is not trusted for cache validation.
+RACY_MTIME_WINDOW_NS = 50_000_000
+
+FileFingerprint = Tuple[int, int, int]
+
+DURABILITY_MODES = ("fsync", "group")
+
+def get_durability_mode() -> str:
+    """Get the write durability mode from the environment"""
+    mode = os.getenv("CREDENTIAL_MANAGER_DURABILITY", "fsync").lower()
+    if mode not in DURABILITY_MODES:
+        raise ValueError(f"CREDENTIAL_MANAGER_DURABILITY must be one of {DURABILITY_MODES}, got: {mode}")
+    return mode
+
+def get_group_commit_delay() -> float:
+    """Get the group commit window in seconds from the environment"""
+    return float(os.getenv("CREDENTIAL_MANAGER_GROUP_COMMIT_MS", "5")) / 1000
+
+def get_lock_timeout() -> Optional[float]:
+    """Get how long to wait for the store lock, in seconds, from the environment (None waits forever)"""
+    value = os.getenv("CREDENTIAL_MANAGER_LOCK_TIMEOUT", "10")
+    return None if value.lower() in ("none", "") else float(value)
+
+class StoreBusyError(TimeoutError):
+    """Raised when the store lock could not be acquired within the lock timeout"""
+    
+    def __init__(self, timeout: float):
+        super().__init__(f"Credential store is busy: lock not acquired within {timeout:g}s; retry later")
+        self.timeout = timeout
+
+def fsync_dir(path: Path):
+    """Flush a directory entry so a rename inside it survives a crash"""
+    dir_fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+def encode_cursor(cred_id: str) -> str:
+    """Encode a pagination position as an opaque cursor"""
+    return base64.urlsafe_b64encode(cred_id.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> str:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+# Largest page list_credentials will return
+MAX_PAGE_SIZE = 1000
+
+# What import_credentials does with an item that matches a stored credential
+DUPLICATE_MODES = ("skip", "update")
+
+# Most credential changes remembered for changes_since(); older versions get a full answer
+MAX_TRACKED_CHANGES = 10_000
+
 class CredentialStore:
-    def __init__(self, store_path: Optional[str] = None, read_only: bool = True):
+    """Credential store backed by a single JSON file.
+    
+    This class is also the storage backend interface. Every backend keeps the
+    full set of credentials in memory (self.credentials, changed only through
+    _reset_credentials/_put/_drop so the indexes stay in sync) and overrides:
+    
+    - _ensure_file_exists(): create empty storage
+    - load_credentials(force): bring self.credentials up to date with storage
+    - _write_lock(keys): exclusive cross-process lock around load-modify-persist
+      (keys names the existing credential IDs the write touches, if known)
+    - _flush_changes(changes) or _persist(upserts, deletes): write mutations
+    - save_credentials(): write the whole in-memory state
+    
+    Backends that keep the whole-file layout in another file format only
+    override _parse_file(f) and _serialize().
+    
+    Backends are registered by name in STORAGE_BACKENDS.
+    """
+    backend_name = "json"
+    
+    # Fields an update may change ("id" is fixed at creation)
+    UPDATABLE_FIELDS = ("app", "base_url", "access_token", "user_name", "expires")
+    
+    def __init__(self, store_path: Optional[str] = None, read_only: bool = True,
+                 durability: Optional[str] = None, group_commit_delay: Optional[float] = None,
+                 lock_timeout: Optional[float] = None, cipher: Optional[TokenCipher] = None):
         if store_path:
             self.store_path = Path(store_path)
         else:
             self.store_path = get_credentials_path()
         
+        # Writers serialize on this separate lock file, so the data file itself
+        # is only ever replaced atomically and readers never see a partial write
+        self.lock_path = self.store_path.with_name(self.store_path.name + '.lock')
+        # Entries of the store file that failed to load are set aside here, in
+        # JSON lines, before a write replaces the file they came from
+        self.quarantine_path = self.store_path.with_name(self.store_path.name + '.quarantine')
+        
         self.read_only = read_only
-        self.credentials: Dict[str, Credential] = {}
+        self.credentials: Dict[str, CredentialRecord] = {}
+        # Secondary indexes over self.credentials; keep them in sync by going
+        # through _reset_credentials/_put/_drop rather than editing the dict
+        self._index = CredentialIndex()
+        # Credentials the expiry sweeper found expired, mapped to the expires
+        # value they had; listings mark them "expired" until that value changes
+        self.flagged_expired: Dict[str, str] = {}
+        # Entries skipped by the last load (loader.QuarantinedRecord)
+        self.quarantined: list = []
+        # Load warnings already given; every reparse finds the same entries again
+        self._load_warnings: Set[str] = set()
+        # Monotonic version of the in-memory credentials, bumped by every
+        # change. It starts from the clock (in microseconds), so versions handed
+        # out by an earlier run are always older than this run's.
+        self.version = time.time_ns() // 1000
+        # Credential ID -> version of its last change (deletions included),
+        # oldest first; changes after any version >= _changes_floor are all here
+        self._changes: "OrderedDict[str, int]" = OrderedDict()
+        self._changes_floor = self.version
+        
+        # "fsync": every write is durable before it returns.
+        # "group": writes within group_commit_delay are flushed with one fsync,
+        # which each of them waits for.
+        self.durability = durability or get_durability_mode()
+        if self.durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}, got: {self.durability}")
+        self.group_commit_delay = get_group_commit_delay() if group_commit_delay is None else group_commit_delay
+        self.fsyncs = 0
+        # Seconds to wait for the store lock before raising StoreBusyError,
+        # defaulting to CREDENTIAL_MANAGER_LOCK_TIMEOUT; float("inf") (or
+        # "none" in the environment) waits forever and is stored as None
+        self.lock_timeout = get_lock_timeout() if lock_timeout is None else lock_timeout
+        if self.lock_timeout == float("inf"):
+            self.lock_timeout = None
+        # Encrypts access tokens at rest; defaults to the key configured in the
+        # environment (None if there is none, and tokens are stored as given)
+        self.cipher = cipher if cipher is not None else get_cipher()
+        
+        # Threads of this process serialize on _state_lock; _lock_fd is the
+        # exclusive lock file descriptor while this store holds the writer lock
+        self._state_lock = threading.RLock()
+        self._lock_fd: Optional[int] = None
+        # Changes queued for the next group commit, which resolves
+        # _group_commit; _waiting.commit is the one this thread's write joined
+        self._pending: List[Tuple[Dict[str, CredentialRecord], List[str]]] = []
+        self._group_commit: Optional[Future] = None
+        self._flush_timer: Optional[threading.Timer] = None
+        self._waiting = threading.local()
+        self._load_error: Optional[Exception] = None
+        if self.durability == "group":
+            # Don't lose the last window of changes on a clean exit
+            atexit.register(self.flush)
+        
+        # Read-through cache state: the fingerprint of the file that
+        # self.credentials was parsed from, plus hit/miss counters
+        self._cache_fingerprint: Optional[FileFingerprint] = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # Set by an inotify StoreWatcher: while _watch_fresh is set, reads
+        # trust the cache without a stat; every change event bumps
+        # _watch_generation and clears it
+        self._watch_trusted = False
+        self._watch_fresh = False
+        self._watch_generation = 0
         
         # Ensure the storage directory exists
         self.store_path.parent.mkdir(parents=True, exist_ok=True)
@@ -61,208 +286,1375 @@ class CredentialStore:
     def _ensure_file_exists(self):
         """Create an empty credentials file if it doesn't exist"""
         if not self.store_path.exists():
-            with fcntl_lock(self.store_path, 'w') as f:
-                json.dump({}, f)
+            fd, tmp_path = tempfile.mkstemp(dir=self.store_path.parent, prefix=f".{self.store_path.name}.")
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump({}, f)
+                # link() fails if another instance created the file first
+                os.link(tmp_path, self.store_path)
+            except FileExistsError:
+                pass
+            finally:
+                os.unlink(tmp_path)
+    
+    def _file_fingerprint(self, fileno: Optional[int] = None) -> Optional[FileFingerprint]:
+        """Return (st_mtime_ns, st_size, st_ino) of the store file, or None if it is missing"""
+        try:
+            st = os.fstat(fileno) if fileno is not None else self.store_path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def _cacheable(self, fingerprint: Optional[FileFingerprint]) -> Optional[FileFingerprint]:
+        """Return the fingerprint if it is safe to validate the cache against it"""
+        if fingerprint is None or time.time_ns() - fingerprint[0] < RACY_MTIME_WINDOW_NS:
+            return None
+        return fingerprint
+    
+    def watched_files(self) -> List[Path]:
+        """Return the files whose changes a StoreWatcher should report"""
+        return [self.store_path]
+    
+    def attach_watcher(self, trusted: bool):
+        """Called by a starting StoreWatcher; trusted watchers let reads skip revalidation"""
+        self._watch_trusted = trusted
+        self.mark_changed()
+    
+    def detach_watcher(self):
+        """Called by a stopping StoreWatcher"""
+        self._watch_trusted = False
+        self.mark_changed()
+    
+    def mark_changed(self):
+        """Note that the store's files changed, so the next read must revalidate"""
+        self._watch_generation += 1
+        self._watch_fresh = False
+    
+    def _watch_hit(self, force: bool) -> bool:
+        """Whether a trusted watcher vouches for the cache (never for writers, who must check)"""
+        return not force and self._watch_fresh and self._lock_fd is None
+    
+    def _watch_loaded(self, generation: int):
+        """Trust the cache until the next change event if it was validated with no event since"""
+        self._watch_fresh = (self._watch_trusted and self._cache_fingerprint is not None
+                             and generation == self._watch_generation)
+    
+    def invalidate_cache(self):
+        """Drop the cached fingerprint so the next read reloads from disk"""
+        self._cache_fingerprint = None
+    
+    def cache_stats(self) -> dict:
+        """Return read-through cache hit/miss counters"""
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "valid": self._cache_fingerprint is not None
+        }
+    
+    @metrics.timed("operation")
+    def load_credentials(self, force: bool = False):
+        """Load credentials from JSON file, reusing the parsed cache while the file is unchanged"""
+        with self._state_lock:
+            if self._watch_hit(force):
+                self.cache_hits += 1
+                return
+            generation = self._watch_generation
+            if (not force and self._cache_fingerprint is not None
+                    and self._file_fingerprint() == self._cache_fingerprint):
+                self.cache_hits += 1
+                self._watch_loaded(generation)
+                return
+            self.cache_misses += 1
+            self._cache_fingerprint = None
+            
+            if self.store_path.exists():
+                try:
+                    self._load_error = None
+                    # Writers replace the file atomically, so no lock is needed to read it
+                    with open(self.store_path, 'rb') as f:
+                        # Fingerprint the open file so it matches what we parse
+                        fingerprint = self._file_fingerprint(f.fileno())
+                        credentials = self._parse_file(f)
+                    metrics.add("bytes_read", fingerprint[1] if fingerprint else 0)
+                    self._reset_credentials(self._with_pending(credentials))
+                    self._cache_fingerprint = self._cacheable(fingerprint)
+                    self._watch_loaded(generation)
+                except (json.JSONDecodeError, Exception) as e:
+                    print(f"Warning: Could not load credentials file: {e}")
+                    self._reset_credentials({})
+                    self._load_error = e
+            else:
+                self._reset_credentials(self._with_pending({}))
+                self._load_error = None
+    
+    def _with_pending(self, credentials: Dict[str, CredentialRecord]) -> Dict[str, CredentialRecord]:
+        """Lay the changes queued for group commit over credentials read from storage.
+        
+        Other processes can write while changes wait for their flush; they
+        are newer than anything on disk, so they stay on top.
+        """
+        for upserts, deletes in self._pending:
+            credentials.update(upserts)
+            for cred_id in deletes:
+                credentials.pop(cred_id, None)
+        return credentials
+    
+    def _parse_file(self, f) -> Dict[str, CredentialRecord]:
+        """Parse the store file, opened in binary mode, one entry at a time.
+        
+        Invalid entries are skipped and kept in self.quarantined; a file that
+        is cut short sets self._load_error.
+        """
+        from .loader import LoadReport, iter_credentials
+        
+        report = LoadReport()
+        credentials = dict(iter_credentials(f, report))
+        self._warn_load_report(report)
+        self.quarantined = report.quarantined
+        if not report.complete:
+            # Keep what could be read, but never rewrite a cut-short file from it
+            self._load_error = ValueError("credentials file ends before its closing brace")
+            self._warn_once(f"Could not load credentials file: {self._load_error}")
+        return credentials
+    
+    def _warn_load_report(self, report):
+        """Warn about the entries a load skipped or re-keyed"""
+        for entry in report.quarantined:
+            self._warn_once(f"Skipping invalid credential {entry.key or '(unknown ID)'}: {entry.error}")
+        for key, stored_id in report.rekeyed:
+            self._warn_once(f"Credential {key} has id {stored_id!r}; using {key!r}")
+    
+    def _warn_once(self, warning: str):
+        """Print a warning to stderr (stdout may be the MCP stream) unless it was already given"""
+        if warning not in self._load_warnings:
+            self._load_warnings.add(warning)
+            print(f"Warning: {warning}", file=sys.stderr)
+    
+    def _read_import(self, json_path: Path) -> Dict[str, CredentialRecord]:
+        """Read the valid records of a credentials.json file being imported into another backend.
+        
+        Invalid entries are appended to the file's quarantine file
+        (credentials.json.quarantine). Raises ValueError if the file isn't a
+        JSON object or ends before its closing brace, so the import can be
+        retried in full once the file is repaired.
+        """
+        from .loader import LoadReport, iter_credentials
+        
+        report = LoadReport()
+        with open(json_path, 'rb') as f:
+            records = dict(iter_credentials(f, report))
+        if not report.complete:
+            raise ValueError(f"{json_path} ends before its closing brace")
+        self._warn_load_report(report)
+        self._save_quarantine(report.quarantined, json_path.with_name(json_path.name + ".quarantine"))
+        return records
+    
+    def _save_quarantine(self, entries: Optional[list] = None, path: Optional[Path] = None):
+        """Append the quarantined entries (default: self.quarantined) to the quarantine file
+        (default: the store's) before the store file is replaced"""
+        own = entries is None
+        if own:
+            entries = self.quarantined
+        if not entries:
+            return
+        now = datetime.now().isoformat()
+        payload = "".join(
+            json.dumps({"key": entry.key, "error": entry.error, "raw": entry.raw, "quarantined_at": now}) + "\n"
+            for entry in entries
+        ).encode()
+        fd = os.open(path or self.quarantine_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, payload)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        if own:
+            self.quarantined = []
+    
+    def _serialize(self) -> bytes:
+        """Return the store file contents for the in-memory credentials"""
+        data = {
+            cred_id: cred.to_dict() 
+            for cred_id, cred in self.credentials.items()
+        }
+        return json.dumps(data, indent=2).encode()
     
-    def load_credentials(self):
-        """Load credentials from JSON file - always read from disk"""
-        if self.store_path.exists():
+    def _reset_credentials(self, credentials: Dict[str, CredentialRecord]):
+        """Replace the in-memory credentials and rebuild their indexes"""
+        old, self.credentials = self.credentials, credentials
+        self._index.rebuild(credentials)
+        if not old:
+            # First load (or the store was empty): nobody holds an older version worth diffing against
+            if credentials:
+                self._forget_changes()
+            return
+        changed = self._changed_ids(old, credentials)
+        if changed is None or len(changed) > MAX_TRACKED_CHANGES:
+            self._forget_changes()
+            return
+        for cred_id in changed:
+            for record in (old.get(cred_id), credentials.get(cred_id)):
+                if record is not None:
+                    self._note_changed(cred_id, record.app)
+    
+    def _changed_ids(self, old: Dict[str, CredentialRecord],
+                     new: Dict[str, CredentialRecord]) -> Optional[List[str]]:
+        """Return the IDs added, changed or removed between two loads (None if that can't be told cheaply)"""
+        changed = [cred_id for cred_id, cred in new.items()
+                   if (previous := old.get(cred_id)) is not cred
+                   and (previous is None or _record_fields(previous) != _record_fields(cred))]
+        changed.extend(cred_id for cred_id in old if cred_id not in new)
+        return changed
+    
+    def _put(self, cred_id: str, credential: CredentialRecord):
+        """Insert or replace one in-memory credential, updating the indexes"""
+        self._drop(cred_id)
+        self.credentials[cred_id] = credential
+        self._index.add(cred_id, credential)
+        self._note_changed(cred_id, credential.app)
+    
+    def _drop(self, cred_id: str):
+        """Remove one in-memory credential, updating the indexes"""
+        old = self.credentials.pop(cred_id, None)
+        if old is not None:
+            self._index.remove(cred_id, old)
+            self._note_changed(cred_id, old.app)
+    
+    def _note_changed(self, cred_id: str, app: str):
+        """Bump the version for a changed credential (call after the indexes are updated)"""
+        self.version += 1
+        self._changes[cred_id] = self.version
+        self._changes.move_to_end(cred_id)
+        # Listings show user_name only while an app has several credentials,
+        # so the other entries of an app going from one to two change too
+        if self._index.app_counts[app] <= 2:
+            for other_id in self._index.by_app.get(app_key(app), ()):
+                if other_id != cred_id and self.credentials[other_id].app == app:
+                    self._changes[other_id] = self.version
+                    self._changes.move_to_end(other_id)
+        while len(self._changes) > MAX_TRACKED_CHANGES:
+            _, self._changes_floor = self._changes.popitem(last=False)
+    
+    def _forget_changes(self):
+        """Bump the version for a change too large to track per credential"""
+        self.version += 1
+        self._changes.clear()
+        self._changes_floor = self.version
+    
+    def changed_ids_since(self, version: int) -> Optional[Set[str]]:
+        """Return the IDs changed or deleted after version, or None if that is no longer known.
+        
+        Doesn't revalidate against the file; call load_credentials() first.
+        """
+        with self._state_lock:
+            if not self._changes_floor <= version <= self.version:
+                return None
+            ids = set()
+            for cred_id, changed_at in reversed(self._changes.items()):
+                if changed_at <= version:
+                    break
+                ids.add(cred_id)
+            return ids
+    
+    def changes_since(self, version: int) -> Optional[Tuple[List[Dict], List[str]]]:
+        """Return the listing entries of credentials changed after version and the IDs
+        deleted since, or None if version is too old (or unknown) to answer"""
+        with self._state_lock:
+            self.load_credentials()
+            ids = self.changed_ids_since(version)
+            if ids is None:
+                return None
+            changed = [self._list_item(self.credentials[cred_id]) for cred_id in sorted(ids)
+                       if cred_id in self.credentials]
+            return changed, sorted(ids.difference(self.credentials))
+    
+    def _write_file(self):
+        """Atomically replace the store file with the in-memory credentials"""
+        if self._load_error is not None:
+            # Rewriting now would replace the unreadable file with a near-empty one
+            raise RuntimeError(f"Refusing to overwrite unreadable credentials file: {self._load_error}")
+        
+        # Ensure directory exists
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        data = self._serialize()
+        
+        with self._write_lock():
+            fd, tmp_path = tempfile.mkstemp(dir=self.store_path.parent, prefix=f".{self.store_path.name}.")
             try:
-                with open(self.store_path, 'r') as f:
-                    # Use file locking for safe reading
-                    fcntl.flock(f.fileno(), fcntl.LOCK_SH)
-                    try:
-                        data = json.load(f)
-                        self.credentials = {
-                            cred_id: Credential(**cred_data) 
-                            for cred_id, cred_data in data.items()
-                        }
-                    finally:
-                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-            except (json.JSONDecodeError, Exception) as e:
-                print(f"Warning: Could not load credentials file: {e}")
-                self.credentials = {}
-        else:
-            self.credentials = {}
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                    f.flush()
+                    with metrics.timer("operation", "fsync"):
+                        os.fsync(f.fileno())
+                    fingerprint = self._file_fingerprint(f.fileno())
+                self._save_quarantine()
+                os.replace(tmp_path, self.store_path)
+                metrics.add("bytes_written", fingerprint[1] if fingerprint else 0)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            fsync_dir(self.store_path.parent)
+            self.fsyncs += 1
+            # The in-memory dict now matches the file we just wrote
+            self._cache_fingerprint = self._cacheable(fingerprint)
     
+    @metrics.timed("operation")
     def save_credentials(self):
-        """Save credentials to JSON file with file locking"""
+        """Save credentials to JSON file via write-to-temp and atomic rename"""
         if self.read_only:
             raise RuntimeError("Cannot save credentials in read-only mode")
             
         try:
-            # Ensure directory exists
-            self.store_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Convert to dict for JSON serialization
-            data = {
-                cred_id: cred.model_dump() 
-                for cred_id, cred in self.credentials.items()
-            }
-            
-            # Use file locking for safe writing
-            with open(self.store_path, 'w') as f:
-                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-                try:
-                    json.dump(data, f, indent=2)
-                finally:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            self._write_file()
         except Exception as e:
+            self.invalidate_cache()
             print(f"Error saving credentials: {e}")
     
+    @contextmanager
+    def _write_lock(self, keys: Optional[Iterable[str]] = None):
+        """Hold the exclusive lock file across a load-modify-persist cycle.
+        
+        keys lists the existing credential IDs the caller will change (None
+        if unknown). This backend has one lock for everything and ignores it.
+        
+        A write queued for group commit leaves the outermost block only once
+        that commit is on disk, and raises what it raised if it failed.
+        """
+        deadline = None if self.lock_timeout is None else time.monotonic() + self.lock_timeout
+        if not self._state_lock.acquire(timeout=-1 if deadline is None else self.lock_timeout):
+            raise StoreBusyError(self.lock_timeout)
+        try:
+            if self._lock_fd is not None:
+                # Re-entered
+                yield
+                return
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                with metrics.timer("lock_wait", "exclusive"):
+                    self._flock(fd, fcntl.LOCK_EX, deadline)
+            except BaseException:
+                os.close(fd)
+                raise
+            self._lock_fd = fd
+            self._waiting.commit = None
+            try:
+                yield
+            finally:
+                self._release_write_lock()
+        finally:
+            self._state_lock.release()
+        # Wait with both locks released, so other writers can join the same commit
+        commit, self._waiting.commit = self._waiting.commit, None
+        if commit is not None:
+            commit.result()
+    
+    def _flock(self, fd: int, operation: int, deadline: Optional[float]):
+        """flock() that gives up with StoreBusyError at the deadline (time.monotonic())"""
+        if deadline is None:
+            fcntl.flock(fd, operation)
+            return
+        delay = 0.001
+        while True:
+            try:
+                fcntl.flock(fd, operation | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise StoreBusyError(self.lock_timeout)
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, 0.05)
+    
+    def _release_write_lock(self):
+        """Release the exclusive lock file"""
+        if self._lock_fd is not None:
+            # Closing the descriptor releases the flock
+            os.close(self._lock_fd)
+            self._lock_fd = None
+    
+    @contextmanager
+    def _shared_lock(self):
+        """Hold the lock file shared, unless this store already holds it exclusively"""
+        with self._state_lock:
+            if self._lock_fd is not None:
+                yield
+                return
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                deadline = None if self.lock_timeout is None else time.monotonic() + self.lock_timeout
+                with metrics.timer("lock_wait", "shared"):
+                    self._flock(fd, fcntl.LOCK_SH, deadline)
+                yield
+            finally:
+                os.close(fd)
+    
+    def _persist(self, upserts: Dict[str, CredentialRecord], deletes: List[str]):
+        """Write one mutation to disk now, or queue it for the next group commit"""
+        if self.read_only:
+            raise RuntimeError("Cannot save credentials in read-only mode")
+        
+        with self._write_lock():
+            if self.durability == "group":
+                self._pending.append((dict(upserts), list(deletes)))
+                if self._group_commit is None:
+                    self._group_commit = Future()
+                    self._flush_timer = threading.Timer(self.group_commit_delay, self._timed_flush)
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
+                # The writer waits for it on its way out of _write_lock
+                self._waiting.commit = self._group_commit
+                return
+            try:
+                self._flush_changes([(upserts, deletes)])
+            except Exception:
+                self.invalidate_cache()
+                raise
+    
+    @metrics.timed("operation", "flush")
+    def _flush_changes(self, changes: List[Tuple[Dict[str, CredentialRecord], List[str]]]):
+        """Make a list of (upserts, deletes) durable; the JSON backend rewrites the whole file"""
+        self._write_file()
+    
+    def flush(self):
+        """Write and fsync any changes queued for group commit, then wake their writers.
+        
+        If the flush fails, the changes are dropped (the next load rereads the
+        file) and every writer waiting on them raises the error.
+        """
+        with self._state_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            commit, self._group_commit = self._group_commit, None
+            if commit is None:
+                return
+            try:
+                with self._write_lock():
+                    # Keeps what other processes wrote since, with the queued changes on top
+                    self.load_credentials()
+                    self._flush_changes(self._pending)
+            except BaseException as e:
+                self.invalidate_cache()
+                commit.set_exception(e)
+                raise
+            finally:
+                self._pending = []
+            commit.set_result(None)
+    
+    def close(self):
+        """Write out changes queued for group commit and release what the store holds open"""
+        if self.durability == "group":
+            atexit.unregister(self.flush)
+            self.flush()
+    
+    def _timed_flush(self):
+        """Group commit timer body; errors reach the writers waiting on the commit"""
+        try:
+            self.flush()
+        except Exception:
+            pass
+    
     def add_credential(self, app: str, base_url: str, access_token: str, 
                       user_name: Optional[str] = None, expires: Optional[str] = None) -> str:
         """Add a new credential and return its ID"""
         if self.read_only:
             raise RuntimeError("Cannot add credentials in read-only mode")
-            
-        # Always read from disk before modifying
-        self.load_credentials()
         
-        cred_id = str(uuid.uuid4())
-        credential = Credential(
+        # A new ID can't conflict with another writer, so no existing keys are locked
+        with self._write_lock(keys=()):
+            # Refresh from disk (cheap if the file is unchanged) before modifying
+            self.load_credentials()
+            
+            credential = self._new_record(app, base_url, access_token, user_name, expires)
+            self._put(credential.id, credential)
+            self._persist({credential.id: credential}, [])
+        return credential.id
+    
+    def _new_record(self, app: str, base_url: str, access_token: str,
+                    user_name: Optional[str] = None, expires: Optional[str] = None) -> CredentialRecord:
+        """Validate and seal a new credential under a fresh ID"""
+        return self._seal(CredentialRecord.validated(
             app=app,
-            id=cred_id,
+            id=str(uuid.uuid4()),
             base_url=base_url,
             access_token=access_token,
             user_name=user_name,
             expires=expires or "never"
-        )
-        self.credentials[cred_id] = credential
-        self.save_credentials()
-        return cred_id
+        ))
+    
+    def _updated_record(self, cred_id: str, updates: dict) -> Optional[CredentialRecord]:
+        """Validate and seal a credential with updates applied; None if it doesn't exist"""
+        current = self.credentials.get(cred_id)
+        if current is None:
+            return None
+        # Validate the merged record once, here, rather than on every read
+        fields = current.to_dict()
+        fields.update((key, value) for key, value in updates.items() if key in self.UPDATABLE_FIELDS)
+        return self._seal(CredentialRecord.validated(**fields))
     
     def get_credential(self, cred_id: str) -> Optional[Credential]:
         """Get a credential by ID"""
-        # Always read from disk to ensure fresh data
-        self.load_credentials()
-        return self.credentials.get(cred_id)
+        # Revalidate against the file so changes from other instances are seen;
+        # hold the state lock so the sweeper or a reload can't change the dict mid-read
+        with self._state_lock:
+            self.load_credentials()
+            record = self.credentials.get(cred_id)
+            return self._reveal(record) if record else None
     
-    def list_credentials(self) -> List[Dict]:
-        """List all credentials with minimal essential data"""
-        # Always read from disk to ensure fresh data
-        self.load_credentials()
+    def _seal(self, record: CredentialRecord) -> CredentialRecord:
+        """Encrypt a new or updated record's token for storage (a no-op without a key)"""
+        if self.cipher is not None:
+            record.access_token = self.cipher.encrypt(record.id, record.access_token)
+        return record
+    
+    def _reveal(self, record: CredentialRecord) -> Credential:
+        """Return the API model of one record, decrypting its token if it is encrypted"""
+        fields = record.to_dict()
+        if is_encrypted(fields["access_token"]):
+            if self.cipher is None:
+                raise DecryptionError(f"The access token of credential {record.id} is encrypted; set "
+                                      f"CREDENTIAL_MANAGER_ENCRYPTION_KEY or CREDENTIAL_MANAGER_KEY_FILE")
+            fields["access_token"] = self.cipher.decrypt(record.id, fields["access_token"])
+        return Credential.model_construct(**fields)
+    
+    def _list_item(self, cred: CredentialRecord) -> Dict:
+        """Build the minimal listing entry for a credential"""
+        item = {
+            "id": cred.id,
+            "app": cred.app
+        }
         
-        # Count apps to determine if we need to show usernames
-        app_counts = Counter(cred.app for cred in self.credentials.values())
+        # Only include username if there are multiple credentials for the same app
+        # (counted across the whole store, so pages agree with the full list)
+        if self._index.app_counts[cred.app] > 1 and cred.user_name:
+            item["user_name"] = cred.user_name
         
-        result = []
-        for cred in self.credentials.values():
-            item = {
-                "id": cred.id,
-                "app": cred.app
-            }
-            
-            # Only include username if there are multiple credentials for the same app
-            if app_counts[cred.app] > 1 and cred.user_name:
-                item["user_name"] = cred.user_name
-                
-            result.append(item)
+        if self.flagged_expired and self.flagged_expired.get(cred.id) == cred.expires:
+            item["expired"] = True
+        
+        return item
+    
+    def _expired_ids(self, exclude_expired: bool) -> Set[str]:
+        """Return the IDs to leave out of a listing (empty unless exclude_expired)"""
+        return self._index.expired_ids(time.time()) if exclude_expired else set()
+    
+    def list_credentials(self, exclude_expired: bool = False) -> List[Dict]:
+        """List all credentials with minimal essential data"""
+        # Revalidate against the file so changes from other instances are seen
+        with self._state_lock:
+            self.load_credentials()
+            expired = self._expired_ids(exclude_expired)
+            return [self._list_item(cred) for cred in self.credentials.values() if cred.id not in expired]
+    
+    def list_credentials_page(self, limit: int, cursor: Optional[str] = None,
+                              exclude_expired: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """List up to limit credentials in ID order after an opaque cursor.
+        
+        Returns the page and the cursor for the next one (None on the last page).
+        Cursors name the last ID returned, so pages stay stable while other
+        credentials are added or deleted.
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        after = decode_cursor(cursor) if cursor else None
         
-        return result
+        with self._state_lock:
+            self.load_credentials()
+            expired = self._expired_ids(exclude_expired)
+            # Fetch one extra ID to learn whether another page follows, and keep
+            # fetching while expired credentials leave the page short
+            ids: List[str] = []
+            while len(ids) <= limit:
+                batch = self._index.page_ids(after, limit + 1 - len(ids))
+                if not batch:
+                    break
+                ids.extend(cred_id for cred_id in batch if cred_id not in expired)
+                after = batch[-1]
+            page = [self._list_item(self.credentials[cred_id]) for cred_id in ids[:limit]]
+        next_cursor = encode_cursor(ids[limit - 1]) if len(ids) > limit else None
+        return page, next_cursor
+    
+    def iter_credentials(self, chunk_size: int = 500, exclude_expired: bool = False) -> Iterator[List[Dict]]:
+        """Yield listing entries in ID order, one chunk at a time, without building the full list"""
+        cursor = None
+        while True:
+            page, cursor = self.list_credentials_page(chunk_size, cursor, exclude_expired)
+            if page:
+                yield page
+            if cursor is None:
+                return
     
     def update_credential(self, cred_id: str, **updates) -> bool:
         """Update a credential"""
         if self.read_only:
             raise RuntimeError("Cannot update credentials in read-only mode")
-            
-        # Always read from disk before modifying
-        self.load_credentials()
         
-        if cred_id not in self.credentials:
-            return False
-        
-        credential = self.credentials[cred_id]
-        for key, value in updates.items():
-            if hasattr(credential, key):
-                setattr(credential, key, value)
-        
-        self.save_credentials()
+        with self._write_lock(keys=[cred_id]):
+            # Refresh from disk (cheap if the file is unchanged) before modifying
+            self.load_credentials()
+            
+            credential = self._updated_record(cred_id, updates)
+            if credential is None:
+                return False
+            self._put(cred_id, credential)
+            
+            self._persist({cred_id: credential}, [])
         return True
     
     def delete_credential(self, cred_id: str) -> bool:
         """Delete a credential"""
         if self.read_only:
             raise RuntimeError("Cannot delete credentials in read-only mode")
-            
-        # Always read from disk before modifying
-        self.load_credentials()
         
-        if cred_id in self.credentials:
-            del self.credentials[cred_id]
-            self.save_credentials()
-            return True
+        with self._write_lock(keys=[cred_id]):
+            # Refresh from disk (cheap if the file is unchanged) before modifying
+            self.load_credentials()
+            
+            if cred_id in self.credentials:
+                self._drop(cred_id)
+                self._persist({}, [cred_id])
+                return True
         return False
 
+    def apply_writes(self, writes: List[Tuple[str, tuple, dict]]) -> List[object]:
+        """Run several single-credential writes with one lock, load and save.
+        
+        Each write is (method name, args, kwargs) for add_credential,
+        update_credential or delete_credential. They are applied in order and
+        independently: the result list holds what each call would have
+        returned, or the exception it would have raised, and one write failing
+        validation doesn't stop the others. An error while saving is raised.
+        """
+        if self.read_only:
+            raise RuntimeError("Cannot save credentials in read-only mode")
+        
+        keys = [args[0] if args else kwargs.get("cred_id")
+                for name, args, kwargs in writes if name != "add_credential"]
+        with self._write_lock(keys=keys):
+            self.load_credentials()
+            
+            results: List[object] = []
+            upserts: Dict[str, CredentialRecord] = {}
+            # dict as an ordered set; IDs added by this batch never reach the backend as deletes
+            deletes: Dict[str, None] = {}
+            added: Set[str] = set()
+            for name, args, kwargs in writes:
+                try:
+                    if name == "add_credential":
+                        credential = self._new_record(*args, **kwargs)
+                        added.add(credential.id)
+                        result = credential.id
+                    elif name == "update_credential":
+                        (cred_id,) = args
+                        credential = self._updated_record(cred_id, kwargs)
+                        result = credential is not None
+                    elif name == "delete_credential":
+                        (cred_id,) = args
+                        credential = None
+                        result = cred_id in self.credentials
+                        if result:
+                            self._drop(cred_id)
+                            upserts.pop(cred_id, None)
+                            if cred_id not in added:
+                                deletes[cred_id] = None
+                    else:
+                        raise ValueError(f"{name} can't be batched with other writes")
+                except Exception as e:
+                    results.append(e)
+                    continue
+                if credential is not None:
+                    self._put(credential.id, credential)
+                    upserts[credential.id] = credential
+                results.append(result)
+            
+            if upserts or deletes:
+                self._persist(upserts, list(deletes))
+        return results
+    
+    def _commit_batch(self, results: List[dict], upserts: Dict[str, CredentialRecord],
+                      deletes: List[str], atomic: bool) -> List[dict]:
+        """Apply staged batch changes with one save, or none if an atomic batch had a failure"""
+        if atomic and not all(result["success"] for result in results):
+            for result in results:
+                if result["success"]:
+                    result.clear()
+                    result.update({"success": False, "error": "Not applied: another item in the batch failed"})
+            return results
+        
+        if upserts or deletes:
+            for cred_id, credential in upserts.items():
+                self._put(cred_id, credential)
+            for cred_id in deletes:
+                self._drop(cred_id)
+            self._persist(upserts, deletes)
+        return results
+    
+    def add_credentials(self, items: List[dict], atomic: bool = True) -> List[dict]:
+        """Add several credentials with one lock, load and save; returns per-item results"""
+        if self.read_only:
+            raise RuntimeError("Cannot add credentials in read-only mode")
+        
+        with self._write_lock(keys=()):
+            self.load_credentials()
+            
+            results: List[dict] = []
+            upserts: Dict[str, CredentialRecord] = {}
+            for item in items:
+                try:
+                    cred_id = str(uuid.uuid4())
+                    upserts[cred_id] = self._seal(CredentialRecord.validated(
+                        **{**item, "id": cred_id, "expires": item.get("expires") or "never"}
+                    ))
+                    results.append({"success": True, "credential_id": cred_id})
+                except Exception as e:
+                    results.append({"success": False, "error": str(e)})
+            return self._commit_batch(results, upserts, [], atomic)
+    
+    def update_credentials(self, items: List[dict], atomic: bool = True) -> List[dict]:
+        """Update several credentials with one lock, load and save; each item holds
+        credential_id plus the fields to change"""
+        if self.read_only:
+            raise RuntimeError("Cannot update credentials in read-only mode")
+        
+        with self._write_lock(keys=[item.get("credential_id") for item in items]):
+            self.load_credentials()
+            
+            results: List[dict] = []
+            upserts: Dict[str, CredentialRecord] = {}
+            for item in items:
+                updates = dict(item)
+                cred_id = updates.pop("credential_id", None)
+                try:
+                    # Later items in the batch see earlier items' changes
+                    current = upserts.get(cred_id) or self.credentials.get(cred_id)
+                    if current is None:
+                        raise KeyError(f"Credential with ID {cred_id} not found")
+                    unknown = set(updates) - set(self.UPDATABLE_FIELDS)
+                    if unknown:
+                        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+                    if not updates:
+                        raise ValueError("No updates provided")
+                    upserts[cred_id] = self._seal(CredentialRecord.validated(**{**current.to_dict(), **updates}))
+                    results.append({"success": True, "credential_id": cred_id})
+                except KeyError as e:
+                    results.append({"success": False, "credential_id": cred_id, "error": e.args[0]})
+                except Exception as e:
+                    results.append({"success": False, "credential_id": cred_id, "error": str(e)})
+            return self._commit_batch(results, upserts, [], atomic)
+    
+    def delete_credentials(self, cred_ids: List[str], atomic: bool = True) -> List[dict]:
+        """Delete several credentials with one lock, load and save; returns per-item results"""
+        if self.read_only:
+            raise RuntimeError("Cannot delete credentials in read-only mode")
+        
+        with self._write_lock(keys=cred_ids):
+            self.load_credentials()
+            
+            results: List[dict] = []
+            deletes: List[str] = []
+            for cred_id in cred_ids:
+                if cred_id in self.credentials and cred_id not in deletes:
+                    deletes.append(cred_id)
+                    results.append({"success": True, "credential_id": cred_id})
+                else:
+                    results.append({"success": False, "credential_id": cred_id,
+                                    "error": f"Credential with ID {cred_id} not found"})
+            return self._commit_batch(results, {}, deletes, atomic)
+    
+    def import_credentials(self, items: List[dict], on_duplicate: str = "skip") -> List[dict]:
+        """Add one chunk of imported credentials with one lock, load and save.
+        
+        An item that has the same (app, user_name, base_url) as a stored
+        credential, or as an earlier item in the chunk, is a duplicate: it is
+        skipped, or with on_duplicate="update" its other fields overwrite the
+        existing credential's. Duplicates are found through the identity
+        index, not by comparing items with each other. New credentials keep
+        the item's id when it is free. Items are independent; each result
+        has an "action" of "added", "updated" or "skipped".
+        """
+        if self.read_only:
+            raise RuntimeError("Cannot import credentials in read-only mode")
+        if on_duplicate not in DUPLICATE_MODES:
+            raise ValueError(f"on_duplicate must be one of: {', '.join(DUPLICATE_MODES)}")
+        
+        # Every ID is locked: a duplicate may be any stored credential
+        with self._write_lock():
+            self.load_credentials()
+            
+            results: List[dict] = []
+            upserts: Dict[str, CredentialRecord] = {}
+            # identity_key() -> ID of the items this chunk adds
+            staged: Dict[Tuple[str, str, str], str] = {}
+            for item in items:
+                try:
+                    fields = {key: item.get(key) for key in self.UPDATABLE_FIELDS}
+                    if not fields["app"] or not fields["base_url"]:
+                        raise ValueError("app and base_url are required")
+                    key = identity_key(fields["app"], fields["user_name"], fields["base_url"])
+                    existing = staged.get(key) or min(self._index.find_identity(key), default=None)
+                    if existing is not None:
+                        if on_duplicate == "skip":
+                            results.append({"success": True, "credential_id": existing, "action": "skipped"})
+                            continue
+                        current = upserts.get(existing) or self.credentials[existing]
+                        updates = {name: value for name, value in fields.items() if value is not None}
+                        upserts[existing] = self._seal(CredentialRecord.validated(**{**current.to_dict(), **updates}))
+                        results.append({"success": True, "credential_id": existing, "action": "updated"})
+                        continue
+                    cred_id = item.get("id")
+                    if not cred_id or cred_id in self.credentials or cred_id in upserts:
+                        cred_id = str(uuid.uuid4())
+                    upserts[cred_id] = self._seal(CredentialRecord.validated(
+                        **{**fields, "id": cred_id, "expires": fields["expires"] or "never"}
+                    ))
+                    staged[key] = cred_id
+                    results.append({"success": True, "credential_id": cred_id, "action": "added"})
+                except Exception as e:
+                    results.append({"success": False, "error": str(e)})
+            return self._commit_batch(results, upserts, [], atomic=False)
+    
+    def get_credentials(self, cred_ids: List[str]) -> List[Optional[Credential]]:
+        """Get several credentials by ID with a single load"""
+        with self._state_lock:
+            self.load_credentials()
+            records = [self.credentials.get(cred_id) for cred_id in cred_ids]
+        return [self._reveal(record) if record else None for record in records]
+    
+    def find_credentials(self, app: Optional[str] = None, user_name: Optional[str] = None,
+                         host: Optional[str] = None, prefix: Optional[str] = None,
+                         exclude_expired: bool = False) -> List[Dict]:
+        """Find credentials by app, user name, base_url host and/or app name prefix using the indexes"""
+        with self._state_lock:
+            self.load_credentials()
+            ids = self._index.find(app, user_name, host, prefix) - self._expired_ids(exclude_expired)
+            matches = [self.credentials[cred_id] for cred_id in ids]
+        matches.sort(key=lambda cred: (cred.app.casefold(), cred.user_name or "", cred.id))
+        return [
+            {
+                "id": cred.id,
+                "app": cred.app,
+                "user_name": cred.user_name,
+                "base_url": cred.base_url
+            }
+            for cred in matches
+        ]
+    
+    def expiring_credentials(self, within_seconds: float, now: Optional[float] = None) -> List[Dict]:
+        """List credentials that expire within within_seconds (or already have), soonest first.
+        
+        Uses the sorted expiry index, so the cost tracks the number of matches
+        rather than the size of the store. Credentials that never expire are
+        not included.
+        """
+        if within_seconds < 0:
+            raise ValueError("within_seconds must not be negative")
+        now = time.time() if now is None else now
+        with self._state_lock:
+            self.load_credentials()
+            return [
+                {
+                    "id": cred_id,
+                    "app": self.credentials[cred_id].app,
+                    "user_name": self.credentials[cred_id].user_name,
+                    "expires": self.credentials[cred_id].expires,
+                    "expires_in_seconds": int(expires_at - now),
+                    "expired": expires_at < now
+                }
+                for expires_at, cred_id in self._index.expiring(now + within_seconds)
+            ]
+    
+    def sweep_expired(self, purge: bool = False, now: Optional[float] = None) -> List[str]:
+        """Flag (or, with purge, delete) every expired credential and return their IDs.
+        
+        Flagged credentials are marked "expired" in listings. Only the expired
+        end of the expiry index is visited.
+        """
+        now = time.time() if now is None else now
+        if not purge:
+            with self._state_lock:
+                self.load_credentials()
+                expired = sorted(self._index.expired_ids(now))
+                flagged = {cred_id: self.credentials[cred_id].expires for cred_id in expired}
+                # Flagging changes the listing entries, so it counts as a change
+                for cred_id in flagged.keys() ^ self.flagged_expired.keys():
+                    if cred_id in self.credentials:
+                        self._note_changed(cred_id, self.credentials[cred_id].app)
+                self.flagged_expired = flagged
+            return expired
+        
+        if self.read_only:
+            raise RuntimeError("Cannot purge credentials in read-only mode")
+        with self._write_lock():
+            self.load_credentials()
+            expired = sorted(self._index.expired_ids(now))
+            if expired:
+                for cred_id in expired:
+                    self._drop(cred_id)
+                self._persist({}, expired)
+        return expired
+
+# Storage backends by name, as "module:class" so optional backends are only
+# imported when selected
+STORAGE_BACKENDS = {
+    "json": "credential_manager_mcp.server:CredentialStore",
+    "journal": "credential_manager_mcp.journal:JournalCredentialStore",
+    "sqlite": "credential_manager_mcp.sqlite_store:SQLiteCredentialStore",
+    "sharded": "credential_manager_mcp.sharded:ShardedCredentialStore",
+    "binary": "credential_manager_mcp.snapshot:SnapshotCredentialStore",
+}
+
+def create_store(backend: Optional[str] = None, store_path: Optional[str] = None,
+                 read_only: bool = True, **kwargs) -> CredentialStore:
+    """Create a credential store for the named storage backend"""
+    backend = (backend or "json").lower()
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend '{backend}' (expected one of: {', '.join(STORAGE_BACKENDS)})")
+    module_name, class_name = STORAGE_BACKENDS[backend].split(":")
+    store_class = getattr(importlib.import_module(module_name), class_name)
+    return store_class(store_path, read_only=read_only, **kwargs)
+
 # Get read-only mode from environment variable or default to True
 READ_ONLY_MODE = os.getenv("CREDENTIAL_MANAGER_READ_ONLY", "true").lower() in ("true", "1", "yes")
 
-# Initialize the credential store
-store = CredentialStore(read_only=READ_ONLY_MODE)
+# Storage backend: 'json' (whole-file rewrite, default), 'journal' (append-only
+# log), 'sqlite' (WAL-mode database with per-row writes), 'sharded' (hash-of-ID
+# shard files, each with its own lock) or 'binary' (memory-mapped snapshot)
+STORAGE_BACKEND = os.getenv("CREDENTIAL_MANAGER_BACKEND", "json")
+
+# The credential store is created on first use (or injected with set_store),
+# so importing this module doesn't touch the filesystem
+_store: Optional[CredentialStore] = None
+# Background expiry sweeper and file watcher for the current store, if running
+_sweeper = None
+_watcher = None
+# Async front end the tools use for the current store
+_async_store = None
+# Named stores served next to the default one (tenants.StoreRegistry)
+_registry = None
+
+def get_store() -> CredentialStore:
+    """Return the server's credential store, creating it from the environment on first use"""
+    if _store is None:
+        set_store(create_store(STORAGE_BACKEND, read_only=READ_ONLY_MODE))
+        _start_sweeper_from_environment()
+        _start_watcher_from_environment()
+    return _store
+
+def get_async_store():
+    """Return an AsyncCredentialStore for the server's store, so tools don't block the event loop"""
+    global _async_store
+    from .async_store import AsyncCredentialStore
+    
+    store = get_store()
+    if _async_store is None or _async_store.store is not store:
+        if _async_store is not None:
+            _async_store.close()
+        _async_store = AsyncCredentialStore(store)
+    return _async_store
+
+def get_store_registry():
+    """Return the registry of named stores, created on first use with the default store's mode and backend"""
+    global _registry
+    from .tenants import StoreRegistry
+    
+    if _registry is None:
+        _registry = StoreRegistry(read_only=get_store().read_only, backend=STORAGE_BACKEND)
+    return _registry
+
+def set_store_registry(registry):
+    """Serve named stores from a different StoreRegistry (None re-creates one on next use)"""
+    global _registry
+    if _registry is not None and _registry is not registry:
+        _registry.close()
+    _registry = registry
+
+@asynccontextmanager
+async def _open_store(name: Optional[str], create: bool = False):
+    """Open the AsyncCredentialStore for a tool's store argument (None: the default store)
+    for the length of the block, so evicting a named store can't close it mid-call.
+    
+    Raises ValueError for an unknown store; create lets write tools start a new one.
+    """
+    from .tenants import DEFAULT_STORE_NAME
+    
+    if name is None or name == DEFAULT_STORE_NAME:
+        yield get_async_store()
+        return
+    async with get_store_registry().using(name, create) as async_store:
+        yield async_store
+
+def _start_sweeper_from_environment():
+    """Start the expiry sweeper if CREDENTIAL_MANAGER_EXPIRY_SWEEP asks for one"""
+    global _sweeper
+    from .sweeper import ExpirySweeper, get_sweep_interval, get_sweep_mode
+    
+    mode = get_sweep_mode()
+    if mode == "off":
+        return
+    if mode == "purge" and _store.read_only:
+        print("⚠️ Expiry sweep 'purge' needs read-write mode; flagging expired credentials instead")
+        mode = "flag"
+    _sweeper = ExpirySweeper(_store, mode, get_sweep_interval())
+    _sweeper.start()
+
+def _start_watcher_from_environment():
+    """Start the file watcher unless CREDENTIAL_MANAGER_WATCH is 'off'"""
+    from .watcher import get_poll_interval, get_watch_mode
+    
+    mode = get_watch_mode()
+    if mode != "off":
+        start_watcher(mode, get_poll_interval())
+
+def start_watcher(mode: str = "auto", poll_interval: float = 1.0):
+    """Watch the current store's files: refresh its cache and notify subscribed clients on change"""
+    global _watcher
+    from .watcher import StoreWatcher
+    
+    if _watcher is not None:
+        _watcher.stop()
+    _watcher = StoreWatcher(get_store(), _notify_store_changed, mode, poll_interval)
+    _watcher.start()
+
+def set_store(new_store: Optional[CredentialStore]):
+    """Serve a different credential store (None re-creates one from the environment on next use).
+    
+    Write tools are enabled or disabled to match the store's read-only mode,
+    and named stores are unloaded so they reopen in the same mode.
+    """
+    global _store, _sweeper, _watcher, _async_store
+    if _async_store is not None and _async_store.store is not new_store:
+        _async_store.close()
+        _async_store = None
+    if _sweeper is not None and _sweeper.store is not new_store:
+        _sweeper.stop()
+        _sweeper = None
+    if _watcher is not None and _watcher.store is not new_store:
+        _watcher.stop()
+        _watcher = None
+    if new_store is not _store:
+        set_store_registry(None)
+    _store = new_store
+    read_only = new_store.read_only if new_store is not None else READ_ONLY_MODE
+    for tool in WRITE_TOOLS:
+        if read_only:
+            tool.disable()
+        else:
+            tool.enable()
+
+def __getattr__(name: str):
+    """Keep `server.store` working for code written before the store became lazy"""
+    if name == "store":
+        return get_store()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Create FastMCP server
 mcp = FastMCP(name="Credential Manager")
 
+STORE_INFO_URI = "credential://store/info"
+
+# Client sessions subscribed to resource updates: session -> (URIs, the event
+# loop serving it). Weak, so closed sessions drop out on their own.
+_subscriptions: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+@mcp._mcp_server.subscribe_resource()
+async def _subscribe_resource(uri: AnyUrl):
+    """Handle resources/subscribe"""
+    session = mcp._mcp_server.request_context.session
+    uris, _ = _subscriptions.get(session, (set(), None))
+    uris.add(str(uri))
+    _subscriptions[session] = (uris, asyncio.get_running_loop())
+
+@mcp._mcp_server.unsubscribe_resource()
+async def _unsubscribe_resource(uri: AnyUrl):
+    """Handle resources/unsubscribe"""
+    session = mcp._mcp_server.request_context.session
+    if session in _subscriptions:
+        _subscriptions[session][0].discard(str(uri))
+
+def _notify_store_changed():
+    """Send resources/updated for the store info to every subscribed session (from any thread)"""
+    for session, (uris, loop) in list(_subscriptions.items()):
+        if STORE_INFO_URI in uris and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(session.send_resource_updated(AnyUrl(STORE_INFO_URI)), loop)
+
+async def _list_store(credential_store, limit: Optional[int], cursor: Optional[str], exclude_expired: bool,
+                      if_none_match: Optional[int], since_version: Optional[int]) -> dict:
+    """list_credentials for an opened store"""
+    mode = "read-only" if credential_store.read_only else "read-write"
+    # Listings without expired credentials change as time passes, not just on writes
+    if (if_none_match is not None or since_version is not None) and not exclude_expired:
+        try:
+            await credential_store.load_credentials()
+            version = credential_store.version
+            if version in (if_none_match, since_version):
+                return {"not_modified": True, "version": version, "mode": mode}
+            changes = None
+            if since_version is not None and limit is None and cursor is None:
+                changes = await credential_store.changes_since(since_version)
+        except StoreBusyError as e:
+            return _busy_response(e)
+        if changes is not None:
+            changed, deleted = changes
+            return {
+                "changed": changed,
+                "deleted": deleted,
+                "count": len(changed),
+                "since_version": since_version,
+                "version": version,
+                "mode": mode
+            }
+    
+    # Listings without expired credentials are answered from the response
+    # cache; revalidate first so the version says what the cache may answer for
+    cache_key = None
+    if not exclude_expired:
+        try:
+            await credential_store.load_credentials()
+        except StoreBusyError as e:
+            return _busy_response(e)
+    # Taken before the read: if a write lands in between, the next
+    # since_version call repeats it rather than missing it
+    version = credential_store.version
+    if not exclude_expired:
+        cache_key = (version, credential_store.read_only, "list", limit, cursor)
+        cached = credential_store.responses.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    if limit is None and cursor is None:
+        try:
+            credentials = await credential_store.list_credentials(exclude_expired)
+        except StoreBusyError as e:
+            return _busy_response(e)
+        response = {
+            "credentials": credentials,
+            "count": len(credentials),
+            "version": version,
+            "mode": mode
+        }
+    else:
+        try:
+            credentials, next_cursor = await credential_store.list_credentials_page(
+                min(limit or MAX_PAGE_SIZE, MAX_PAGE_SIZE), cursor, exclude_expired)
+        except StoreBusyError as e:
+            return _busy_response(e)
+        except ValueError as e:
+            return {"error": str(e)}
+        response = {
+            "credentials": credentials,
+            "count": len(credentials),
+            "total": len(credential_store.credentials),
+            "next_cursor": next_cursor,
+            "version": version,
+            "mode": mode
+        }
+    return credential_store.responses.put(cache_key, response) if cache_key else response
+
 @mcp.tool
-def list_credentials() -> dict:
-    """List all stored credentials with essential data (id, app name, and username only if multiple apps)"""
-    credentials = store.list_credentials()
-    return {
-        "credentials": credentials,
-        "count": len(credentials),
-        "mode": "read-only" if store.read_only else "read-write"
-    }
+@metrics.timed("tool")
+async def list_credentials(limit: Optional[int] = None, cursor: Optional[str] = None,
+                     exclude_expired: bool = False, store: Optional[str] = None,
+                     if_none_match: Optional[int] = None, since_version: Optional[int] = None) -> Union[dict, str]:
+    """List all stored credentials with essential data (id, app name, and username only if multiple apps).
+    Pass limit (max 1000) to page through large stores in ID order; pass the returned
+    next_cursor to get the following page. exclude_expired=true leaves out expired credentials.
+    Every answer carries the store version: pass it back as if_none_match to get just
+    not_modified=true if nothing changed, or as since_version to get only the entries changed
+    and the IDs deleted since then (a full list if that version is too old).
+    Every tool takes an optional store name to use a named store instead of the default one"""
+    try:
+        async with _open_store(store) as credential_store:
+            return await _list_store(credential_store, limit, cursor, exclude_expired,
+                                     if_none_match, since_version)
+    except ValueError as e:
+        return {"error": str(e)}
 
 @mcp.tool
-def get_credential_details(credential_id: str) -> dict:
-    """Get detailed information about a specific credential including the access token"""
-    credential = store.get_credential(credential_id)
+@metrics.timed("tool")
+async def get_credential_details(credential_id: str, store: Optional[str] = None,
+                                 if_none_match: Optional[int] = None) -> dict:
+    """Get detailed information about a specific credential including the access token.
+    Pass the version from an earlier answer as if_none_match to get just not_modified=true
+    if this credential hasn't changed since"""
+    try:
+        async with _open_store(store) as credential_store:
+            if if_none_match is not None:
+                await credential_store.load_credentials()
+                version = credential_store.version
+                changed = await credential_store.changed_ids_since(if_none_match)
+                if changed is not None and credential_id not in changed and credential_id in credential_store.credentials:
+                    return {"id": credential_id, "not_modified": True, "version": version}
+            version = credential_store.version
+            credential = await credential_store.get_credential(credential_id)
+    except StoreBusyError as e:
+        return _busy_response(e)
+    except (ValueError, DecryptionError) as e:
+        return {"error": str(e)}
     if not credential:
         return {"error": f"Credential with ID {credential_id} not found"}
     
-    return credential.model_dump()
+    expires_at = expiry_timestamp(credential.expires)
+    return {**credential.model_dump(), "expired": expires_at is not None and expires_at < time.time(),
+            "version": version}
 
-# Only register write operations if not in read-only mode
-if not READ_ONLY_MODE:
-    @mcp.tool
-    def add_credential(app: str, base_url: str, access_token: str, 
-                      user_name: Optional[str] = None, expires: Optional[str] = None) -> dict:
-        """Add a new credential to the store"""
-        try:
-            cred_id = store.add_credential(app, base_url, access_token, user_name, expires)
+@mcp.tool
+@metrics.timed("tool")
+async def get_credentials_details(credential_ids: List[str], store: Optional[str] = None) -> dict:
+    """Get detailed information, including access tokens, for several credentials at once"""
+    try:
+        async with _open_store(store) as credential_store:
+            credentials = await credential_store.get_credentials(credential_ids)
+    except StoreBusyError as e:
+        return _busy_response(e)
+    except (ValueError, DecryptionError) as e:
+        return {"error": str(e)}
+    results = []
+    for cred_id, credential in zip(credential_ids, credentials):
+        if credential:
+            results.append(credential.model_dump())
+        else:
+            results.append({"id": cred_id, "error": f"Credential with ID {cred_id} not found"})
+    return {
+        "credentials": results,
+        "count": len(results),
+        "found": sum(1 for result in results if "error" not in result)
+    }
+
+@mcp.tool
+@metrics.timed("tool")
+async def export_credentials(format: str = "jsonl", limit: Optional[int] = None, cursor: Optional[str] = None,
+                             store: Optional[str] = None) -> dict:
+    """Export credentials, access tokens included, as JSONL or CSV, up to limit (max 1000) per
+    call in ID order. Pass next_cursor back as cursor for the next page; each page can be
+    imported with import_credentials on its own"""
+    if format not in FORMATS:
+        return {"error": f"format must be one of: {', '.join(FORMATS)}"}
+    try:
+        async with _open_store(store) as credential_store:
+            page, next_cursor = await credential_store.list_credentials_page(
+                min(limit or MAX_PAGE_SIZE, MAX_PAGE_SIZE), cursor)
+            credentials = await credential_store.get_credentials([item["id"] for item in page])
+    except StoreBusyError as e:
+        return _busy_response(e)
+    except (ValueError, DecryptionError) as e:
+        return {"error": str(e)}
+    records = [credential.model_dump() for credential in credentials if credential is not None]
+    return {
+        "format": format,
+        "data": format_records(records, format),
+        "count": len(records),
+        "next_cursor": next_cursor
+    }
+
+@mcp.tool
+@metrics.timed("tool")
+async def find_credentials(app: Optional[str] = None, user_name: Optional[str] = None,
+                     host: Optional[str] = None, prefix: Optional[str] = None,
+                     exclude_expired: bool = False, store: Optional[str] = None) -> dict:
+    """Find credentials by exact app name, user name, base_url host and/or app name prefix
+    (all case-insensitive; given criteria are combined with AND). Tokens are not included.
+    exclude_expired=true leaves out expired credentials"""
+    try:
+        async with _open_store(store) as credential_store:
+            credentials = await credential_store.find_credentials(app, user_name, host, prefix, exclude_expired)
+    except StoreBusyError as e:
+        return _busy_response(e)
+    except ValueError as e:
+        return {"error": str(e)}
+    return {
+        "credentials": credentials,
+        "count": len(credentials)
+    }
+
+@mcp.tool
+@metrics.timed("tool")
+async def expiring_credentials(within_seconds: int, store: Optional[str] = None) -> dict:
+    """List credentials that expire within the given number of seconds, soonest first,
+    including ones that have already expired (expired=true). Tokens are not included"""
+    try:
+        async with _open_store(store) as credential_store:
+            credentials = await credential_store.expiring_credentials(within_seconds)
+    except StoreBusyError as e:
+        return _busy_response(e)
+    except ValueError as e:
+        return {"error": str(e)}
+    return {
+        "credentials": credentials,
+        "count": len(credentials),
+        "expired": sum(1 for cred in credentials if cred["expired"])
+    }
+
+def _busy_response(error: "StoreBusyError") -> dict:
+    """Structured answer for a call that gave up waiting for the store lock"""
+    return {
+        "success": False,
+        "error": str(error),
+        "error_type": "store_busy",
+        "retryable": True,
+        "lock_timeout_seconds": error.timeout
+    }
+
+def _batch_response(results: List[dict], atomic: bool) -> dict:
+    """Summarize per-item batch results"""
+    applied = sum(1 for result in results if result["success"])
+    return {
+        "success": applied == len(results),
+        "atomic": atomic,
+        "applied": applied,
+        "failed": len(results) - applied,
+        "results": results
+    }
+
+# Write tools are only enabled while the store is in read-write mode
+@mcp.tool(enabled=not READ_ONLY_MODE, tags={"write"})
+@metrics.timed("tool")
+async def add_credential(app: str, base_url: str, access_token: str, 
+                  user_name: Optional[str] = None, expires: Optional[str] = None,
+                  store: Optional[str] = None) -> dict:
+    """Add a new credential to the store"""
+    try:
+        async with _open_store(store, create=True) as credential_store:
+            cred_id = await credential_store.add_credential(app, base_url, access_token, user_name, expires)
             return {
                 "success": True,
                 "credential_id": cred_id,
                 "message": f"Credential for {app} added successfully"
             }
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e)
-            }
+    except StoreBusyError as e:
+        return _busy_response(e)
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
 
-    @mcp.tool
-    def update_credential(credential_id: str, app: Optional[str] = None, 
-                         base_url: Optional[str] = None, access_token: Optional[str] = None,
-                         user_name: Optional[str] = None, expires: Optional[str] = None) -> dict:
-        """Update an existing credential"""
-        updates = {}
-        if app is not None:
-            updates["app"] = app
-        if base_url is not None:
-            updates["base_url"] = base_url
-        if access_token is not None:
-            updates["access_token"] = access_token
-        if user_name is not None:
-            updates["user_name"] = user_name
-        if expires is not None:
-            updates["expires"] = expires
-        
-        if not updates:
-            return {"error": "No updates provided"}
-        
-        try:
-            success = store.update_credential(credential_id, **updates)
+@mcp.tool(enabled=not READ_ONLY_MODE, tags={"write"})
+@metrics.timed("tool")
+async def update_credential(credential_id: str, app: Optional[str] = None, 
+                     base_url: Optional[str] = None, access_token: Optional[str] = None,
+                     user_name: Optional[str] = None, expires: Optional[str] = None,
+                     store: Optional[str] = None) -> dict:
+    """Update an existing credential"""
+    updates = {}
+    if app is not None:
+        updates["app"] = app
+    if base_url is not None:
+        updates["base_url"] = base_url
+    if access_token is not None:
+        updates["access_token"] = access_token
+    if user_name is not None:
+        updates["user_name"] = user_name
+    if expires is not None:
+        updates["expires"] = expires
+
+    if not updates:
+        return {"error": "No updates provided"}
+
+    try:
+        async with _open_store(store) as credential_store:
+            success = await credential_store.update_credential(credential_id, **updates)
             if success:
                 return {
                     "success": True,
@@ -273,17 +1665,21 @@ if not READ_ONLY_MODE:
                     "success": False,
                     "error": f"Credential with ID {credential_id} not found"
                 }
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e)
-            }
+    except StoreBusyError as e:
+        return _busy_response(e)
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
 
-    @mcp.tool
-    def delete_credential(credential_id: str) -> dict:
-        """Delete a credential from the store"""
-        try:
-            success = store.delete_credential(credential_id)
+@mcp.tool(enabled=not READ_ONLY_MODE, tags={"write"})
+@metrics.timed("tool")
+async def delete_credential(credential_id: str, store: Optional[str] = None) -> dict:
+    """Delete a credential from the store"""
+    try:
+        async with _open_store(store) as credential_store:
+            success = await credential_store.delete_credential(credential_id)
             if success:
                 return {
                     "success": True,
@@ -294,48 +1690,240 @@ if not READ_ONLY_MODE:
                     "success": False,
                     "error": f"Credential with ID {credential_id} not found"
                 }
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e)
-            }
+    except StoreBusyError as e:
+        return _busy_response(e)
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+@mcp.tool(enabled=not READ_ONLY_MODE, tags={"write"})
+@metrics.timed("tool")
+async def add_credentials(credentials: List[CredentialInput], atomic: bool = True,
+                          store: Optional[str] = None) -> dict:
+    """Add several credentials in one save. With atomic=true nothing is added if any item
+    fails; with atomic=false the valid items are added and failures are reported per item"""
+    try:
+        async with _open_store(store, create=True) as credential_store:
+            results = await credential_store.add_credentials([cred.model_dump() for cred in credentials], atomic)
+            return _batch_response(results, atomic)
+    except StoreBusyError as e:
+        return _busy_response(e)
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+@mcp.tool(enabled=not READ_ONLY_MODE, tags={"write"})
+@metrics.timed("tool")
+async def update_credentials(updates: List[CredentialUpdate], atomic: bool = True,
+                             store: Optional[str] = None) -> dict:
+    """Update several credentials in one save. With atomic=true nothing changes if any item
+    fails; with atomic=false the valid items are applied and failures are reported per item"""
+    try:
+        async with _open_store(store) as credential_store:
+            results = await credential_store.update_credentials([update.model_dump(exclude_none=True) for update in updates], atomic)
+            return _batch_response(results, atomic)
+    except StoreBusyError as e:
+        return _busy_response(e)
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+@mcp.tool(enabled=not READ_ONLY_MODE, tags={"write"})
+@metrics.timed("tool")
+async def delete_credentials(credential_ids: List[str], atomic: bool = True,
+                             store: Optional[str] = None) -> dict:
+    """Delete several credentials in one save. With atomic=true nothing is deleted if any id
+    is missing; with atomic=false the others are deleted and failures are reported per item"""
+    try:
+        async with _open_store(store) as credential_store:
+            results = await credential_store.delete_credentials(credential_ids, atomic)
+            return _batch_response(results, atomic)
+    except StoreBusyError as e:
+        return _busy_response(e)
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+@mcp.tool(enabled=not READ_ONLY_MODE, tags={"write"})
+@metrics.timed("tool")
+async def import_credentials(data: str, format: str = "jsonl", on_duplicate: str = "skip",
+                             store: Optional[str] = None) -> dict:
+    """Bulk import credentials from JSONL or CSV (header row of id, app, base_url, access_token,
+    user_name, expires). A record with the same app, user_name and base_url as a stored one is
+    skipped, or updates it with on_duplicate="update"; bad lines are reported and don't stop the import"""
+    if format not in FORMATS:
+        return {"success": False, "error": f"format must be one of: {', '.join(FORMATS)}"}
+    report = ImportReport()
+    try:
+        async with _open_store(store, create=True) as credential_store:
+            # One save per chunk, like the command line import
+            for rows in read_chunks(data.splitlines(keepends=True), format):
+                records = [row.record for row in rows if row.record is not None]
+                report.add(rows, await credential_store.import_credentials(records, on_duplicate) if records else [])
+    except StoreBusyError as e:
+        return {**_busy_response(e), **report.to_dict()}
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            **report.to_dict()
+        }
+    return {"success": report.counts["failed"] == 0, **report.to_dict()}
 
-@mcp.resource("credential://store/info")
-def get_store_info() -> dict:
+WRITE_TOOLS = [add_credential, update_credential, delete_credential, add_credentials, update_credentials,
+               delete_credentials, import_credentials]
+
+@mcp.resource(STORE_INFO_URI)
+async def get_store_info() -> Union[dict, str]:
     """Provides information about the credential store"""
-    # Always read from disk to ensure fresh data
-    store.load_credentials()
+    return await _store_info(None)
+
+@mcp.resource("credential://stores/{name}/info")
+async def get_named_store_info(name: str) -> Union[dict, str]:
+    """Provides information about a named credential store"""
+    return await _store_info(name)
+
+@mcp.resource("credential://stores")
+def get_stores() -> dict:
+    """Lists the named credential stores and which of them are loaded"""
+    registry = get_store_registry()
+    loaded = set(registry.loaded())
+    return {
+        "stores": [{"name": name, "store_path": str(registry.store_path(name)), "loaded": name in loaded}
+                   for name in registry.names()],
+        **registry.stats()
+    }
+
+async def _store_info(name: Optional[str]) -> Union[dict, str]:
+    """Information about the default store (name None) or a named one.
+    
+    Answers are cached until the store, its file or one of the event counters
+    in them changes; the read-through cache and response cache counters may
+    lag behind until then (credential://store/metrics has them live).
+    """
+    from .tenants import DEFAULT_STORE_NAME
     
-    # Get path information
+    # Revalidate against the file so changes from other instances are seen
+    try:
+        async with _open_store(name) as async_store:
+            await async_store.load_credentials()
+    except StoreBusyError as e:
+        return _busy_response(e)
+    except ValueError as e:
+        return {"error": str(e)}
+    store = async_store.store
+    sweeper = _sweeper if _sweeper is not None and _sweeper.store is store else None
+    watcher = _watcher if _watcher is not None and _watcher.store is store else None
     store_path = store.store_path
-    expected_path = get_credentials_path()
+    # The file can be touched or deleted without the version changing
+    try:
+        file_stat = store_path.stat()
+        file_state = (file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino)
+    except FileNotFoundError:
+        file_stat = file_state = None
+    cache_key = (store.version, store.read_only, "info", file_state, async_store.write_batches,
+                 sweeper.sweeps if sweeper else None, watcher.changes if watcher else None)
+    cached = async_store.responses.get(cache_key)
+    if cached is not None:
+        return cached
     
-    return {
+    return async_store.responses.put(cache_key, {
+        "store": name or DEFAULT_STORE_NAME,
         "store_path": str(store_path.absolute()),
         "total_credentials": len(store.credentials),
-        "store_exists": store_path.exists(),
+        "version": store.version,
+        "store_exists": file_stat is not None,
         "read_only_mode": store.read_only,
-        "last_modified": datetime.fromtimestamp(store_path.stat().st_mtime).isoformat() if store_path.exists() else None,
+        "backend": store.backend_name,
+        "encrypted": store.cipher is not None,
+        "quarantined_records": len(store.quarantined),
+        "last_modified": datetime.fromtimestamp(file_stat.st_mtime).isoformat() if file_stat else None,
+        "cache": store.cache_stats(),
+        "write_coalescing": async_store.write_stats(),
+        "responses": async_store.responses.stats(),
+        "expiry_sweeper": sweeper.stats() if sweeper else None,
+        "watcher": {"mode": watcher.mode, "changes": watcher.changes} if watcher else None,
         "environment_variables": {
-            "CREDENTIAL_MANAGER_READ_ONLY": os.getenv('CREDENTIAL_MANAGER_READ_ONLY', 'true')
+            "CREDENTIAL_MANAGER_READ_ONLY": os.getenv('CREDENTIAL_MANAGER_READ_ONLY', 'true'),
+            "CREDENTIAL_MANAGER_BACKEND": os.getenv('CREDENTIAL_MANAGER_BACKEND', 'json'),
+            "CREDENTIAL_MANAGER_DURABILITY": store.durability,
+            "CREDENTIAL_MANAGER_LOCK_TIMEOUT": store.lock_timeout,
+            "CREDENTIAL_MANAGER_EXPIRY_SWEEP": os.getenv('CREDENTIAL_MANAGER_EXPIRY_SWEEP', 'off'),
+            "CREDENTIAL_MANAGER_METRICS": os.getenv('CREDENTIAL_MANAGER_METRICS', 'false'),
+            "CREDENTIAL_MANAGER_WATCH": os.getenv('CREDENTIAL_MANAGER_WATCH', 'auto')
         }
+    })
+
+@mcp.resource("credential://store/metrics")
+def get_store_metrics() -> dict:
+    """Provides per-tool and per-operation latency, lock waits, bytes read/written and call counts"""
+    async_store = get_async_store()
+    store = async_store.store
+    return {
+        **metrics.snapshot(),
+        "backend": store.backend_name,
+        "cache": store.cache_stats(),
+        "responses": async_store.responses.stats(),
+        "fsyncs": store.fsyncs
     }
 
+@mcp.resource("credential://store/metrics/prometheus", mime_type="text/plain")
+def get_store_metrics_prometheus() -> str:
+    """Provides the store metrics in the Prometheus text exposition format"""
+    async_store = get_async_store()
+    store = async_store.store
+    cache = store.cache_stats()
+    return metrics.prometheus() + "".join(
+        f"# TYPE credential_manager_{name}_total counter\ncredential_manager_{name}_total {value}\n"
+        for name, value in (("cache_hits", cache["hits"]), ("cache_misses", cache["misses"]),
+                            ("response_cache_hits", async_store.responses.hits),
+                            ("response_cache_misses", async_store.responses.misses),
+                            ("fsyncs", store.fsyncs))
+    )
+
 @mcp.resource("credential://help")
 def get_help() -> str:
     """Provides help information about using the credential manager"""
+    async_store = get_async_store()
+    store = async_store.store
+    cache_key = (None, store.read_only, "help", str(store.store_path))
+    cached = async_store.responses.get(cache_key)
+    if cached is not None:
+        return cached
+    return async_store.responses.put(cache_key, _help_text(store))
+
+def _help_text(store: CredentialStore) -> str:
+    """Build the help text for a store"""
     mode_text = "read-only" if store.read_only else "read-write"
-    tools_list = ["1. list_credentials() - List stored credentials (essential data only)"]
-    tools_list.append("2. get_credential_details(credential_id) - Get full details including access token")
+    tools_list = [
+        "list_credentials([limit], [cursor], [exclude_expired], [if_none_match], [since_version]) - List stored credentials (essential data only), optionally paged",
+        "get_credential_details(credential_id, [if_none_match]) - Get full details including access token",
+        "get_credentials_details(credential_ids) - Get full details for several credentials",
+        "find_credentials([app], [user_name], [host], [prefix], [exclude_expired]) - Find credentials without listing everything",
+        "expiring_credentials(within_seconds) - List credentials expiring soon (or already expired)",
+        "export_credentials([format], [limit], [cursor]) - Export full records as JSONL or CSV, a page at a time"
+    ]
     
     if not store.read_only:
         tools_list.extend([
-            "3. add_credential(app, base_url, access_token, [user_name], [expires]) - Add new credential",
-            "4. update_credential(credential_id, [fields...]) - Update existing credential",
-            "5. delete_credential(credential_id) - Delete a credential"
+            "add_credential(app, base_url, access_token, [user_name], [expires]) - Add new credential",
+            "update_credential(credential_id, [fields...]) - Update existing credential",
+            "delete_credential(credential_id) - Delete a credential",
+            "add_credentials(credentials, [atomic]) - Add several credentials in one save",
+            "update_credentials(updates, [atomic]) - Update several credentials in one save",
+            "delete_credentials(credential_ids, [atomic]) - Delete several credentials in one save",
+            "import_credentials(data, [format], [on_duplicate]) - Bulk import JSONL or CSV, skipping or updating duplicates"
         ])
     
-    tools_text = "\n".join(tools_list)
+    tools_text = "\n".join(f"{i}. {tool}" for i, tool in enumerate(tools_list, 1))
     
     return f"""
 Credential Manager Help
@@ -354,17 +1942,60 @@ Credential fields:
 - base_url: The application's base URL
 - access_token: The API token/key
 - user_name: Optional username (shown only when multiple credentials for same app)
-- expires: ISO datetime (YYYY-MM-DDTHH:MM:SS) or "never"
+- expires: ISO datetime (YYYY-MM-DDTHH:MM:SS, UTC unless an offset is given) or "never"
+
+Batch tools:
+- Run every item under one lock with one load and one save
+- atomic=true (default): all-or-nothing; atomic=false: best-effort with per-item results
+
+Bulk import and export:
+- Records have the credential fields; CSV starts with a header row naming them
+- A record with the same app, user_name and base_url as a stored credential is a duplicate:
+  on_duplicate="skip" (default) leaves it alone, "update" overwrites its other fields
+- From a shell: credential-manager-mcp import FILE / export FILE
+
+Store versions:
+- list_credentials, get_credential_details and credential://store/info return the store version,
+  which every change increases
+- list_credentials(if_none_match=v) answers not_modified=true if nothing changed since v;
+  list_credentials(since_version=v) returns only the changed entries and deleted IDs
+- get_credential_details(id, if_none_match=v) answers not_modified=true if that credential is unchanged
+
+Named stores:
+- Every tool takes an optional store="name" to use a named store (one per team or profile)
+  instead of the default one; in read-write mode, adding to a new name creates it
+- credential://stores lists them; credential://stores/{{name}}/info describes one
 
 Storage:
 - Fixed location: ~/.credential-manager-mcp/credentials.json
 
 Environment Variables:
 - CREDENTIAL_MANAGER_READ_ONLY: Set to 'false' to enable write operations (default: 'true')
+- CREDENTIAL_MANAGER_BACKEND: 'json' (default), 'journal' for append-only writes, 'sqlite', 'sharded' or 'binary'
+- CREDENTIAL_MANAGER_DURABILITY: 'fsync' (default) or 'group' to batch fsyncs
+- CREDENTIAL_MANAGER_EXPIRY_SWEEP: 'off' (default), 'flag' to mark expired credentials in listings or 'purge' to delete them
+- CREDENTIAL_MANAGER_EXPIRY_SWEEP_INTERVAL: Seconds between expiry sweeps (default: 60)
+- CREDENTIAL_MANAGER_METRICS: Set to 'true' to collect latency and I/O metrics (credential://store/metrics)
+- CREDENTIAL_MANAGER_WRITE_BATCH_SIZE / CREDENTIAL_MANAGER_WRITE_BATCH_DELAY_MS: Concurrent single-credential
+  writes are saved together, up to this many (default: 64; 1 turns it off), waiting this long for company (default: 0)
+- CREDENTIAL_MANAGER_RESPONSE_CACHE_SIZE: Serialized list_credentials, help and info answers kept per store
+  until the next write (default: 64; 0 turns it off)
+- CREDENTIAL_MANAGER_LOCK_TIMEOUT: Seconds to wait for the store lock before answering "store busy" (default: 10)
+- CREDENTIAL_MANAGER_WATCH: 'auto' (default; inotify, else stat polling), 'inotify', 'poll' or 'off'.
+  Subscribe to credential://store/info to be notified when the store changes
+- CREDENTIAL_MANAGER_ENCRYPTION_KEY / CREDENTIAL_MANAGER_KEY_FILE: Key (or file holding it) to encrypt access tokens at rest
+- CREDENTIAL_MANAGER_STORES_DIR: Directory of named stores (default: ~/.credential-manager-mcp/stores)
+- CREDENTIAL_MANAGER_STORES: Extra named stores kept elsewhere, as name=path entries separated by ':'
+- CREDENTIAL_MANAGER_MAX_OPEN_STORES / CREDENTIAL_MANAGER_STORE_IDLE_TIMEOUT: Named stores kept loaded (default: 32)
+  and seconds before an unused one is unloaded (default: 600)
+- CREDENTIAL_MANAGER_DAEMON: Set to 'true' to proxy every session to one shared daemon process that keeps
+  the store in memory (started on demand over a Unix socket, CREDENTIAL_MANAGER_DAEMON_SOCKET;
+  exits after CREDENTIAL_MANAGER_DAEMON_IDLE_TIMEOUT seconds without sessions, default: 300)
 
 Tool Examples:
 - list_credentials()
 - get_credential_details("credential-id-here")
+- find_credentials(app="GitHub", user_name="myuser")
 {'- add_credential("GitHub", "https://api.github.com", "ghp_xxxx", "myuser", "2024-12-31T23:59:59")' if not store.read_only else ''}
 
 Security Features:
@@ -376,7 +2007,8 @@ Security Features:
 
 def main():
     """Main entry point for the credential manager MCP server"""
-    print(f"🔐 Starting Credential Manager in {'read-only' if READ_ONLY_MODE else 'read-write'} mode")
+    store = get_store()
+    print(f"🔐 Starting Credential Manager in {'read-only' if store.read_only else 'read-write'} mode")
     print(f"📁 Storage location: {store.store_path}")
     mcp.run()
 
@@ -0,0 +1,474 @@
+"""
+Sharded storage backend
+
+Spreads credentials over a fixed number of shard files in a directory next to
+credentials.json (credentials.shards/ by default):
+
+    credentials.shards/
+        manifest.json       shard count and which shards hold each app
+        shard-00.json       credentials whose ID hashes to shard 0
+        shard-00.json.lock  that shard's writer lock
+        layout.lock         held while a store reads or creates the layout
+        ...
+
+Each shard is a plain credentials.json-format file with its own flock, so
+writers touching different shards (in different server instances) proceed
+in parallel, and a write rewrites only the shards it changes. Readers revalidate
+per shard and re-read only the shards that changed.
+
+On first use an existing credentials.json next to the directory is imported;
+migrate_json_to_sharded() and export_sharded_to_json() convert explicitly in
+either direction without losing records.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from .metrics import metrics
+from .server import (CredentialRecord, CredentialStore, StoreBusyError, fsync_dir,
+                     get_credentials_path)
+
+DEFAULT_SHARD_COUNT = 16
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = "credential-manager-shards"
+
+
+def get_shard_dir(store_path: Optional[str] = None) -> Path:
+    """Return the shard directory for a store path (credentials.json -> credentials.shards/)"""
+    path = Path(store_path) if store_path else get_credentials_path()
+    if path.name == MANIFEST_NAME:
+        return path.parent
+    if path.suffix == ".shards" or path.is_dir():
+        return path
+    return path.with_suffix(".shards")
+
+
+def shard_of(cred_id: str, shard_count: int) -> int:
+    """Map a credential ID to its shard (stable across processes, unlike hash())"""
+    digest = hashlib.blake2b(cred_id.encode(), digest_size=4).digest()
+    return int.from_bytes(digest, "big") % shard_count
+
+
+def _write_json_atomically(path: Path, data, durable: bool = True) -> int:
+    """Replace path with data via a temp file and rename; returns the bytes written"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            if durable:
+                with metrics.timer("operation", "fsync"):
+                    os.fsync(f.fileno())
+            size = f.tell()
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return size
+
+
+class ShardedCredentialStore(CredentialStore):
+    """Credential store split over hash-of-ID shards, each with its own lock.
+
+    "group" durability is treated as "fsync": each write already touches only
+    its own small shard files.
+    """
+
+    backend_name = "sharded"
+
+    def __init__(self, store_path: Optional[str] = None, read_only: bool = True,
+                 shard_count: int = DEFAULT_SHARD_COUNT, **kwargs):
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1")
+        # An existing manifest's shard count wins over this one
+        self.shard_count = shard_count
+        self.shard_dir = get_shard_dir(store_path)
+        # Per shard: the IDs it holds in memory and the fingerprint of the file
+        # they were read from (None forces a re-read)
+        self._shard_ids: List[Set[str]] = []
+        self._shard_fingerprints: List[Optional[tuple]] = []
+        self._shard_errors: Dict[int, Exception] = {}
+        # Entries of each shard that failed to load, set aside before it is rewritten
+        self._shard_quarantined: Dict[int, list] = {}
+        # Lock file descriptors of the shards this store holds, by shard
+        self._held_shards: Dict[int, int] = {}
+        super().__init__(str(self.shard_dir / MANIFEST_NAME), read_only, **kwargs)
+
+    def shard_path(self, shard: int) -> Path:
+        return self.shard_dir / f"shard-{shard:02d}.json"
+
+    def shard_of(self, cred_id: str) -> int:
+        return shard_of(cred_id, self.shard_count)
+
+    def watched_files(self) -> List[Path]:
+        """The manifest and every shard file"""
+        return [self.store_path] + [self.shard_path(shard) for shard in range(self.shard_count)]
+
+    # Layout
+
+    def _ensure_file_exists(self):
+        """Create the shard files and manifest, importing a sibling credentials.json once"""
+        # The shard count is decided from what is on disk, so no other
+        # instance may be half-way through creating the layout meanwhile
+        deadline = None if self.lock_timeout is None else time.monotonic() + self.lock_timeout
+        with self._lock_file(self.shard_dir / "layout.lock", deadline):
+            self._ensure_layout()
+
+    def _ensure_layout(self):
+        manifest = self._read_manifest()
+        if manifest is not None:
+            self.shard_count = manifest["shard_count"]
+        else:
+            existing = sorted(self.shard_dir.glob("shard-*.json"))
+            if existing:
+                # Manifest lost; the shard files themselves give the count
+                self.shard_count = len(existing)
+        self._init_shard_state()
+
+        with self._lock_shards(range(self.shard_count)):
+            if self.shard_path(0).exists():
+                if manifest is None:
+                    merged: Dict[str, CredentialRecord] = {}
+                    for shard in range(self.shard_count):
+                        merged.update(self._load_shard(shard) or {})
+                    self._reset_credentials(merged)
+                    self._write_manifest(rebuild=True)
+                return
+            records: Dict[str, CredentialRecord] = {}
+            json_path = self.shard_dir.with_suffix(".json")
+            if json_path.exists():
+                try:
+                    records = self._read_import(json_path)
+                except ValueError as e:
+                    # Not a credentials file, or cut short: start empty and try again next time
+                    self._warn_once(f"Could not import {json_path}: {e}")
+                    return
+            shards: List[Dict[str, dict]] = [{} for _ in range(self.shard_count)]
+            for cred_id, record in records.items():
+                shards[self.shard_of(cred_id)][cred_id] = record.to_dict()
+            for shard, data in enumerate(shards):
+                _write_json_atomically(self.shard_path(shard), data)
+                self.shard_path(shard).chmod(0o600)
+            self._reset_credentials(records)
+            self._write_manifest(rebuild=True)
+            fsync_dir(self.shard_dir)
+
+    def _init_shard_state(self):
+        self._shard_ids = [set() for _ in range(self.shard_count)]
+        self._shard_fingerprints = [None] * self.shard_count
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            with open(self.store_path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get("format") == MANIFEST_FORMAT:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _write_manifest(self, shards: Iterable[int] = (), rebuild: bool = False):
+        """Update which shards hold each app, for the given shards (or all, with rebuild).
+
+        The manifest can always be rebuilt from the shards, so it is replaced
+        atomically but not fsynced.
+        """
+        with self._lock_file(self.shard_dir / f"{MANIFEST_NAME}.lock"):
+            manifest = None if rebuild else self._read_manifest()
+            if manifest is None:
+                manifest = {"format": MANIFEST_FORMAT, "version": 1,
+                            "shard_count": self.shard_count, "apps": {}}
+                shards = range(self.shard_count)
+            apps: Dict[str, Set[int]] = {app: set(ids) for app, ids in manifest["apps"].items()}
+            for shard in shards:
+                for holders in apps.values():
+                    holders.discard(shard)
+                for cred_id in self._shard_ids[shard]:
+                    apps.setdefault(self.credentials[cred_id].app, set()).add(shard)
+            manifest["apps"] = {app: sorted(holders) for app, holders in sorted(apps.items()) if holders}
+            _write_json_atomically(self.store_path, manifest, durable=False)
+
+    def shards_for_app(self, app: str) -> List[int]:
+        """Return the shards holding credentials for an app, according to the manifest"""
+        manifest = self._read_manifest() or {"apps": {}}
+        return manifest["apps"].get(app, [])
+
+    # Locking
+
+    @contextmanager
+    def _lock_file(self, path: Path, deadline: Optional[float] = None):
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self._flock(fd, fcntl.LOCK_EX, deadline)
+            yield
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def _lock_shards(self, shards: Iterable[int]):
+        """Hold the lock files of the given shards (those not already held), in shard order"""
+        deadline = None if self.lock_timeout is None else time.monotonic() + self.lock_timeout
+        acquired = []
+        try:
+            with metrics.timer("lock_wait", "shard"):
+                for shard in sorted(set(shards) - set(self._held_shards)):
+                    fd = os.open(self.shard_dir / f"shard-{shard:02d}.json.lock", os.O_RDWR | os.O_CREAT, 0o600)
+                    try:
+                        self._flock(fd, fcntl.LOCK_EX, deadline)
+                    except BaseException:
+                        os.close(fd)
+                        raise
+                    self._held_shards[shard] = fd
+                    acquired.append(shard)
+            yield
+        finally:
+            for shard in acquired:
+                os.close(self._held_shards.pop(shard))
+
+    @contextmanager
+    def _write_lock(self, keys: Optional[Iterable[str]] = None):
+        """Lock only the shards of the given IDs (every shard when keys is None).
+
+        Shards of new IDs are locked later, in _persist; new IDs can't
+        conflict with other writers.
+        """
+        timeout = -1 if self.lock_timeout is None else self.lock_timeout
+        if not self._state_lock.acquire(timeout=timeout):
+            raise StoreBusyError(self.lock_timeout)
+        try:
+            if keys is None:
+                shards = range(self.shard_count)
+            else:
+                shards = {self.shard_of(cred_id) for cred_id in keys if cred_id is not None}
+            with self._lock_shards(shards):
+                yield
+        finally:
+            self._state_lock.release()
+
+    def _watch_hit(self, force: bool) -> bool:
+        """Writers holding shard locks must always revalidate"""
+        return not self._held_shards and super()._watch_hit(force)
+
+    # Reading
+
+    def _shard_fingerprint(self, shard: int) -> Optional[tuple]:
+        try:
+            st = os.stat(self.shard_path(shard))
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _read_shard(self, shard: int) -> Dict[str, CredentialRecord]:
+        """Parse one shard file and remember its fingerprint.
+
+        Invalid entries are skipped and kept for the shard's quarantine file;
+        raises ValueError if the file isn't a JSON object or is cut short.
+        """
+        from .loader import LoadReport, iter_credentials
+
+        report = LoadReport()
+        try:
+            with open(self.shard_path(shard), 'rb') as f:
+                fingerprint = self._file_fingerprint(f.fileno())
+                records = dict(iter_credentials(f, report))
+        except FileNotFoundError:
+            self._shard_fingerprints[shard] = None
+            self._shard_quarantined.pop(shard, None)
+            return {}
+        self._warn_load_report(report)
+        if not report.complete:
+            raise ValueError("shard file ends before its closing brace")
+        metrics.add("bytes_read", fingerprint[1])
+        self._shard_fingerprints[shard] = self._cacheable(fingerprint)
+        self._shard_quarantined[shard] = report.quarantined
+        return records
+
+    def _load_shard(self, shard: int) -> Optional[Dict[str, CredentialRecord]]:
+        """Read a shard, recording (and printing) a parse error instead of raising"""
+        try:
+            records = self._read_shard(shard)
+            self._shard_errors.pop(shard, None)
+            return records
+        except ValueError as e:
+            self._warn_once(f"Could not load credential shard {shard}: {e}")
+            self._shard_errors[shard] = e
+            self._shard_fingerprints[shard] = None
+            return None
+
+    @metrics.timed("operation")
+    def load_credentials(self, force: bool = False):
+        """Bring self.credentials up to date, re-reading only the shards that changed"""
+        with self._state_lock:
+            if self._watch_hit(force):
+                self.cache_hits += 1
+                return
+            generation = self._watch_generation
+
+            stale = [
+                shard for shard in range(self.shard_count)
+                if force or self._shard_fingerprints[shard] is None
+                or self._shard_fingerprint(shard) != self._shard_fingerprints[shard]
+            ]
+            if not stale:
+                self.cache_hits += 1
+            elif len(stale) == self.shard_count:
+                # Full load: rebuild everything (and the indexes) in one go
+                self.cache_misses += 1
+                merged: Dict[str, CredentialRecord] = {}
+                for shard in stale:
+                    merged.update(self._load_shard(shard) or {})
+                self._reset_credentials(merged)
+            else:
+                self.cache_misses += 1
+                for shard in stale:
+                    self._replace_shard(shard, self._load_shard(shard) or {})
+
+            self._load_error = next(iter(self._shard_errors.values()), None)
+            self.quarantined = [entry for entries in self._shard_quarantined.values() for entry in entries]
+            fingerprints = tuple(self._shard_fingerprints)
+            self._cache_fingerprint = None if None in fingerprints else fingerprints
+            self._watch_loaded(generation)
+
+    def _replace_shard(self, shard: int, records: Dict[str, CredentialRecord]):
+        """Swap one shard's in-memory credentials for freshly read ones"""
+        for cred_id in list(self._shard_ids[shard]):
+            if cred_id not in records:
+                self._drop(cred_id)
+        for cred_id, record in records.items():
+            self._put(cred_id, record)
+
+    def _reset_credentials(self, credentials: Dict[str, CredentialRecord]):
+        super()._reset_credentials(credentials)
+        self._shard_ids = [set() for _ in range(self.shard_count)]
+        for cred_id in credentials:
+            self._shard_ids[self.shard_of(cred_id)].add(cred_id)
+
+    def _put(self, cred_id: str, credential: CredentialRecord):
+        super()._put(cred_id, credential)
+        self._shard_ids[self.shard_of(cred_id)].add(cred_id)
+
+    def _drop(self, cred_id: str):
+        super()._drop(cred_id)
+        self._shard_ids[self.shard_of(cred_id)].discard(cred_id)
+
+    def invalidate_cache(self):
+        super().invalidate_cache()
+        self._shard_fingerprints = [None] * self.shard_count
+
+    # Writing
+
+    @metrics.timed("operation", "flush")
+    def _persist(self, upserts: Dict[str, CredentialRecord], deletes: List[str]):
+        """Rewrite only the shards holding the changed credentials"""
+        if self.read_only:
+            raise RuntimeError("Cannot save credentials in read-only mode")
+        shards = {self.shard_of(cred_id) for cred_id in upserts} | {self.shard_of(cred_id) for cred_id in deletes}
+        try:
+            self._write_shards(shards, upserts, deletes)
+        except Exception:
+            self.invalidate_cache()
+            raise
+
+    def _write_shards(self, shards: Set[int], upserts: Dict[str, CredentialRecord], deletes: List[str],
+                      merge: bool = True):
+        """Write the given shards under their locks.
+
+        With merge, a shard another writer changed since it was read is
+        re-read first and upserts/deletes are re-applied on top of it;
+        without, the in-memory state is written as it is.
+        """
+        with self._state_lock, self._lock_shards(shards):
+            for shard in sorted(shards):
+                if shard in self._shard_errors:
+                    raise RuntimeError(f"Refusing to overwrite unreadable credential shard {shard}: "
+                                       f"{self._shard_errors[shard]}")
+                # Pick up other writers' changes to this shard, then re-apply ours
+                if merge and self._shard_fingerprint(shard) != self._shard_fingerprints[shard]:
+                    self._replace_shard(shard, self._load_shard(shard) or {})
+                    if shard in self._shard_errors:
+                        raise RuntimeError(f"Refusing to overwrite unreadable credential shard {shard}")
+                for cred_id, record in upserts.items():
+                    if self.shard_of(cred_id) == shard:
+                        self._put(cred_id, record)
+                for cred_id in deletes:
+                    if self.shard_of(cred_id) == shard:
+                        self._drop(cred_id)
+
+                data = {cred_id: self.credentials[cred_id].to_dict() for cred_id in sorted(self._shard_ids[shard])}
+                path = self.shard_path(shard)
+                # Invalid entries of the file being replaced go to the shard's quarantine file
+                self._save_quarantine(self._shard_quarantined.get(shard) or [],
+                                      path.with_name(path.name + ".quarantine"))
+                self._shard_quarantined.pop(shard, None)
+                metrics.add("bytes_written", _write_json_atomically(path, data))
+                self._shard_fingerprints[shard] = self._cacheable(self._shard_fingerprint(shard))
+            fsync_dir(self.shard_dir)
+            self.fsyncs += 1
+            self._write_manifest(shards)
+            fingerprints = tuple(self._shard_fingerprints)
+            self._cache_fingerprint = None if None in fingerprints else fingerprints
+
+    @metrics.timed("operation")
+    def save_credentials(self):
+        """Rewrite every shard from the in-memory credentials"""
+        if self.read_only:
+            raise RuntimeError("Cannot save credentials in read-only mode")
+        try:
+            with self._write_lock():
+                self._write_shards(set(range(self.shard_count)), {}, [], merge=False)
+        except Exception as e:
+            self.invalidate_cache()
+            print(f"Error saving credentials: {e}")
+
+    def import_records(self, records: Dict[str, CredentialRecord]) -> int:
+        """Add (or overwrite) credentials, keeping their IDs; returns the count"""
+        with self._write_lock(keys=list(records)):
+            self.load_credentials()
+            for cred_id, record in records.items():
+                self._put(cred_id, record)
+            # Migration must be written even in a read-only server
+            read_only, self.read_only = self.read_only, False
+            try:
+                self._persist(records, [])
+            finally:
+                self.read_only = read_only
+        return len(records)
+
+
+def migrate_json_to_sharded(json_path: Optional[str] = None, shard_dir: Optional[str] = None,
+                            shard_count: int = DEFAULT_SHARD_COUNT) -> int:
+    """Copy every credential from a credentials.json file into a sharded store; returns the count.
+
+    Invalid entries are quarantined (see CredentialStore._read_import); raises
+    ValueError if the file isn't a JSON object or is cut short.
+    """
+    json_path = Path(json_path) if json_path else get_credentials_path()
+    shard_dir = get_shard_dir(str(shard_dir or json_path))
+    # Creating the layout next to a credentials.json imports it already
+    imported_on_open = (not (shard_dir / "shard-00.json").exists()
+                        and shard_dir.with_suffix(".json").absolute() == json_path.absolute())
+    store = ShardedCredentialStore(str(shard_dir), read_only=False, shard_count=shard_count)
+    if imported_on_open and store.shard_path(0).exists():
+        return len(store.credentials)
+    return store.import_records(store._read_import(json_path))
+
+
+def export_sharded_to_json(shard_dir: Optional[str] = None, json_path: Optional[str] = None) -> int:
+    """Write every credential of a sharded store to a single credentials.json file; returns the count"""
+    json_path = Path(json_path) if json_path else get_credentials_path()
+    store = ShardedCredentialStore(str(shard_dir or get_shard_dir(str(json_path))))
+    target = CredentialStore(str(json_path), read_only=False)
+    with target._write_lock():
+        target._load_error = None
+        target._reset_credentials(dict(store.credentials))
+        target._write_file()
+    return len(store.credentials)
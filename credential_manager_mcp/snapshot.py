@@ -0,0 +1,213 @@
+"""
+Compact binary snapshot storage backend
+
+Stores credentials in credentials.snap, a compact binary file that is opened
+with mmap instead of being parsed as a whole:
+
+    header   magic, version, record count and the offsets of the sections below
+    metadata compact JSON array of [id, app, base_url, user_name, expires],
+             sorted by id
+    offsets  record count + 1 little-endian u64 offsets into the token section
+    tokens   the access tokens, UTF-8, back to back in metadata order
+
+Loading reads only the header and the metadata section, so listing and
+searching never touch the token pages; an access token is read from the
+mapping (two offsets and its own bytes) when a record's details are
+requested. Writes rewrite the file atomically, like the JSON backend.
+
+credentials.json stays the human-editable default. On first use an existing
+credentials.json next to the snapshot is imported; json_to_snapshot() and
+snapshot_to_json() convert explicitly in either direction.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .server import CredentialRecord, CredentialStore, get_credentials_path
+
+MAGIC = b"CMSNAP\x00\x01"
+FORMAT_VERSION = 1
+
+# magic, version, record count, metadata offset and length, offsets offset, tokens offset
+HEADER = struct.Struct("<8sIIQQQQ")
+OFFSET = struct.Struct("<QQ")
+
+# The access_token slot of plain records, which SnapshotRecord shadows
+_TOKEN_SLOT = CredentialRecord.__dict__["access_token"]
+
+
+def get_snapshot_path(store_path: Optional[str] = None) -> Path:
+    """Return the snapshot path for a store path (credentials.json -> credentials.snap)"""
+    path = Path(store_path) if store_path else get_credentials_path()
+    return path if path.suffix == ".snap" else path.with_suffix(".snap")
+
+
+def encode_snapshot(records: Iterable[CredentialRecord]) -> bytes:
+    """Return the snapshot file contents for records"""
+    records = sorted(records, key=lambda record: record.id)
+    metadata = json.dumps(
+        [[r.id, r.app, r.base_url, r.user_name, r.expires] for r in records],
+        separators=(",", ":")
+    ).encode()
+    tokens = [r.access_token.encode() for r in records]
+    offsets = [0]
+    for token in tokens:
+        offsets.append(offsets[-1] + len(token))
+
+    metadata_offset = HEADER.size
+    offsets_offset = metadata_offset + len(metadata)
+    tokens_offset = offsets_offset + 8 * len(offsets)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(records), metadata_offset, len(metadata),
+                         offsets_offset, tokens_offset)
+    return b"".join([header, metadata, struct.pack(f"<{len(offsets)}Q", *offsets), *tokens])
+
+
+class Snapshot:
+    """A memory-mapped snapshot file.
+
+    The mapping stays valid after the file is replaced or the descriptor is
+    closed, and lives as long as any record read from it.
+    """
+
+    def __init__(self, f):
+        self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise ValueError("credential snapshot is truncated")
+        (magic, version, self.count, self._metadata_offset, self._metadata_length,
+         self._offsets_offset, self._tokens_offset) = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError("not a credential snapshot file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"unsupported credential snapshot version {version}")
+        if self._tokens_offset > len(self._map):
+            raise ValueError("credential snapshot is truncated")
+
+    def metadata(self) -> List[list]:
+        """Return [id, app, base_url, user_name, expires] for every record, in slot order"""
+        start = self._metadata_offset
+        return json.loads(self._map[start:start + self._metadata_length])
+
+    def token(self, slot: int) -> str:
+        """Read one record's access token from the mapping"""
+        start, end = OFFSET.unpack_from(self._map, self._offsets_offset + 8 * slot)
+        return self._map[self._tokens_offset + start:self._tokens_offset + end].decode()
+
+    def records(self) -> Dict[str, "SnapshotRecord"]:
+        """Return lazy records for every entry, keyed by ID"""
+        return {
+            cred_id: SnapshotRecord(self, slot, app, cred_id, base_url, user_name, expires)
+            for slot, (cred_id, app, base_url, user_name, expires) in enumerate(self.metadata())
+        }
+
+
+class SnapshotRecord(CredentialRecord):
+    """A record whose access_token stays in the mapped snapshot until it is read"""
+
+    __slots__ = ("_snapshot", "_slot")
+
+    def __init__(self, snapshot: Snapshot, slot: int, app: str, id: str, base_url: str,
+                 user_name: Optional[str] = None, expires: Optional[str] = None):
+        self.app = app
+        self.id = id
+        self.base_url = base_url
+        self.user_name = user_name
+        self.expires = expires
+        self._snapshot = snapshot
+        self._slot = slot
+
+    @property
+    def access_token(self) -> str:
+        if self._snapshot is not None:
+            return self._snapshot.token(self._slot)
+        return _TOKEN_SLOT.__get__(self)
+
+    @access_token.setter
+    def access_token(self, value: str):
+        _TOKEN_SLOT.__set__(self, value)
+        self._snapshot = None
+
+
+class SnapshotCredentialStore(CredentialStore):
+    """Credential store kept in a memory-mapped binary snapshot"""
+
+    backend_name = "binary"
+
+    def __init__(self, store_path: Optional[str] = None, read_only: bool = True, **kwargs):
+        super().__init__(str(get_snapshot_path(store_path)), read_only, **kwargs)
+
+    def _ensure_file_exists(self):
+        """Create the snapshot, importing a sibling credentials.json, if it doesn't exist"""
+        if self.store_path.exists():
+            return
+        json_path = self.store_path.with_suffix(".json")
+        records = {}
+        if json_path.exists():
+            try:
+                records = self._read_import(json_path)
+            except ValueError as e:
+                # Not a credentials file, or cut short: start empty and try again next time
+                self._warn_once(f"Could not import {json_path}: {e}")
+                return
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_path.parent, prefix=f".{self.store_path.name}.")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(encode_snapshot(records.values()))
+                f.flush()
+                os.fsync(f.fileno())
+            # link() fails if another instance created the file first
+            os.link(tmp_path, self.store_path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+
+    def _parse_file(self, f) -> Dict[str, CredentialRecord]:
+        """Map the snapshot and read only its metadata section"""
+        return Snapshot(f).records()
+
+    def _serialize(self) -> bytes:
+        return encode_snapshot(self.credentials.values())
+
+    def _changed_ids(self, old: Dict[str, CredentialRecord],
+                     new: Dict[str, CredentialRecord]) -> Optional[List[str]]:
+        """Comparing a reloaded snapshot record by record would read every token from the mapping"""
+        return None
+
+
+def json_to_snapshot(json_path: Optional[str] = None, snapshot_path: Optional[str] = None) -> int:
+    """Write every credential of a credentials.json file to a snapshot; returns the count.
+
+    Invalid entries are quarantined (see CredentialStore._read_import); raises
+    ValueError if the file isn't a JSON object or is cut short.
+    """
+    json_path = Path(json_path) if json_path else get_credentials_path()
+    snapshot_path = get_snapshot_path(str(snapshot_path or json_path))
+    # Opening a snapshot that doesn't exist yet imports the credentials.json next to it
+    imported_on_open = (not snapshot_path.exists()
+                        and snapshot_path.with_suffix(".json").absolute() == json_path.absolute())
+    target = SnapshotCredentialStore(str(snapshot_path), read_only=False)
+    if imported_on_open and target.store_path.exists():
+        return len(target.credentials)
+    records = target._read_import(json_path)
+    with target._write_lock():
+        target._load_error = None
+        target._reset_credentials(records)
+        target._write_file()
+    return len(records)
+
+
+def snapshot_to_json(snapshot_path: Optional[str] = None, json_path: Optional[str] = None) -> int:
+    """Write every credential of a snapshot to a credentials.json file; returns the count"""
+    json_path = Path(json_path) if json_path else get_credentials_path()
+    source = SnapshotCredentialStore(str(snapshot_path or get_snapshot_path(str(json_path))))
+    target = CredentialStore(str(json_path), read_only=False)
+    with target._write_lock():
+        target._load_error = None
+        target._reset_credentials(dict(source.credentials))
+        target._write_file()
+    return len(source.credentials)
@@ -0,0 +1,264 @@
+"""
+SQLite storage backend
+
+Stores credentials in credentials.db, one row per credential, in WAL mode so
+readers never block writers (and vice versa) across server instances. Every
+write transaction bumps a store revision and stamps the rows it touches with
+it; deletions leave tombstones. Readers use those stamps to catch up on only
+the rows changed since their last load instead of reloading everything.
+
+On first use, an existing credentials.json next to the database is imported
+once. Entries of it that aren't valid credentials are skipped and set aside
+in credentials.json.quarantine, as the json backend does.
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .metrics import metrics
+from .server import CredentialRecord, CredentialStore, StoreBusyError, get_credentials_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS credentials (
+    id TEXT PRIMARY KEY,
+    app TEXT NOT NULL,
+    base_url TEXT NOT NULL,
+    access_token TEXT NOT NULL,
+    user_name TEXT,
+    expires TEXT,
+    rev INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_credentials_app ON credentials (app COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_credentials_user_name ON credentials (user_name);
+CREATE INDEX IF NOT EXISTS idx_credentials_expires ON credentials (expires);
+CREATE INDEX IF NOT EXISTS idx_credentials_rev ON credentials (rev);
+CREATE TABLE IF NOT EXISTS tombstones (
+    id TEXT PRIMARY KEY,
+    rev INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tombstones_rev ON tombstones (rev);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('rev', 0), ('tombstone_floor', 0), ('json_imported', 0);
+"""
+
+COLUMNS = "app, id, base_url, access_token, user_name, expires"
+
+# Tombstones older than this many revisions are pruned; readers that are
+# further behind than that fall back to a full reload
+TOMBSTONE_RETENTION_REVS = 10000
+
+# How long to wait for another instance's write transaction, in seconds, when
+# the store has no lock timeout
+BUSY_TIMEOUT = 30.0
+
+
+def get_database_path(store_path: Optional[str] = None) -> Path:
+    """Return the database path for a store path (credentials.json -> credentials.db)"""
+    path = Path(store_path) if store_path else get_credentials_path()
+    return path if path.suffix == ".db" else path.with_suffix(".db")
+
+
+class SQLiteCredentialStore(CredentialStore):
+    """Credential store backed by a WAL-mode SQLite database with per-row writes"""
+
+    backend_name = "sqlite"
+
+    def __init__(self, store_path: Optional[str] = None, read_only: bool = True, **kwargs):
+        self._conn: Optional[sqlite3.Connection] = None
+        self._in_transaction = False
+        # Store revision self.credentials reflects; None forces a full reload
+        self._loaded_rev: Optional[int] = None
+        super().__init__(str(get_database_path(store_path)), read_only, **kwargs)
+
+    def _ensure_file_exists(self):
+        """Open the database, create the schema and import credentials.json once"""
+        timeout = BUSY_TIMEOUT if self.lock_timeout is None else self.lock_timeout
+        self._conn = sqlite3.connect(self.store_path, timeout=timeout,
+                                     isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # "group" durability lets WAL commits skip the per-commit fsync
+        self._conn.execute(f"PRAGMA synchronous={'NORMAL' if self.durability == 'group' else 'FULL'}")
+        self._conn.executescript(SCHEMA)
+        self.store_path.chmod(0o600)
+
+        json_path = self.store_path.with_suffix(".json")
+        with self._write_lock():
+            imported = self._meta("json_imported")
+            if not imported and json_path.exists():
+                try:
+                    self.import_json(json_path)
+                except ValueError as e:
+                    # Not a credentials file, or cut short: start empty and try again next time
+                    self._warn_once(f"Could not import {json_path}: {e}")
+                    return
+            self._conn.execute("UPDATE meta SET value = 1 WHERE key = 'json_imported'")
+
+    def close(self):
+        """Flush queued changes and close the database connection"""
+        try:
+            super().close()
+        finally:
+            with self._state_lock:
+                self._conn.close()
+
+    def watched_files(self) -> List[Path]:
+        """Commits land in the WAL file, checkpoints in the database file"""
+        return [self.store_path, self.store_path.with_name(self.store_path.name + "-wal")]
+
+    def _meta(self, key: str) -> int:
+        """Read a meta counter"""
+        return self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()[0]
+
+    @contextmanager
+    def _write_lock(self, keys: Optional[Iterable[str]] = None):
+        """Run the block in an IMMEDIATE transaction, which takes the database write lock"""
+        if not self._state_lock.acquire(timeout=-1 if self.lock_timeout is None else self.lock_timeout):
+            raise StoreBusyError(self.lock_timeout)
+        try:
+            if self._in_transaction:
+                yield
+                return
+            try:
+                with metrics.timer("lock_wait", "exclusive"):
+                    self._conn.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as e:
+                if "locked" in str(e) or "busy" in str(e):
+                    raise StoreBusyError(self.lock_timeout or BUSY_TIMEOUT) from e
+                raise
+            self._in_transaction = True
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                self.invalidate_cache()
+                raise
+            else:
+                self._conn.execute("COMMIT")
+            finally:
+                self._in_transaction = False
+        finally:
+            self._state_lock.release()
+
+    @contextmanager
+    def _read_snapshot(self):
+        """Run the block against one consistent database snapshot"""
+        if self._in_transaction:
+            yield
+            return
+        self._conn.execute("BEGIN")
+        try:
+            yield
+        finally:
+            self._conn.execute("COMMIT")
+
+    def invalidate_cache(self):
+        """Force the next read to reload every row"""
+        super().invalidate_cache()
+        self._loaded_rev = None
+
+    def cache_stats(self) -> dict:
+        """Return cache hit/miss counters and the loaded store revision"""
+        stats = super().cache_stats()
+        stats["valid"] = self._loaded_rev is not None
+        stats["revision"] = self._loaded_rev
+        return stats
+
+    @metrics.timed("operation")
+    def load_credentials(self, force: bool = False):
+        """Bring self.credentials up to date, reading only rows changed since the last load"""
+        with self._state_lock, self._read_snapshot():
+            rev = self._meta("rev")
+            if not force and self._loaded_rev is not None:
+                if rev == self._loaded_rev:
+                    self.cache_hits += 1
+                    return
+                if self._loaded_rev >= self._meta("tombstone_floor"):
+                    for (cred_id,) in self._conn.execute(
+                            "SELECT id FROM tombstones WHERE rev > ?", (self._loaded_rev,)):
+                        self._drop(cred_id)
+                    for row in self._conn.execute(
+                            f"SELECT {COLUMNS} FROM credentials WHERE rev > ?", (self._loaded_rev,)):
+                        self._put(row[1], CredentialRecord(*row))
+                    self._loaded_rev = rev
+                    self.cache_hits += 1
+                    return
+
+            self.cache_misses += 1
+            self._reset_credentials({
+                row[1]: CredentialRecord(*row)
+                for row in self._conn.execute(f"SELECT {COLUMNS} FROM credentials")
+            })
+            self._loaded_rev = rev
+            self._load_error = None
+
+    @metrics.timed("operation", "flush")
+    def _persist(self, upserts: Dict[str, CredentialRecord], deletes: List[str]):
+        """Write only the changed rows, stamped with a new store revision"""
+        if self.read_only:
+            raise RuntimeError("Cannot save credentials in read-only mode")
+
+        with self._write_lock():
+            rev = self._meta("rev") + 1
+            self._conn.executemany(
+                f"INSERT INTO credentials ({COLUMNS}, rev) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET app = excluded.app, base_url = excluded.base_url, "
+                "access_token = excluded.access_token, user_name = excluded.user_name, "
+                "expires = excluded.expires, rev = excluded.rev",
+                [(c.app, c.id, c.base_url, c.access_token, c.user_name, c.expires, rev)
+                 for c in upserts.values()]
+            )
+            # A live row never has a tombstone
+            self._conn.executemany("DELETE FROM tombstones WHERE id = ?", [(cred_id,) for cred_id in upserts])
+            if deletes:
+                self._conn.executemany("DELETE FROM credentials WHERE id = ?", [(cred_id,) for cred_id in deletes])
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO tombstones (id, rev) VALUES (?, ?)",
+                    [(cred_id, rev) for cred_id in deletes]
+                )
+                floor = rev - TOMBSTONE_RETENTION_REVS
+                if floor > self._meta("tombstone_floor"):
+                    self._conn.execute("DELETE FROM tombstones WHERE rev <= ?", (floor,))
+                    self._conn.execute("UPDATE meta SET value = ? WHERE key = 'tombstone_floor'", (floor,))
+            self._conn.execute("UPDATE meta SET value = ? WHERE key = 'rev'", (rev,))
+            # Our in-memory state already includes this change
+            if self._loaded_rev == rev - 1:
+                self._loaded_rev = rev
+
+    @metrics.timed("operation")
+    def save_credentials(self):
+        """Make the database match the in-memory credentials exactly"""
+        with self._write_lock():
+            stored = {row[0] for row in self._conn.execute("SELECT id FROM credentials")}
+            self._persist(dict(self.credentials), sorted(stored - set(self.credentials)))
+
+    def import_json(self, json_path) -> int:
+        """Import (or overwrite) credentials from a credentials.json file; returns the count.
+
+        Invalid entries are skipped and appended to the file's quarantine file
+        (credentials.json.quarantine); raises ValueError, importing nothing, if
+        the file isn't a JSON object or ends before its closing brace.
+        """
+        records = self._read_import(Path(json_path))
+        with self._write_lock():
+            self.load_credentials()
+            for cred_id, record in records.items():
+                self._put(cred_id, record)
+            # The import itself must be written even in a read-only server
+            read_only, self.read_only = self.read_only, False
+            try:
+                self._persist(records, [])
+            finally:
+                self.read_only = read_only
+        return len(records)
+
+
+def migrate_json_to_sqlite(json_path: Optional[str] = None, db_path: Optional[str] = None) -> int:
+    """One-shot import of a credentials.json file into a SQLite store; returns the count"""
+    json_path = Path(json_path) if json_path else get_credentials_path()
+    store = SQLiteCredentialStore(str(db_path or get_database_path(str(json_path))), read_only=False)
+    return store.import_json(json_path)
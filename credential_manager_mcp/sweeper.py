@@ -0,0 +1,83 @@
+"""
+Background sweeper for expired credentials
+
+Periodically asks the store for credentials whose expiry time has passed and
+either flags them (listings mark them "expired") or purges them. Each sweep
+only walks the expired end of the store's sorted expiry index, so its cost
+tracks the number of expired credentials, not the size of the store.
+"""
+
+import os
+import sys
+import threading
+from typing import List, Optional
+
+SWEEP_MODES = ("off", "flag", "purge")
+
+
+def get_sweep_mode() -> str:
+    """Get the expiry sweep mode from the environment"""
+    mode = os.getenv("CREDENTIAL_MANAGER_EXPIRY_SWEEP", "off").lower()
+    if mode not in SWEEP_MODES:
+        raise ValueError(f"CREDENTIAL_MANAGER_EXPIRY_SWEEP must be one of {SWEEP_MODES}, got: {mode}")
+    return mode
+
+
+def get_sweep_interval() -> float:
+    """Get the seconds between sweeps from the environment"""
+    return float(os.getenv("CREDENTIAL_MANAGER_EXPIRY_SWEEP_INTERVAL", "60"))
+
+
+class ExpirySweeper:
+    """Runs store.sweep_expired() on a daemon thread every interval seconds"""
+
+    def __init__(self, store, mode: str = "flag", interval: float = 60.0):
+        if mode not in ("flag", "purge"):
+            raise ValueError(f"mode must be 'flag' or 'purge', got: {mode}")
+        if mode == "purge" and store.read_only:
+            raise ValueError("Purging expired credentials needs a read-write store")
+        self.store = store
+        self.mode = mode
+        self.interval = interval
+        self.sweeps = 0
+        self.last_swept: List[str] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sweep(self) -> List[str]:
+        """Run one sweep now and return the IDs it flagged or purged"""
+        self.last_swept = self.store.sweep_expired(purge=self.mode == "purge")
+        self.sweeps += 1
+        return self.last_swept
+
+    def start(self):
+        """Start sweeping in the background (the first sweep runs immediately)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="credential-expiry-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the background thread and wait for it to exit"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        """Background thread body"""
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Error sweeping expired credentials: {e}", file=sys.stderr)
+            self._stop.wait(self.interval)
+
+    def stats(self) -> dict:
+        """Return the sweeper settings and the result of the last sweep"""
+        return {
+            "mode": self.mode,
+            "interval_seconds": self.interval,
+            "sweeps": self.sweeps,
+            "last_swept": len(self.last_swept),
+        }
@@ -0,0 +1,287 @@
+"""
+Named credential stores served from one process
+
+Besides its default store, the server can host any number of named stores,
+one per team or profile. Tools take an optional `store` argument and each
+store's info is available as credential://stores/{name}/info.
+
+A named store lives in its own directory, <stores dir>/<name>/ (the stores
+dir defaults to ~/.credential-manager-mcp/stores), unless
+CREDENTIAL_MANAGER_STORES maps the name to a file elsewhere. Stores are
+loaded on first use and kept in an LRU of at most max_open; a store idle for
+longer than idle_timeout, or pushed out of the LRU, is flushed, closed and
+dropped from memory, and simply loaded again when it is next used. Tools hold
+their store with StoreRegistry.using(), so a store evicted in the middle of a
+call is only unloaded once that call is done with it. Unloading waits for the
+store's queued calls and its flush, so the async entry points do it on a
+worker thread.
+"""
+
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .async_store import AsyncCredentialStore
+from .server import CredentialStore, create_store, get_credentials_path
+
+DEFAULT_STORE_NAME = "default"
+
+_STORE_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+
+
+def get_stores_dir() -> Path:
+    """Get the directory holding named stores from the environment"""
+    value = os.getenv("CREDENTIAL_MANAGER_STORES_DIR")
+    return Path(value).expanduser() if value else get_credentials_path().parent / "stores"
+
+
+def get_store_paths() -> Dict[str, Path]:
+    """Get explicit store locations from CREDENTIAL_MANAGER_STORES ("name=path" entries separated by os.pathsep)"""
+    paths = {}
+    for entry in os.getenv("CREDENTIAL_MANAGER_STORES", "").split(os.pathsep):
+        if not entry.strip():
+            continue
+        name, sep, path = entry.partition("=")
+        if not sep or not _STORE_NAME.fullmatch(name.strip()):
+            raise ValueError(f"CREDENTIAL_MANAGER_STORES entries must look like name=path, got: {entry}")
+        paths[name.strip()] = Path(path.strip()).expanduser()
+    return paths
+
+
+def get_max_open_stores() -> int:
+    """Get how many named stores may be loaded at once from the environment"""
+    return int(os.getenv("CREDENTIAL_MANAGER_MAX_OPEN_STORES", "32"))
+
+
+def get_store_idle_timeout() -> float:
+    """Get the seconds after which an unused named store is unloaded from the environment"""
+    return float(os.getenv("CREDENTIAL_MANAGER_STORE_IDLE_TIMEOUT", "600"))
+
+
+class StoreRegistry:
+    """Loads named stores on demand and unloads the least recently used ones.
+
+    Every store is opened with the registry's backend, read-only mode and
+    store options, and gets its own AsyncCredentialStore worker thread, so a
+    store waiting on its lock never holds up the others.
+    """
+
+    def __init__(self, stores_dir: Optional[str] = None, read_only: bool = True,
+                 backend: Optional[str] = None, max_open: Optional[int] = None,
+                 idle_timeout: Optional[float] = None, paths: Optional[Dict[str, str]] = None,
+                 **store_kwargs):
+        self.stores_dir = Path(stores_dir) if stores_dir else get_stores_dir()
+        self.read_only = read_only
+        self.backend = backend
+        self.max_open = get_max_open_stores() if max_open is None else max_open
+        if self.max_open < 1:
+            raise ValueError(f"max_open must be at least 1, got: {self.max_open}")
+        self.idle_timeout = get_store_idle_timeout() if idle_timeout is None else idle_timeout
+        self.paths = get_store_paths() if paths is None else {name: Path(path) for name, path in paths.items()}
+        self._store_kwargs = store_kwargs
+        # name -> (async store, monotonic time of last use), least recently used first
+        self._open: "OrderedDict[str, Tuple[AsyncCredentialStore, float]]" = OrderedDict()
+        # async store -> number of callers using it; evicted stores still in use wait in _retired
+        self._users: Dict[AsyncCredentialStore, int] = {}
+        self._retired = set()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def store_path(self, name: str) -> Path:
+        """Return where the named store is kept"""
+        if name in self.paths:
+            return self.paths[name]
+        if not _STORE_NAME.fullmatch(name) or name == DEFAULT_STORE_NAME:
+            raise ValueError(f"Invalid store name '{name}' (use letters, digits, '.', '_' and '-')")
+        return self.stores_dir / name / "credentials.json"
+
+    def exists(self, name: str) -> bool:
+        """Whether the named store has been created"""
+        return name in self.paths or self.store_path(name).parent.is_dir()
+
+    def names(self) -> List[str]:
+        """Return the names of every store that exists, loaded or not"""
+        names = set(self.paths)
+        if self.stores_dir.is_dir():
+            names.update(entry.name for entry in self.stores_dir.iterdir()
+                         if entry.is_dir() and _STORE_NAME.fullmatch(entry.name))
+        names.discard(DEFAULT_STORE_NAME)
+        return sorted(names)
+
+    def loaded(self) -> List[str]:
+        """Return the names of the stores in memory, least recently used first"""
+        with self._lock:
+            return list(self._open)
+
+    def _resolve(self, name: str, create: bool) -> Path:
+        path = self.store_path(name)
+        if not (create and not self.read_only) and not self.exists(name):
+            raise ValueError(f"Unknown store '{name}'")
+        return path
+
+    def _pin(self, async_store: AsyncCredentialStore):
+        # Called with self._lock held
+        self._users[async_store] = self._users.get(async_store, 0) + 1
+
+    def _retire(self, evicted: List[AsyncCredentialStore]) -> List[AsyncCredentialStore]:
+        """Return the evicted stores nobody is using; the others are unloaded on their last release"""
+        # Called with self._lock held
+        self.evictions += len(evicted)
+        in_use = {async_store for async_store in evicted if async_store in self._users}
+        self._retired.update(in_use)
+        return [async_store for async_store in evicted if async_store not in in_use]
+
+    def _release(self, async_store: AsyncCredentialStore) -> List[AsyncCredentialStore]:
+        """Drop one use of the store; returns it if it was retired and is now due to be unloaded"""
+        with self._lock:
+            self._users[async_store] -= 1
+            if self._users[async_store]:
+                return []
+            del self._users[async_store]
+            if async_store not in self._retired:
+                return []
+            self._retired.discard(async_store)
+        return [async_store]
+
+    def _lookup(self, name: str, pin: bool = False) -> Tuple[Optional[AsyncCredentialStore], List[AsyncCredentialStore]]:
+        """Return the loaded store (marked used) and the idle stores to unload"""
+        evicted = []
+        with self._lock:
+            now = time.monotonic()
+            entry = self._open.get(name)
+            if entry is not None:
+                self._open[name] = (entry[0], now)
+                self._open.move_to_end(name)
+                if pin:
+                    self._pin(entry[0])
+            while self._open:
+                oldest, (_, last_used) = next(iter(self._open.items()))
+                if now - last_used <= self.idle_timeout:
+                    break
+                evicted.append(self._open.pop(oldest)[0])
+            evicted = self._retire(evicted)
+        return (entry[0] if entry is not None else None), evicted
+
+    def _create(self, path: Path) -> CredentialStore:
+        return create_store(self.backend, str(path), read_only=self.read_only, **self._store_kwargs)
+
+    def _admit(self, name: str, store: CredentialStore,
+               pin: bool = False) -> Tuple[AsyncCredentialStore, List[AsyncCredentialStore], Optional[CredentialStore]]:
+        """Add a freshly loaded store.
+
+        Returns the store to use, the least recently used stores beyond
+        max_open to unload, and the freshly loaded store again if another
+        caller loaded the same one first and it must be closed unused.
+        """
+        evicted = []
+        duplicate = None
+        with self._lock:
+            entry = self._open.get(name)
+            if entry is not None:
+                # Another caller loaded it first; use theirs
+                async_store = entry[0]
+                duplicate = store
+            else:
+                async_store = AsyncCredentialStore(store)
+                self.loads += 1
+            self._open[name] = (async_store, time.monotonic())
+            self._open.move_to_end(name)
+            if pin:
+                self._pin(async_store)
+            while len(self._open) > self.max_open:
+                evicted.append(self._open.popitem(last=False)[1][0])
+            evicted = self._retire(evicted)
+        return async_store, evicted, duplicate
+
+    def _unload(self, evicted: List[AsyncCredentialStore], duplicate: Optional[CredentialStore] = None):
+        """Stop the evicted stores' worker threads and close them, along with an unused duplicate.
+
+        Blocks until the stores' queued calls have run and their changes are
+        written, so async callers run it with asyncio.to_thread().
+        """
+        stores = [duplicate] if duplicate is not None else []
+        for async_store in evicted:
+            # Queued calls still run before the store is closed under them
+            async_store.close(wait=True)
+            stores.append(async_store.store)
+        for store in stores:
+            try:
+                store.close()
+            except Exception as e:
+                print(f"Error saving credentials: {e}", file=sys.stderr)
+
+    def get(self, name: str, create: bool = False) -> AsyncCredentialStore:
+        """Return the named store, loading it if needed.
+
+        Raises ValueError for an invalid name, or for a store that doesn't exist
+        unless create is set and the registry is read-write.
+        """
+        found, evicted = self._lookup(name)
+        self._unload(evicted)
+        if found is not None:
+            return found
+        async_store, evicted, duplicate = self._admit(name, self._create(self._resolve(name, create)))
+        self._unload(evicted, duplicate)
+        return async_store
+
+    async def open(self, name: str, create: bool = False, pin: bool = False) -> AsyncCredentialStore:
+        """Like get(), but loads and unloads stores on a worker thread"""
+        found, evicted = self._lookup(name, pin)
+        if evicted:
+            await asyncio.to_thread(self._unload, evicted)
+        if found is not None:
+            return found
+        path = self._resolve(name, create)
+        async_store, evicted, duplicate = self._admit(name, await asyncio.to_thread(self._create, path), pin)
+        if evicted or duplicate is not None:
+            await asyncio.to_thread(self._unload, evicted, duplicate)
+        return async_store
+
+    @asynccontextmanager
+    async def using(self, name: str, create: bool = False):
+        """Open the named store for the length of the block.
+
+        If the store is evicted meanwhile it stays usable, and is unloaded
+        once the block and every other user of it are done.
+        """
+        async_store = await self.open(name, create, pin=True)
+        try:
+            yield async_store
+        finally:
+            evicted = self._release(async_store)
+            if evicted:
+                await asyncio.to_thread(self._unload, evicted)
+
+    def evict(self, name: str) -> bool:
+        """Unload a store now, or once its current users are done; returns whether it was loaded"""
+        with self._lock:
+            entry = self._open.pop(name, None)
+            evicted = self._retire([entry[0]]) if entry is not None else []
+        self._unload(evicted)
+        return entry is not None
+
+    def close(self):
+        """Unload every store (the ones in use once their users are done)"""
+        with self._lock:
+            evicted = self._retire([async_store for async_store, _ in self._open.values()])
+            self._open.clear()
+        self._unload(evicted)
+
+    def stats(self) -> dict:
+        """Return registry settings and load/eviction counters"""
+        return {
+            "stores_dir": str(self.stores_dir),
+            "loaded": self.loaded(),
+            "max_open": self.max_open,
+            "idle_timeout_seconds": self.idle_timeout,
+            "loads": self.loads,
+            "evictions": self.evictions
+        }
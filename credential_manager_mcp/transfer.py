@@ -0,0 +1,258 @@
+"""
+Streaming bulk import and export of credentials (JSONL and CSV)
+
+    credential-manager-mcp import FILE|- [--format jsonl|csv] [--on-duplicate skip|update]
+    credential-manager-mcp export FILE|- [--format jsonl|csv]
+
+Both directions work in chunks, so memory stays bounded by the chunk size
+rather than the size of the file or the store. An import reads CHUNK_SIZE
+records at a time, validates them and adds them with one lock, load and save
+per chunk (CredentialStore.import_credentials); a record with the same
+(app, user_name, base_url) as a stored credential, or as an earlier record,
+is a duplicate and is skipped or, with --on-duplicate update, updates that
+credential. Bad lines are reported with their line numbers and don't stop
+the import.
+
+An export writes every credential, tokens in plaintext, one page at a time
+in ID order. Export files are created readable by their owner only.
+
+Records have the fields in FIELDS. In CSV the first row names the columns
+and an empty cell is a missing value; "id" is optional on import and kept
+when no stored credential has it yet.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from pathlib import Path
+from typing import IO, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+FORMATS = ("jsonl", "csv")
+
+# Record fields, in the order they are exported
+FIELDS = ("id", "app", "base_url", "access_token", "user_name", "expires")
+
+# Records per chunk: one save per chunk on import, one page per chunk on export
+CHUNK_SIZE = 1000
+
+# Most per-line errors an ImportReport keeps; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+_SUFFIX_FORMATS = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv"}
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    """Return the explicit format, or the one the file name implies (JSONL by default)"""
+    fmt = (fmt or _SUFFIX_FORMATS.get(Path(path).suffix.lower(), "jsonl")).lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}' (expected one of: {', '.join(FORMATS)})")
+    return fmt
+
+
+class Row(NamedTuple):
+    """One record read from an import; record is None when the line couldn't be used"""
+    line: int
+    record: Optional[dict]
+    error: Optional[str] = None
+
+
+def _checked(line: int, record) -> Row:
+    if not isinstance(record, dict):
+        return Row(line, None, "record must be a JSON object")
+    unknown = set(record) - set(FIELDS)
+    if unknown:
+        return Row(line, None, f"Unknown fields: {', '.join(sorted(unknown))}")
+    return Row(line, record)
+
+
+def read_rows(lines: Iterable[str], fmt: str) -> Iterator[Row]:
+    """Parse records one at a time from lines of JSONL or CSV"""
+    if fmt == "jsonl":
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield Row(number, None, f"Invalid JSON: {e}")
+                continue
+            yield _checked(number, record)
+        return
+    if fmt != "csv":
+        raise ValueError(f"Unknown format '{fmt}' (expected one of: {', '.join(FORMATS)})")
+
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None:
+        return
+    unknown = set(reader.fieldnames) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown CSV columns: {', '.join(sorted(unknown))}")
+    for row in reader:
+        # Cells beyond the header end up under the None key
+        if None in row:
+            yield Row(reader.line_num, None, "row has more cells than the header")
+            continue
+        yield _checked(reader.line_num, {key: value for key, value in row.items() if value})
+
+
+def read_chunks(lines: Iterable[str], fmt: str, chunk_size: int = CHUNK_SIZE) -> Iterator[List[Row]]:
+    """Group read_rows() into lists of at most chunk_size rows"""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    chunk: List[Row] = []
+    for row in read_rows(lines, fmt):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ImportReport:
+    """Counts what an import did, chunk by chunk, and keeps the first errors with their lines"""
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {"read": 0, "added": 0, "updated": 0, "skipped": 0, "failed": 0}
+        self.chunks = 0
+        self.errors: List[dict] = []
+
+    def add(self, rows: List[Row], results: List[dict]):
+        """Record one chunk: its rows, and the store's results for the rows that had a record"""
+        self.chunks += 1
+        results = iter(results)
+        for row in rows:
+            self.counts["read"] += 1
+            if row.record is None:
+                self._failed(row.line, row.error)
+                continue
+            result = next(results)
+            if result["success"]:
+                self.counts[result["action"]] += 1
+            else:
+                self._failed(row.line, result["error"])
+
+    def _failed(self, line: int, error: str):
+        self.counts["failed"] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def to_dict(self) -> dict:
+        return {**self.counts, "chunks": self.chunks, "errors": self.errors}
+
+
+def import_stream(store, lines: Iterable[str], fmt: str = "jsonl", on_duplicate: str = "skip",
+                  chunk_size: int = CHUNK_SIZE) -> ImportReport:
+    """Import JSONL or CSV lines into a CredentialStore, one chunk (and one save) at a time"""
+    report = ImportReport()
+    for rows in read_chunks(lines, fmt, chunk_size):
+        records = [row.record for row in rows if row.record is not None]
+        report.add(rows, store.import_credentials(records, on_duplicate) if records else [])
+    return report
+
+
+def write_records(out: IO[str], records: List[dict], fmt: str, header: bool = False):
+    """Write records in JSONL or CSV (with a header row first if header is set)"""
+    if fmt == "jsonl":
+        for record in records:
+            out.write(json.dumps({name: record.get(name) for name in FIELDS}) + "\n")
+        return
+    writer = csv.DictWriter(out, FIELDS, extrasaction="ignore", lineterminator="\n")
+    if header:
+        writer.writeheader()
+    writer.writerows(records)
+
+
+def format_records(records: List[dict], fmt: str) -> str:
+    """Return records as a JSONL or CSV (with header) document"""
+    out = io.StringIO()
+    write_records(out, records, fmt, header=True)
+    return out.getvalue()
+
+
+def export_pages(store, chunk_size: int = CHUNK_SIZE) -> Iterator[List[dict]]:
+    """Yield every credential of a CredentialStore, token included, one page at a time in ID order"""
+    cursor = None
+    while True:
+        page, cursor = store.list_credentials_page(chunk_size, cursor)
+        credentials = store.get_credentials([item["id"] for item in page])
+        # A credential deleted between the two calls is simply left out
+        yield [credential.model_dump() for credential in credentials if credential is not None]
+        if cursor is None:
+            return
+
+
+def export_stream(store, out: IO[str], fmt: str = "jsonl", chunk_size: int = CHUNK_SIZE) -> int:
+    """Write every credential of a CredentialStore to out; returns how many were written"""
+    count = 0
+    for number, records in enumerate(export_pages(store, chunk_size)):
+        write_records(out, records, fmt, header=number == 0)
+        count += len(records)
+    return count
+
+
+def open_export_file(path: str) -> IO[str]:
+    """Open an export file for writing, readable by its owner only (it holds plaintext tokens)"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    # An existing file keeps its mode through O_CREAT
+    os.fchmod(fd, 0o600)
+    return open(fd, "w", newline="")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from .server import DUPLICATE_MODES, STORAGE_BACKEND, create_store
+    from .tenants import DEFAULT_STORE_NAME, StoreRegistry
+
+    parser = argparse.ArgumentParser(prog="credential-manager-mcp", description="Bulk import and export credentials")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="add credentials from a JSONL or CSV file")
+    importer.add_argument("file", help="file to read, or - for stdin")
+    importer.add_argument("--on-duplicate", choices=DUPLICATE_MODES, default="skip",
+                          help="what to do with a record matching a stored (app, user_name, base_url)")
+    exporter = commands.add_parser("export", help="write every credential, tokens included, to a JSONL or CSV file")
+    exporter.add_argument("file", help="file to write, or - for stdout")
+    for command in (importer, exporter):
+        command.add_argument("--format", choices=FORMATS, help="default: from the file name, else jsonl")
+        command.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="records per chunk")
+        command.add_argument("--store", help="named store (default: the default store)")
+    args = parser.parse_args(argv)
+
+    fmt = detect_format(args.file, args.format)
+    store_path = None
+    if args.store and args.store != DEFAULT_STORE_NAME:
+        store_path = str(StoreRegistry(backend=STORAGE_BACKEND).store_path(args.store))
+    # Like add-credential.sh, this writes regardless of CREDENTIAL_MANAGER_READ_ONLY,
+    # which only restricts what MCP clients may do
+    store = create_store(STORAGE_BACKEND, store_path, read_only=args.command == "export")
+
+    if args.command == "export":
+        if args.file == "-":
+            count = export_stream(store, sys.stdout, fmt, args.chunk_size)
+        else:
+            with open_export_file(args.file) as out:
+                count = export_stream(store, out, fmt, args.chunk_size)
+        print(f"✅ Exported {count} credentials", file=sys.stderr)
+        return 0
+
+    if args.file == "-":
+        report = import_stream(store, sys.stdin, fmt, args.on_duplicate, args.chunk_size)
+    else:
+        with open(args.file, newline="") as f:
+            report = import_stream(store, f, fmt, args.on_duplicate, args.chunk_size)
+    store.flush()
+    counts = report.counts
+    print(f"✅ Imported {counts['read']} records in {report.chunks} chunks: {counts['added']} added, "
+          f"{counts['updated']} updated, {counts['skipped']} skipped, {counts['failed']} failed",
+          file=sys.stderr)
+    for error in report.errors:
+        print(f"   line {error['line']}: {error['error']}", file=sys.stderr)
+    if counts["failed"] > len(report.errors):
+        print(f"   ... and {counts['failed'] - len(report.errors)} more", file=sys.stderr)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+Filesystem watcher for the credential store
+
+Watches the directory holding the store's files (so atomic renames and
+editors that delete and recreate the file are seen, not just in-place
+writes) and tells the store when one of them changes. Uses inotify on Linux
+and falls back to polling os.stat() elsewhere.
+
+While an inotify watch is active the store trusts its cache between change
+events and skips the per-call stat; with stat polling it keeps revalidating
+on every call, since a poll can miss a change for up to one interval.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+WATCH_MODES = ("auto", "inotify", "poll", "off")
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def get_watch_mode() -> str:
+    """Get the watch mode from the environment"""
+    mode = os.getenv("CREDENTIAL_MANAGER_WATCH", "auto").lower()
+    if mode not in WATCH_MODES:
+        raise ValueError(f"CREDENTIAL_MANAGER_WATCH must be one of {WATCH_MODES}, got: {mode}")
+    return mode
+
+
+def get_poll_interval() -> float:
+    """Get the stat polling interval in seconds from the environment"""
+    return float(os.getenv("CREDENTIAL_MANAGER_WATCH_POLL_INTERVAL", "1.0"))
+
+
+class _Inotify:
+    """Minimal ctypes binding for one inotify instance watching one directory"""
+
+    def __init__(self, directory: Path):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform")
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directory = directory
+        try:
+            self.add_watch()
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def add_watch(self):
+        """(Re)watch the directory, e.g. after it was replaced"""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(self.directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {self.directory}")
+
+    def read_events(self) -> List[Tuple[int, str]]:
+        """Return the pending (mask, file name) events"""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            events.append((mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class StoreWatcher:
+    """Background thread that reports changes to a store's files.
+
+    on_change is called (on the watcher thread) once per burst of changes,
+    after the store has been told its cache may be stale.
+    """
+
+    def __init__(self, store, on_change: Optional[Callable[[], None]] = None,
+                 mode: str = "auto", poll_interval: float = 1.0):
+        if mode not in WATCH_MODES or mode == "off":
+            raise ValueError(f"mode must be 'auto', 'inotify' or 'poll', got: {mode}")
+        self.store = store
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.changes = 0
+        self._names = {path.name for path in store.watched_files()}
+        self._directory = store.store_path.parent
+        self._inotify: Optional[_Inotify] = None
+        if mode in ("auto", "inotify"):
+            try:
+                self._inotify = _Inotify(self._directory)
+            except (OSError, AttributeError):
+                if mode == "inotify":
+                    raise
+        self.mode = "inotify" if self._inotify else "poll"
+        self._stop = threading.Event()
+        # stop() writes to this pipe to wake the inotify loop immediately
+        self._wake_r, self._wake_w = os.pipe() if self._inotify else (None, None)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start watching in the background"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.store.attach_watcher(trusted=self.mode == "inotify")
+        self._thread = threading.Thread(target=self._run, name="credential-store-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop watching; the store goes back to revalidating on every call"""
+        self._stop.set()
+        self.store.detach_watcher()
+        if self._wake_w is not None:
+            os.write(self._wake_w, b"\0")
+        if self._thread:
+            self._thread.join(timeout)
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+            self._wake_r = self._wake_w = None
+
+    def _changed(self):
+        self.changes += 1
+        self.store.mark_changed()
+        if self.on_change:
+            try:
+                self.on_change()
+            except Exception as e:
+                print(f"Error handling credential store change: {e}", file=sys.stderr)
+
+    def _run(self):
+        """Background thread body"""
+        if self._inotify:
+            self._run_inotify()
+        else:
+            self._run_polling()
+
+    def _run_inotify(self):
+        fd = self._inotify.fd
+        while not self._stop.is_set():
+            select.select([fd, self._wake_r], [], [])
+            if self._stop.is_set():
+                return
+            changed = False
+            for mask, name in self._inotify.read_events():
+                if mask & IN_Q_OVERFLOW or name in self._names:
+                    changed = True
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED) and not name:
+                    # The directory itself was replaced; watch the new one
+                    changed = True
+                    try:
+                        self._inotify.add_watch()
+                    except OSError:
+                        pass
+            if changed:
+                self._changed()
+
+    def _stat_all(self) -> Dict[str, Optional[Tuple[int, int, int]]]:
+        result = {}
+        for name in self._names:
+            try:
+                st = os.stat(self._directory / name)
+                result[name] = (st.st_mtime_ns, st.st_size, st.st_ino)
+            except FileNotFoundError:
+                result[name] = None
+        return result
+
+    def _run_polling(self):
+        last = self._stat_all()
+        while not self._stop.wait(self.poll_interval):
+            current = self._stat_all()
+            if current != last:
+                last = current
+                self._changed()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Tests for the async store front end and lock-acquire timeouts
+"""
+
+import asyncio
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+from fastmcp import Client
+
+import credential_manager_mcp.server as credential_manager
+from credential_manager_mcp.async_store import AsyncCredentialStore
+from credential_manager_mcp.server import CredentialStore, StoreBusyError
+from credential_manager_mcp.sqlite_store import SQLiteCredentialStore
+
+
+def hold_lock(store: CredentialStore) -> int:
+    """Take the store's writer lock the way another instance would; close the fd to release it"""
+    fd = os.open(store.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    return fd
+
+
+def test_lock_timeout_raises_store_busy():
+    """Test that writers give up with StoreBusyError instead of waiting forever"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    store = CredentialStore(test_file, read_only=False, lock_timeout=0.2)
+    print("\n⏳ Testing Lock Timeouts")
+    print("=" * 40)
+
+    fd = hold_lock(store)
+    try:
+        start = time.monotonic()
+        with pytest.raises(StoreBusyError) as excinfo:
+            store.add_credential("GitHub", "https://api.github.com", "token")
+        assert 0.2 <= time.monotonic() - start < 2
+        assert excinfo.value.timeout == 0.2
+        # Lock-free reads are unaffected
+        assert store.list_credentials() == []
+    finally:
+        os.close(fd)
+
+    assert store.add_credential("GitHub", "https://api.github.com", "token")
+    print("✅ Writers time out while another instance holds the lock")
+
+
+def test_sqlite_lock_timeout():
+    """Test that a held SQLite write transaction also surfaces as StoreBusyError"""
+    db_file = os.path.join(tempfile.mkdtemp(), "credentials.db")
+    holder = SQLiteCredentialStore(db_file, read_only=False)
+    store = SQLiteCredentialStore(db_file, read_only=False, lock_timeout=0.2)
+    with holder._write_lock():
+        with pytest.raises(StoreBusyError):
+            store.add_credential("GitHub", "https://api.github.com", "token")
+
+    # Another thread of the same process waits on the in-process lock first
+    errors = []
+
+    def add():
+        try:
+            store.add_credential("GitHub", "https://api.github.com", "token")
+        except StoreBusyError as e:
+            errors.append(e)
+
+    with store._write_lock():
+        thread = threading.Thread(target=add)
+        thread.start()
+        thread.join(2)
+        assert not thread.is_alive() and len(errors) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_store_round_trip():
+    """Test the awaitable store methods and attribute pass-through"""
+    store = AsyncCredentialStore(CredentialStore(os.path.join(tempfile.mkdtemp(), "credentials.json"),
+                                                 read_only=False))
+    try:
+        cred_id = await store.add_credential("GitHub", "https://api.github.com", "token", "alice")
+        assert (await store.get_credential(cred_id)).access_token == "token"
+        assert await store.update_credential(cred_id, access_token="rotated")
+        assert [c["id"] for c in await store.find_credentials(user_name="alice")] == [cred_id]
+        assert store.read_only is False and len(store.credentials) == 1
+        assert await store.delete_credential(cred_id)
+        assert await store.list_credentials() == []
+    finally:
+        store.close()
+
+
+@pytest.mark.asyncio
+async def test_busy_store_does_not_block_other_requests():
+    """Test that a write waiting on the lock leaves the event loop free and ends in a store-busy error"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    store = CredentialStore(test_file, read_only=False, lock_timeout=1.0)
+    credential_manager.set_store(store)
+    fd = hold_lock(store)
+    try:
+        async with Client(credential_manager.mcp) as client:
+            write = asyncio.create_task(client.call_tool("add_credential", {
+                "app": "GitHub", "base_url": "https://api.github.com", "access_token": "token"
+            }))
+            await asyncio.sleep(0.1)
+
+            # Unrelated requests are answered while the write waits for the lock
+            start = time.monotonic()
+            help_text = (await client.read_resource("credential://help"))[0].text
+            assert "Credential Manager Help" in help_text
+            assert time.monotonic() - start < 0.5
+            assert not write.done()
+
+            result = json.loads((await write)[0].text)
+            assert result["success"] is False
+            assert result["error_type"] == "store_busy"
+            assert result["retryable"] is True
+            assert result["lock_timeout_seconds"] == 1.0
+        print("✅ Busy store answers with a structured error without stalling the server")
+    finally:
+        os.close(fd)
+        credential_manager.set_store(None)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_are_coalesced():
+    """Test that concurrent single writes share saves and each caller gets its own result"""
+    store = CredentialStore(os.path.join(tempfile.mkdtemp(), "credentials.json"), read_only=False)
+    existing = store.add_credential("GitHub", "https://api.github.com", "token")
+    async_store = AsyncCredentialStore(store, max_batch_size=8)
+    print("\n🚚 Testing Write Coalescing")
+    print("=" * 40)
+    try:
+        fsyncs = store.fsyncs
+        results = await asyncio.gather(
+            *(async_store.add_credential(f"App {i}", "https://example.com", f"token-{i}") for i in range(20)),
+            async_store.update_credential(existing, access_token="rotated"),
+            async_store.update_credential("missing", access_token="x"),
+            async_store.add_credential("Bad", "https://example.com", "token", expires="someday"),
+            async_store.delete_credential("missing"),
+            return_exceptions=True
+        )
+        new_ids, (updated, not_found, invalid, not_deleted) = results[:20], results[20:]
+        assert len(set(new_ids)) == 20 and all(isinstance(cred_id, str) for cred_id in new_ids)
+        assert updated is True and not_found is False and not_deleted is False
+        assert isinstance(invalid, ValueError)
+
+        # 24 writes in batches of at most 8
+        assert async_store.write_batches == 3 and store.fsyncs - fsyncs == 3
+        reloaded = CredentialStore(str(store.store_path))
+        assert len(reloaded.credentials) == 21
+        assert reloaded.get_credential(existing).access_token == "rotated"
+        print("✅ 24 concurrent writes were saved in 3 batches")
+    finally:
+        async_store.close()
+
+
+@pytest.mark.asyncio
+async def test_batched_add_then_delete_and_save_errors():
+    """Test writes to the same credential within one batch, and a failed save reaching every caller"""
+    store = CredentialStore(os.path.join(tempfile.mkdtemp(), "credentials.json"), read_only=False)
+    cred_id = store.add_credential("GitHub", "https://api.github.com", "token")
+    async_store = AsyncCredentialStore(store, max_batch_size=8, max_delay=0.05)
+    try:
+        first = asyncio.ensure_future(async_store.update_credential(cred_id, user_name="alice"))
+        second = asyncio.ensure_future(async_store.delete_credential(cred_id))
+        assert await first is True and await second is True
+        assert store.get_credential(cred_id) is None
+
+        store.read_only = True
+        results = await asyncio.gather(async_store.add_credential("A", "https://a.com", "t"),
+                                       async_store.delete_credential("x"), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+    finally:
+        async_store.close()
@@ -6,6 +6,8 @@ Test script for the credential manager MCP server
 import asyncio
 import json
 import os
+import threading
+import time
 import pytest
 from fastmcp import Client
 import credential_manager_mcp.server as credential_manager
@@ -54,15 +56,11 @@ async def test_credential_manager_read_write():
     print("\n🧪 Testing Credential Manager MCP Server (Read-Write Mode)")
     print("=" * 60)
     
-    # Set environment variable for read-write mode
-    original_env = os.environ.get("CREDENTIAL_MANAGER_READ_ONLY")
-    os.environ["CREDENTIAL_MANAGER_READ_ONLY"] = "false"
+    # Inject a read-write store instead of reloading the module
+    from credential_manager_mcp.server import CredentialStore
+    credential_manager.set_store(CredentialStore(read_only=False))
     
     try:
-        # We need to reload the module to pick up the new environment variable
-        import importlib
-        importlib.reload(credential_manager)
-        
         # Create a client for testing
         client = Client(credential_manager.mcp)
         
@@ -91,6 +89,11 @@ async def test_credential_manager_read_write():
             list_data = json.loads(result[0].text)
             assert list_data["mode"] == "read-write"
             
+            result = await client.call_tool("list_credentials", {"limit": 1})
+            page_data = json.loads(result[0].text)
+            assert page_data["count"] == 1 and page_data["total"] == list_data["count"]
+            assert ("next_cursor" in page_data) and (page_data["next_cursor"] is None) == (list_data["count"] == 1)
+            
             # Check that the list contains only essential data
             if list_data["credentials"]:
                 cred = list_data["credentials"][-1]  # Get the last added credential
@@ -118,14 +121,29 @@ async def test_credential_manager_read_write():
             delete_data = json.loads(result[0].text)
             assert delete_data.get("success") == True
             
+            print("\n📦 Testing batch tools...")
+            result = await client.call_tool("add_credentials", {
+                "credentials": [
+                    {"app": "GitLab", "base_url": "https://gitlab.com", "access_token": "glpat-1"},
+                    {"app": "GitLab", "base_url": "https://gitlab.com", "access_token": "glpat-2", "user_name": "bob"}
+                ]
+            })
+            batch_data = json.loads(result[0].text)
+            assert batch_data["success"] and batch_data["applied"] == 2
+            batch_ids = [item["credential_id"] for item in batch_data["results"]]
+            
+            result = await client.call_tool("get_credentials_details", {"credential_ids": batch_ids})
+            details_data = json.loads(result[0].text)
+            assert [cred["access_token"] for cred in details_data["credentials"]] == ["glpat-1", "glpat-2"]
+            
+            result = await client.call_tool("delete_credentials", {"credential_ids": batch_ids})
+            assert json.loads(result[0].text)["applied"] == 2
+            
             print("\n🎉 Read-write mode tests passed!")
             
     finally:
-        # Restore original environment
-        if original_env is not None:
-            os.environ["CREDENTIAL_MANAGER_READ_ONLY"] = original_env
-        else:
-            os.environ.pop("CREDENTIAL_MANAGER_READ_ONLY", None)
+        # Go back to the lazily created default store
+        credential_manager.set_store(None)
 
 def test_multi_instance_sharing():
     """Test that multiple instances share credential changes"""
@@ -280,6 +298,294 @@ def test_read_only_mode_protection():
         if os.path.exists(test_file):
             os.unlink(test_file)
 
+def test_read_cache_revalidation():
+    """Test that reads are served from cache until another instance changes the file"""
+    import tempfile
+    import time
+    from credential_manager_mcp.server import CredentialStore, RACY_MTIME_WINDOW_NS
+    
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json') as tmp_file:
+        test_file = tmp_file.name
+        json.dump({}, tmp_file)
+    
+    try:
+        print("\n⚡ Testing Read-Through Cache")
+        print("=" * 40)
+        
+        writer = CredentialStore(test_file, read_only=False)
+        reader = CredentialStore(test_file, read_only=True)
+        cred_id = writer.add_credential("GitHub", "https://api.github.com", "token-1")
+        
+        # Let the file age past the racy window so its fingerprint is trusted
+        time.sleep(RACY_MTIME_WINDOW_NS / 1e9 * 2)
+        assert reader.get_credential(cred_id).access_token == "token-1"
+        misses = reader.cache_misses
+        hits = reader.cache_hits
+        
+        reader.list_credentials()
+        reader.get_credential(cred_id)
+        assert reader.cache_misses == misses, "Unchanged file should not be reparsed"
+        assert reader.cache_hits == hits + 2
+        print("✅ Repeated reads served from cache")
+        
+        # A same-size rewrite from another instance must still be picked up
+        writer.update_credential(cred_id, access_token="token-2")
+        assert reader.get_credential(cred_id).access_token == "token-2"
+        assert reader.cache_misses == misses + 1
+        print("✅ Writes from other instances invalidate the cache")
+        
+    finally:
+        if os.path.exists(test_file):
+            os.unlink(test_file)
+
+def test_atomic_writes_and_group_commit():
+    """Test atomic replacement of the store file and group-commit fsync batching"""
+    import tempfile
+    from credential_manager_mcp.server import CredentialStore
+    
+    test_dir = tempfile.mkdtemp()
+    test_file = os.path.join(test_dir, "credentials.json")
+    
+    print("\n💾 Testing Atomic Writes")
+    print("=" * 40)
+    
+    store = CredentialStore(test_file, read_only=False, durability="fsync")
+    inode = os.stat(test_file).st_ino
+    store.add_credential("GitHub", "https://api.github.com", "token-1")
+    assert os.stat(test_file).st_ino != inode, "Store file should be replaced, not rewritten in place"
+    assert sorted(os.listdir(test_dir)) == ["credentials.json", "credentials.json.lock"]
+    print("✅ Writes replace the file atomically and leave no temp files")
+    
+    # A corrupt file must not be silently replaced by a near-empty store
+    with open(test_file, 'w') as f:
+        f.write('{"truncated": ')
+    try:
+        store.add_credential("Slack", "https://slack.com/api", "token-2")
+        assert False, "Should have refused to overwrite an unreadable file"
+    except RuntimeError as e:
+        assert "unreadable" in str(e)
+    with open(test_file) as f:
+        assert f.read() == '{"truncated": '
+    print("✅ Unreadable store file is never overwritten")
+    
+    grouped_file = os.path.join(test_dir, "grouped.json")
+    grouped = CredentialStore(grouped_file, read_only=False, durability="group",
+                              group_commit_delay=0.5)
+    ids = []
+    start = threading.Barrier(20)
+    
+    def add(i):
+        start.wait()
+        ids.append(grouped.add_credential("App", "https://example.com", f"token-{i}"))
+    
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert grouped.fsyncs == 1, f"Expected one fsync for 20 writes, got {grouped.fsyncs}"
+    # Every write returned after the flush, so they are all on disk already
+    assert set(CredentialStore(grouped_file).credentials) == set(ids)
+    print("✅ Group commit coalesced 20 writes into one fsync")
+
+def test_group_commit_waits_for_the_flush(monkeypatch):
+    """Test that group-commit writers don't keep the lock file while they wait, and see flush errors"""
+    import errno
+    import tempfile
+    from credential_manager_mcp.server import CredentialStore
+    
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    grouped = CredentialStore(test_file, read_only=False, durability="group", group_commit_delay=0.5)
+    
+    print("\n⏳ Testing Group Commit Waits")
+    print("=" * 40)
+    
+    results = []
+    writer = threading.Thread(target=lambda: results.append(
+        grouped.add_credential("GitHub", "https://api.github.com", "token-1")))
+    writer.start()
+    while not grouped._pending:
+        time.sleep(0.01)
+    # Another process can write during the group commit window
+    other = CredentialStore(test_file, read_only=False, lock_timeout=0.1)
+    other_id = other.add_credential("Slack", "https://slack.com/api", "token-2")
+    assert not results, "The writer should still be waiting for the flush"
+    writer.join()
+    assert set(CredentialStore(test_file).credentials) == {results[0], other_id}
+    print("✅ The lock file is free during the window, and the flush keeps other processes' writes")
+    
+    def no_space(src, dst):
+        raise OSError(errno.ENOSPC, "No space left on device")
+    
+    monkeypatch.setattr(os, "replace", no_space)
+    errors = []
+    
+    def add(i):
+        try:
+            grouped.add_credential("App", "https://example.com", f"token-{i}")
+        except OSError as e:
+            errors.append(e.errno)
+    
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    monkeypatch.undo()
+    assert errors == [errno.ENOSPC] * 5
+    assert set(CredentialStore(test_file).credentials) == {results[0], other_id}
+    assert {item["id"] for item in grouped.list_credentials()} == {results[0], other_id}
+    print("✅ A failed flush raises in every writer waiting on it")
+
+def test_batch_operations():
+    """Test batch add/update/delete with all-or-nothing and best-effort semantics"""
+    import tempfile
+    from credential_manager_mcp.server import CredentialStore
+    
+    test_dir = tempfile.mkdtemp()
+    test_file = os.path.join(test_dir, "credentials.json")
+    
+    print("\n📦 Testing Batch Operations")
+    print("=" * 40)
+    
+    store = CredentialStore(test_file, read_only=False)
+    results = store.add_credentials([
+        {"app": f"App {i}", "base_url": "https://example.com", "access_token": f"token-{i}"}
+        for i in range(50)
+    ])
+    assert all(result["success"] for result in results)
+    assert store.fsyncs == 1, "A batch should be saved once"
+    ids = [result["credential_id"] for result in results]
+    print("✅ 50 credentials added with a single save")
+    
+    # All-or-nothing: one bad item rolls back the whole batch
+    results = store.update_credentials([
+        {"credential_id": ids[0], "access_token": "new-token"},
+        {"credential_id": "missing-id", "access_token": "x"},
+    ])
+    assert [result["success"] for result in results] == [False, False]
+    assert "not found" in results[1]["error"]
+    assert store.get_credential(ids[0]).access_token == "token-0"
+    print("✅ Atomic batch rolled back on failure")
+    
+    # Best-effort: valid items are applied, failures reported per item
+    results = store.update_credentials([
+        {"credential_id": ids[0], "access_token": "new-token"},
+        {"credential_id": ids[1], "expires": "not-a-date"},
+    ], atomic=False)
+    assert [result["success"] for result in results] == [True, False]
+    assert CredentialStore(test_file).get_credential(ids[0]).access_token == "new-token"
+    print("✅ Best-effort batch applied valid items")
+    
+    results = store.delete_credentials(ids[:10] + ["missing-id"], atomic=False)
+    assert sum(result["success"] for result in results) == 10
+    assert [cred is None for cred in store.get_credentials(ids[9:11])] == [True, False]
+    print("✅ Batch delete and lookup work")
+
+def test_paginated_listing():
+    """Test cursor pagination and chunked iteration over a larger store"""
+    import tempfile
+    from credential_manager_mcp.server import CredentialStore
+    
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    
+    print("\n📄 Testing Paginated Listing")
+    print("=" * 40)
+    
+    store = CredentialStore(test_file, read_only=False)
+    store.add_credentials([
+        {"app": f"App {i}", "base_url": "https://example.com", "access_token": "t"}
+        for i in range(95)
+    ])
+    # Two credentials for the same app, which will land on different pages
+    store.add_credentials([
+        {"app": "Shared", "base_url": "https://example.com", "access_token": "t", "user_name": name}
+        for name in ("alice", "bob")
+    ])
+    full = store.list_credentials()
+    
+    pages = []
+    page, cursor = store.list_credentials_page(10)
+    pages.append(page)
+    # Credentials added mid-iteration must not shift or repeat earlier pages
+    store.add_credential("Late", "https://example.com", "t")
+    while cursor:
+        page, cursor = store.list_credentials_page(10, cursor)
+        pages.append(page)
+    
+    paged = [item for page in pages for item in page]
+    ids = [item["id"] for item in paged]
+    assert ids == sorted(ids) and len(ids) == len(set(ids))
+    assert set(ids) >= {item["id"] for item in full}
+    print(f"✅ {len(ids)} credentials paged in stable ID order")
+    
+    shared = [item for item in paged if item["app"] == "Shared"]
+    assert sorted(item["user_name"] for item in shared) == ["alice", "bob"]
+    assert all("user_name" not in item for item in paged if item["app"] != "Shared")
+    print("✅ Username disambiguation consistent across pages")
+    
+    chunks = list(store.iter_credentials(chunk_size=25))
+    assert max(len(chunk) for chunk in chunks) == 25
+    assert [item["id"] for chunk in chunks for item in chunk] == sorted(store.credentials)
+    print("✅ Chunked iteration covers the store")
+
+def test_lazy_store_initialization():
+    """Test that importing the server creates no store and write tools follow the injected store"""
+    import subprocess
+    import sys
+    import tempfile
+    from credential_manager_mcp.server import CredentialStore
+    
+    print("\n💤 Testing Lazy Store Initialization")
+    print("=" * 40)
+    
+    # Importing the server in a fresh interpreter must not create the store directory
+    home = tempfile.mkdtemp()
+    subprocess.run(
+        [sys.executable, "-c", "import credential_manager_mcp.server"],
+        check=True, env={**os.environ, "HOME": home}
+    )
+    assert os.listdir(home) == [], "Import should not touch the filesystem"
+    print("✅ Import does not create the store")
+    
+    async def tool_names():
+        async with Client(credential_manager.mcp) as client:
+            return {tool.name for tool in await client.list_tools()}
+    
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    try:
+        credential_manager.set_store(CredentialStore(test_file, read_only=False))
+        assert "add_credential" in asyncio.run(tool_names())
+        credential_manager.set_store(CredentialStore(test_file, read_only=True))
+        assert "add_credential" not in asyncio.run(tool_names())
+        print("✅ Write tools follow the injected store's mode")
+    finally:
+        credential_manager.set_store(None)
+
+def test_compact_records():
+    """Test that credentials are held as slotted records and validated on write"""
+    import tempfile
+    from credential_manager_mcp.server import Credential, CredentialRecord, CredentialStore
+    
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    store = CredentialStore(test_file, read_only=False)
+    cred_id = store.add_credential("GitHub", "https://api.github.com", "token-1", "alice", "2030-01-01")
+    
+    assert isinstance(store.credentials[cred_id], CredentialRecord)
+    assert not hasattr(store.credentials[cred_id], "__dict__")
+    credential = store.get_credential(cred_id)
+    assert isinstance(credential, Credential)
+    assert credential.model_dump() == store.credentials[cred_id].to_dict()
+    
+    # Invalid values are rejected when written, leaving the stored record untouched
+    try:
+        store.update_credential(cred_id, expires="next tuesday")
+        assert False, "Should have rejected an invalid expires value"
+    except ValueError:
+        pass
+    assert CredentialStore(test_file).get_credential(cred_id).expires == "2030-01-01"
+    print("✅ Records are compact and validated once on write")
+
 if __name__ == "__main__":
     # For running directly (backward compatibility)
     import sys
@@ -292,6 +598,12 @@ if __name__ == "__main__":
         asyncio.run(run_async_tests())
         test_multi_instance_sharing()
         test_read_only_mode_protection()
+        test_read_cache_revalidation()
+        test_atomic_writes_and_group_commit()
+        test_batch_operations()
+        test_paginated_listing()
+        test_lazy_store_initialization()
+        test_compact_records()
         print("\n✅ All tests passed! Credential Manager is ready to use!")
     except Exception as e:
         print(f"\n❌ Tests failed: {e}")
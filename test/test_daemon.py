@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared store daemon and the stdio proxy
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+from fastmcp import Client
+from fastmcp.client.transports import StdioTransport
+from mcp import ClientSession
+
+import credential_manager_mcp.server as credential_manager
+from credential_manager_mcp.daemon import CredentialDaemon, socket_streams
+from credential_manager_mcp.server import CredentialStore
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.mark.asyncio
+async def test_sessions_share_one_store():
+    """Test that every connection is its own MCP session on the daemon's one store"""
+    test_dir = tempfile.mkdtemp()
+    store = CredentialStore(os.path.join(test_dir, "credentials.json"), read_only=False)
+    credential_manager.set_store(store)
+    daemon = CredentialDaemon(Path(test_dir) / "daemon.sock", idle_timeout=60)
+    print("\n🛰️ Testing Daemon Sessions")
+    print("=" * 40)
+
+    async def session(work):
+        reader, writer = await asyncio.open_unix_connection(str(daemon.socket_path))
+        async with socket_streams(reader, writer) as (read_stream, write_stream):
+            async with ClientSession(read_stream, write_stream) as client:
+                await client.initialize()
+                return await work(client)
+
+    async def call(client, tool, **arguments):
+        return json.loads((await client.call_tool(tool, arguments)).content[0].text)
+
+    serving = asyncio.create_task(daemon.serve())
+    try:
+        while not daemon.socket_path.exists():
+            await asyncio.sleep(0.01)
+        added = await session(lambda client: call(client, "add_credential", app="GitHub",
+                                                  base_url="https://api.github.com", access_token="token"))
+        listings = await asyncio.gather(*(session(lambda client: call(client, "list_credentials"))
+                                          for _ in range(5)))
+        assert all(listing["credentials"][0]["id"] == added["credential_id"] for listing in listings)
+        # The daemon ends a session once it sees its connection close
+        for _ in range(100):
+            if daemon.active_sessions == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert (daemon.sessions, daemon.active_sessions) == (6, 0)
+        assert credential_manager.get_store() is store
+    finally:
+        daemon.stop()
+        await serving
+        credential_manager.set_store(None)
+    assert not daemon.socket_path.exists()
+    print("✅ Sessions share the daemon's store")
+
+
+@pytest.mark.asyncio
+async def test_proxy_starts_the_daemon():
+    """Test that the entry point in daemon mode starts one daemon and proxies every client to it"""
+    home = tempfile.mkdtemp()
+    socket_path = Path(home) / "daemon.sock"
+    env = {**os.environ, "HOME": home, "PYTHONPATH": str(PROJECT_ROOT),
+           "CREDENTIAL_MANAGER_READ_ONLY": "false", "CREDENTIAL_MANAGER_DAEMON": "true",
+           "CREDENTIAL_MANAGER_DAEMON_SOCKET": str(socket_path), "CREDENTIAL_MANAGER_DAEMON_IDLE_TIMEOUT": "1"}
+
+    def transport():
+        return StdioTransport(sys.executable, ["-c", "from credential_manager_mcp import main; main()"],
+                              env=env, keep_alive=False)
+
+    async with Client(transport()) as first, Client(transport()) as second:
+        added = json.loads((await first.call_tool("add_credential", {
+            "app": "GitHub", "base_url": "https://api.github.com", "access_token": "token"}))[0].text)
+        listing = json.loads((await second.call_tool("list_credentials", {}))[0].text)
+        assert listing["credentials"][0]["id"] == added["credential_id"]
+        assert socket_path.exists()
+
+    # The daemon exits once it has been idle for its timeout
+    deadline = time.monotonic() + 10
+    while socket_path.exists() and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    assert not socket_path.exists()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tests for encrypting access tokens at rest
+"""
+
+import json
+import os
+import tempfile
+
+import pytest
+from fastmcp import Client
+
+pytest.importorskip("cryptography")
+
+import credential_manager_mcp.server as credential_manager  # noqa: E402
+from credential_manager_mcp.encryption import (DecryptionError, TokenCipher, derive_key,  # noqa: E402
+                                               get_cipher, is_encrypted)
+from credential_manager_mcp.server import CredentialStore, create_store  # noqa: E402
+
+
+def test_tokens_are_encrypted_on_disk():
+    """Test that only the token is encrypted and only details decrypt it"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    store = CredentialStore(test_file, read_only=False, cipher=TokenCipher(b"secret"))
+    print("\n🔐 Testing Encryption At Rest")
+    print("=" * 40)
+
+    cred_id = store.add_credential("GitHub", "https://api.github.com", "ghp_plain", "alice")
+    with open(test_file) as f:
+        stored = json.load(f)[cred_id]
+    assert is_encrypted(stored["access_token"]) and "ghp_plain" not in json.dumps(stored)
+    assert (stored["app"], stored["user_name"], stored["base_url"]) == ("GitHub", "alice", "https://api.github.com")
+
+    decrypted = []
+    original = store.cipher.decrypt
+    store.cipher.decrypt = lambda *args: decrypted.append(args[0]) or original(*args)
+    store.add_credential("Slack", "https://slack.com/api", "xoxb")
+    assert len(store.list_credentials()) == 2
+    assert store.find_credentials(app="GitHub")[0]["id"] == cred_id
+    assert decrypted == [], "Listing must not decrypt anything"
+
+    assert store.get_credential(cred_id).access_token == "ghp_plain"
+    assert decrypted == [cred_id]
+
+    # Updating other fields keeps the token; a new token is encrypted afresh
+    store.update_credential(cred_id, user_name="bob")
+    assert store.get_credential(cred_id).access_token == "ghp_plain"
+    store.update_credential(cred_id, access_token="ghp_rotated")
+    assert store.get_credential(cred_id).access_token == "ghp_rotated"
+    assert is_encrypted(store.credentials[cred_id].access_token)
+    print("✅ Tokens are sealed per record and decrypted one at a time")
+
+
+def test_plaintext_tokens_migrate_and_wrong_keys_fail():
+    """Test mixed stores, swapped ciphertexts and reading without the right key"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    plain = CredentialStore(test_file, read_only=False)
+    if plain.cipher is not None:
+        pytest.skip("an encryption key is configured in the environment")
+    legacy_id = plain.add_credential("Legacy", "https://legacy.example.com", "old-token")
+
+    store = CredentialStore(test_file, read_only=False, cipher=TokenCipher(b"secret"))
+    assert store.get_credential(legacy_id).access_token == "old-token"
+    store.update_credential(legacy_id, app="Legacy v2")
+    assert is_encrypted(store.credentials[legacy_id].access_token)
+
+    # A ciphertext copied onto another record doesn't decrypt there
+    other_id = store.add_credential("Other", "https://other.example.com", "other-token")
+    with open(test_file) as f:
+        data = json.load(f)
+    data[other_id]["access_token"] = data[legacy_id]["access_token"]
+    with open(test_file, "w") as f:
+        json.dump(data, f)
+    with pytest.raises(DecryptionError):
+        store.get_credential(other_id)
+
+    with pytest.raises(DecryptionError):
+        CredentialStore(test_file, cipher=TokenCipher(b"wrong")).get_credential(legacy_id)
+    with pytest.raises(DecryptionError):
+        CredentialStore(test_file).get_credential(legacy_id)
+
+
+def test_key_from_environment_is_derived_once(monkeypatch):
+    """Test key files and the per-process key derivation cache"""
+    key_file = os.path.join(tempfile.mkdtemp(), "key")
+    with open(key_file, "w") as f:
+        f.write("from-a-file\n")
+    monkeypatch.delenv("CREDENTIAL_MANAGER_ENCRYPTION_KEY", raising=False)
+    monkeypatch.setenv("CREDENTIAL_MANAGER_KEY_FILE", key_file)
+
+    derive_key.cache_clear()
+    cipher = get_cipher()
+    assert get_cipher() is cipher
+    CredentialStore(os.path.join(tempfile.mkdtemp(), "credentials.json"))
+    assert derive_key.cache_info().misses == 1
+
+    token = cipher.encrypt("id-1", "token")
+    assert TokenCipher(b"from-a-file").decrypt("id-1", token) == "token"
+
+
+@pytest.mark.parametrize("backend", ["journal", "sqlite", "sharded"])
+def test_encryption_with_other_backends(backend):
+    """Test that every backend stores and returns sealed tokens"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    store = create_store(backend, test_file, read_only=False, cipher=TokenCipher(b"secret"))
+    cred_id = store.add_credential("GitHub", "https://api.github.com", "ghp_plain")
+    reopened = create_store(backend, test_file, cipher=TokenCipher(b"secret"))
+    assert is_encrypted(reopened.credentials[cred_id].access_token)
+    assert reopened.get_credential(cred_id).access_token == "ghp_plain"
+
+
+async def test_details_tool_reports_decryption_errors():
+    """Test that the details tools answer with an error instead of failing"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    cred_id = CredentialStore(test_file, read_only=False, cipher=TokenCipher(b"secret")).add_credential(
+        "GitHub", "https://api.github.com", "ghp_plain")
+    credential_manager.set_store(CredentialStore(test_file, cipher=TokenCipher(b"wrong")))
+    try:
+        async with Client(credential_manager.mcp) as client:
+            result = json.loads((await client.call_tool("get_credential_details",
+                                                        {"credential_id": cred_id}))[0].text)
+            assert "decrypt" in result["error"]
+            listing = json.loads((await client.call_tool("list_credentials", {}))[0].text)
+            assert listing["credentials"][0]["id"] == cred_id
+    finally:
+        credential_manager.set_store(None)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Tests for the expiry index, expiring_credentials and the expiry sweeper
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastmcp import Client
+
+import credential_manager_mcp.server as credential_manager
+from credential_manager_mcp.index import expiry_timestamp
+from credential_manager_mcp.server import CredentialStore
+from credential_manager_mcp.sweeper import ExpirySweeper
+
+
+def iso_in(seconds: float) -> str:
+    """Return an ISO UTC datetime the given number of seconds from now"""
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def make_store():
+    """Create a store with one expired, two expiring and two long-lived credentials"""
+    store = CredentialStore(os.path.join(tempfile.mkdtemp(), "credentials.json"), read_only=False)
+    ids = {
+        "expired": store.add_credential("Old", "https://old.example.com", "t0", "alice", iso_in(-3600)),
+        "soon": store.add_credential("Soon", "https://soon.example.com", "t1", "alice", iso_in(600)),
+        "later": store.add_credential("Later", "https://later.example.com", "t2", None, iso_in(7200)),
+        "never": store.add_credential("Never", "https://never.example.com", "t3", "alice", "never"),
+        "unset": store.add_credential("Unset", "https://unset.example.com", "t4"),
+    }
+    return store, ids
+
+
+def test_expiry_timestamp():
+    """Test parsing of expires values"""
+    assert expiry_timestamp("never") is None
+    assert expiry_timestamp(None) is None
+    assert expiry_timestamp("1970-01-01T00:01:00") == 60.0
+    assert expiry_timestamp("1970-01-01T01:01:00+01:00") == 60.0
+    assert expiry_timestamp("1970-01-01T00:01:00Z") == 60.0
+
+
+def test_expiring_credentials():
+    """Test expiry lookups, their ordering and how they follow updates"""
+    store, ids = make_store()
+    print("\n⏰ Testing Expiry Index")
+    print("=" * 40)
+
+    result = store.expiring_credentials(3600)
+    assert [c["id"] for c in result] == [ids["expired"], ids["soon"]]
+    assert result[0]["expired"] and result[0]["expires_in_seconds"] < 0
+    assert not result[1]["expired"] and 0 < result[1]["expires_in_seconds"] <= 600
+    assert [c["id"] for c in store.expiring_credentials(10 ** 6)] == [ids["expired"], ids["soon"], ids["later"]]
+    print("✅ Soonest first, 'never' and unset excluded")
+
+    store.update_credential(ids["soon"], expires="never")
+    store.update_credential(ids["later"], expires=iso_in(60))
+    assert [c["id"] for c in store.expiring_credentials(3600)] == [ids["expired"], ids["later"]]
+
+    # Another instance sees the same answers after a full load
+    other = CredentialStore(str(store.store_path))
+    assert [c["id"] for c in other.expiring_credentials(3600)] == [ids["expired"], ids["later"]]
+    print("✅ Index follows updates and reloads")
+
+    with pytest.raises(ValueError):
+        store.expiring_credentials(-1)
+
+
+def test_exclude_expired():
+    """Test the exclude_expired filter on listing and lookup"""
+    store, ids = make_store()
+
+    assert len(store.list_credentials()) == 5
+    assert ids["expired"] not in {c["id"] for c in store.list_credentials(exclude_expired=True)}
+    assert {c["id"] for c in store.find_credentials(user_name="alice", exclude_expired=True)} == \
+        {ids["soon"], ids["never"]}
+
+    # Pages stay full even when expired credentials are skipped
+    for i in range(5):
+        store.add_credential(f"Gone {i}", "https://gone.example.com", "t", None, iso_in(-60))
+    page_ids = []
+    cursor = None
+    while True:
+        page, cursor = store.list_credentials_page(2, cursor, exclude_expired=True)
+        assert len(page) == 2 or cursor is None
+        page_ids.extend(c["id"] for c in page)
+        if cursor is None:
+            break
+    assert sorted(page_ids) == sorted(ids[key] for key in ("soon", "later", "never", "unset"))
+    print("✅ exclude_expired filters lists, pages and lookups")
+
+
+def test_sweep_expired():
+    """Test flagging and purging expired credentials, directly and from the sweeper thread"""
+    store, ids = make_store()
+
+    assert store.sweep_expired() == [ids["expired"]]
+    listed = {c["id"]: c for c in store.list_credentials()}
+    assert listed[ids["expired"]]["expired"] is True
+    assert "expired" not in listed[ids["soon"]]
+
+    # Renewing a flagged credential clears its flag
+    store.update_credential(ids["expired"], expires=iso_in(3600))
+    assert "expired" not in {c["id"]: c for c in store.list_credentials()}[ids["expired"]]
+    print("✅ Flag mode marks expired credentials in listings")
+
+    assert store.sweep_expired(purge=True, now=time.time() + 1800) == [ids["soon"]]
+    assert ids["soon"] not in CredentialStore(str(store.store_path)).credentials
+    print("✅ Purge mode deletes expired credentials")
+
+    with pytest.raises(ValueError):
+        ExpirySweeper(CredentialStore(str(store.store_path)), "purge")
+    sweeper = ExpirySweeper(store, "purge", interval=0.01)
+    store.update_credential(ids["later"], expires=iso_in(-1))
+    sweeper.start()
+    deadline = time.time() + 5
+    while ids["later"] in store.credentials and time.time() < deadline:
+        time.sleep(0.01)
+    sweeper.stop()
+    assert ids["later"] not in store.credentials
+    assert sweeper.stats()["sweeps"] >= 1
+    print("✅ Background sweeper purges on schedule")
+
+
+def test_sweeper_runs_alongside_readers():
+    """Test that a read in progress never sees the purging sweeper change the store under it"""
+    store = CredentialStore(os.path.join(tempfile.mkdtemp(), "credentials.json"), read_only=False)
+    store.add_credentials([{"app": f"App {i}", "base_url": "https://example.com", "access_token": "t",
+                            "expires": iso_in(-60)} for i in range(2000)])
+    # Let the file age past the racy-mtime window so the sweeper works on the dict the reader holds
+    time.sleep(0.1)
+    store.load_credentials()
+    sweeper = ExpirySweeper(store, "purge", interval=60)
+    reading = threading.Event()
+    list_item = store._list_item
+    results, errors = [], []
+
+    def paused_list_item(cred):
+        # Stop in the middle of the first listing until the sweep is done (or can't run)
+        if not reading.is_set():
+            reading.set()
+            deadline = time.time() + 0.5
+            while sweeper.sweeps == 0 and time.time() < deadline:
+                time.sleep(0.01)
+        return list_item(cred)
+
+    def read():
+        try:
+            results.append(store.list_credentials())
+        except Exception as e:
+            errors.append(e)
+
+    store._list_item = paused_list_item
+    reader = threading.Thread(target=read)
+    reader.start()
+    reading.wait(5)
+    sweeper.start()
+    reader.join()
+    deadline = time.time() + 5
+    while sweeper.sweeps == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    sweeper.stop()
+    assert not errors, errors
+    assert len(results[0]) == 2000
+    assert not store.credentials
+    print("✅ The sweeper waits for reads in progress")
+
+
+@pytest.mark.asyncio
+async def test_expiry_tools():
+    """Test the expiring_credentials tool and exclude_expired through MCP"""
+    store, ids = make_store()
+    credential_manager.set_store(store)
+    try:
+        async with Client(credential_manager.mcp) as client:
+            result = json.loads((await client.call_tool("expiring_credentials", {"within_seconds": 3600}))[0].text)
+            assert [c["id"] for c in result["credentials"]] == [ids["expired"], ids["soon"]]
+            assert result["expired"] == 1
+            assert "access_token" not in result["credentials"][0]
+
+            result = json.loads((await client.call_tool("list_credentials", {"exclude_expired": True}))[0].text)
+            assert result["count"] == 4
+
+            result = json.loads((await client.call_tool(
+                "get_credential_details", {"credential_id": ids["expired"]}))[0].text)
+            assert result["expired"] is True
+        print("✅ Expiry tools work through MCP")
+    finally:
+        credential_manager.set_store(None)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for the credential secondary indexes and find_credentials
+"""
+
+import os
+import tempfile
+
+import pytest
+
+from credential_manager_mcp.index import CredentialIndex, host_key
+from credential_manager_mcp.journal import JournalCredentialStore
+from credential_manager_mcp.server import CredentialStore
+
+
+def test_host_key():
+    """Test host extraction from base URLs"""
+    assert host_key("https://API.GitHub.com:443/v3") == "api.github.com"
+    assert host_key("api.slack.com/api") == "api.slack.com"
+
+
+def test_find_uses_indexes():
+    """Test that indexes follow adds, updates and deletes, and stay correct after reload"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    print("\n🔎 Testing Credential Indexes")
+    print("=" * 40)
+
+    store = CredentialStore(test_file, read_only=False)
+    alice = store.add_credential("GitHub", "https://api.github.com", "t1", "alice")
+    bob = store.add_credential("github", "https://github.example.com/api", "t2", "bob")
+    gitlab = store.add_credential("GitLab", "https://gitlab.com", "t3", "alice")
+    slack = store.add_credential("Slack", "https://slack.com/api", "t4")
+
+    assert {c["id"] for c in store.find_credentials(app="GITHUB")} == {alice, bob}
+    assert [c["id"] for c in store.find_credentials(app="github", user_name="alice")] == [alice]
+    assert {c["id"] for c in store.find_credentials(prefix="git")} == {alice, bob, gitlab}
+    assert [c["id"] for c in store.find_credentials(host="slack.com")] == [slack]
+    assert store.find_credentials(app="GitHub", host="gitlab.com") == []
+    print("✅ Lookups by app, user, host and prefix")
+
+    store.update_credential(bob, app="Gitea", base_url="https://gitea.io")
+    assert {c["id"] for c in store.find_credentials(app="github")} == {alice}
+    assert [c["id"] for c in store.find_credentials(host="gitea.io")] == [bob]
+    store.delete_credential(gitlab)
+    assert {c["id"] for c in store.find_credentials(prefix="git")} == {alice, bob}
+    print("✅ Indexes updated incrementally")
+
+    # A fresh instance and the journal backend rebuild the same indexes
+    for other in (CredentialStore(test_file), JournalCredentialStore(test_file)):
+        assert {c["id"] for c in other.find_credentials(user_name="ALICE")} == {alice}
+
+    with pytest.raises(ValueError):
+        store.find_credentials()
+
+
+def test_index_remove_cleans_empty_keys():
+    """Test that removing the last credential for a key drops the key"""
+    from credential_manager_mcp.server import Credential
+
+    index = CredentialIndex()
+    cred = Credential(app="GitHub", id="1", base_url="https://api.github.com", access_token="t")
+    index.add("1", cred)
+    index.remove("1", cred)
+    assert not index.by_app and not index.by_host and index.find(prefix="g") == set()
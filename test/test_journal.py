@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for the append-only journal storage backend
+"""
+
+import json
+import os
+import tempfile
+
+from credential_manager_mcp.journal import JournalCredentialStore
+from credential_manager_mcp.server import create_store
+
+
+def _new_store_path():
+    """Return the path of a fresh, empty credentials file in a temp directory"""
+    test_dir = tempfile.mkdtemp()
+    test_file = os.path.join(test_dir, "credentials.json")
+    with open(test_file, 'w') as f:
+        json.dump({}, f)
+    return test_file
+
+
+def test_journal_appends_and_replays():
+    """Test that writes only append to the journal and a new instance replays them"""
+    test_file = _new_store_path()
+    print("\n📓 Testing Journal Backend")
+    print("=" * 40)
+
+    store = JournalCredentialStore(test_file, read_only=False)
+    cred_id = store.add_credential("GitHub", "https://api.github.com", "token-1", "alice")
+    other_id = store.add_credential("Slack", "https://slack.com/api", "token-2")
+    store.update_credential(cred_id, access_token="token-3")
+    store.delete_credential(other_id)
+
+    # The snapshot is untouched; all four mutations live in the journal
+    with open(test_file) as f:
+        assert json.load(f) == {}
+    with open(store.journal_path) as f:
+        records = [json.loads(line) for line in f]
+    assert [r["op"] for r in records] == ["put", "put", "put", "delete"]
+    print("✅ Mutations appended as journal records")
+
+    reopened = JournalCredentialStore(test_file, read_only=True)
+    assert set(reopened.credentials) == {cred_id}
+    assert reopened.get_credential(cred_id).access_token == "token-3"
+    print("✅ State rebuilt from snapshot + journal")
+
+    # Another instance's appends are picked up from the tail
+    third_id = store.add_credential("GitLab", "https://gitlab.com", "token-4")
+    assert reopened.get_credential(third_id) is not None
+    print("✅ Journal tail replayed incrementally")
+
+
+def test_journal_compaction():
+    """Test that crossing the threshold folds the journal into the snapshot"""
+    test_file = _new_store_path()
+    store = JournalCredentialStore(test_file, read_only=False, compact_min_bytes=1)
+
+    cred_id = store.add_credential("GitHub", "https://api.github.com", "token-1")
+    store.wait_for_compaction()
+
+    assert store.compactions >= 1
+    assert os.path.getsize(store.journal_path) == 0
+    with open(test_file) as f:
+        assert cred_id in json.load(f)
+
+    reopened = JournalCredentialStore(test_file, read_only=True)
+    assert reopened.get_credential(cred_id).access_token == "token-1"
+    print("✅ Journal compacted into snapshot")
+
+    # Either threshold alone is enough
+    store.add_credentials([{"app": f"App {i}", "base_url": "https://example.com", "access_token": "t" * 1000}
+                           for i in range(100)])
+    store.wait_for_compaction()
+    assert os.path.getsize(store.journal_path) == 0
+    large = JournalCredentialStore(test_file, read_only=False, compact_min_bytes=1024 * 1024,
+                                   compact_ratio=100, background_compaction=False)
+    assert not large._should_compact(64 * 1024)
+    assert large._should_compact(1024 * 1024)
+    ratio = JournalCredentialStore(test_file, read_only=False, compact_min_bytes=1024 * 1024,
+                                   compact_ratio=0.5, background_compaction=False)
+    assert ratio._should_compact(os.path.getsize(test_file))
+    print("✅ Size or ratio threshold triggers compaction")
+
+
+def test_failed_compaction_leaves_no_temp_file(monkeypatch):
+    """Test that a compaction that fails to write removes its temp snapshot"""
+    test_file = _new_store_path()
+    store = JournalCredentialStore(test_file, read_only=False, background_compaction=False)
+    store.add_credential("GitHub", "https://api.github.com", "token-1")
+
+    def fail(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(os, "replace", fail)
+    try:
+        store.compact()
+    except OSError:
+        pass
+    else:
+        raise AssertionError("compact() should raise")
+    assert sorted(os.listdir(os.path.dirname(test_file))) == ["credentials.json", "credentials.json.journal",
+                                                              "credentials.json.lock"]
+    print("✅ Temp snapshot removed after a failed compaction")
+
+
+def test_journal_ignores_torn_record():
+    """Test that a partially written trailing record is skipped, not fatal"""
+    test_file = _new_store_path()
+    store = create_store("journal", test_file, read_only=False)
+    cred_id = store.add_credential("GitHub", "https://api.github.com", "token-1")
+
+    with open(store.journal_path, 'a') as f:
+        f.write('{"op": "put", "id": "torn", "credenti')
+
+    reopened = JournalCredentialStore(test_file, read_only=False)
+    assert set(reopened.credentials) == {cred_id}
+
+    # The next append must not be glued onto the torn fragment
+    new_id = reopened.add_credential("Slack", "https://slack.com/api", "token-2")
+    assert set(JournalCredentialStore(test_file).credentials) == {cred_id, new_id}
+    print("✅ Torn journal record skipped")
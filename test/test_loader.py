@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming credentials.json loader and record quarantine
+"""
+
+import io
+import json
+import os
+import tempfile
+
+import pytest
+
+from credential_manager_mcp.journal import JournalCredentialStore
+from credential_manager_mcp.loader import LoadReport, iter_credentials
+from credential_manager_mcp.server import CredentialStore
+
+
+def entry(cred_id: str, **fields) -> dict:
+    return {"app": "App", "id": cred_id, "base_url": "https://example.com",
+            "access_token": f"token-{cred_id}", "user_name": None, "expires": "never", **fields}
+
+
+def load(text: str, chunk_size: int = 64 * 1024):
+    report = LoadReport()
+    records = dict(iter_credentials(io.BytesIO(text.encode()), report, chunk_size=chunk_size))
+    return records, report
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_streaming_matches_json_load(chunk_size):
+    """Test that every chunk size yields exactly what json.load reads"""
+    data = {f"id-{i}": entry(f"id-{i}", user_name=f"üser {i}" if i % 3 else None,
+                             expires="2030-01-01T00:00:00Z" if i % 2 else "never")
+            for i in range(200)}
+    for text in (json.dumps(data, indent=2), json.dumps(data), "{}", " { } "):
+        records, report = load(text, chunk_size)
+        expected = json.loads(text)
+        assert {cred_id: r.to_dict() for cred_id, r in records.items()} == expected
+        assert report.quarantined == [] and report.complete
+
+
+def test_bad_records_are_quarantined_individually():
+    """Test that invalid entries are skipped one by one and the rest still load"""
+    good = {f"id-{i}": entry(f"id-{i}") for i in range(6)}
+    text = json.dumps(good, indent=2)
+    text = text.replace('"token-id-1"', '"token-id-1" "oops"')        # syntax error
+    text = text.replace('"app": "App",\n    "id": "id-3"', '"id": "id-3"')  # missing field
+    text = text.replace('"token-id-4",\n    "user_name": null,\n    "expires": "never"',
+                        '"token-id-4",\n    "user_name": null,\n    "expires": "someday"')
+    print("\n🧹 Testing Record Quarantine")
+    print("=" * 40)
+
+    for chunk_size in (16, 64 * 1024):
+        records, report = load(text, chunk_size)
+        assert sorted(records) == ["id-0", "id-2", "id-5"]
+        assert [entry.key for entry in report.quarantined] == ["id-1", "id-3", "id-4"]
+        assert "invalid JSON" in report.quarantined[0].error
+        assert "'app'" in report.quarantined[1].error
+        assert "expires" in report.quarantined[2].error
+        assert '"oops"' in report.quarantined[0].raw
+        assert report.complete
+    print("✅ One bad entry no longer empties the store")
+
+
+def test_store_keeps_good_records_and_sets_bad_ones_aside():
+    """Test loading a damaged store, then writing: quarantined entries move to the quarantine file"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    data = {"good": entry("good"), "bad": {"app": "App", "id": "bad"}}
+    with open(test_file, "w") as f:
+        json.dump(data, f, indent=2)
+
+    store = CredentialStore(test_file, read_only=False)
+    assert [c["id"] for c in store.list_credentials()] == ["good"]
+    assert [entry.key for entry in store.quarantined] == ["bad"]
+
+    store.add_credential("Slack", "https://slack.com/api", "token")
+    assert store.quarantined == []
+    with open(store.quarantine_path) as f:
+        saved = [json.loads(line) for line in f]
+    assert [item["key"] for item in saved] == ["bad"]
+    assert json.loads(saved[0]["raw"]) == data["bad"]
+    with open(test_file) as f:
+        assert "bad" not in json.load(f)
+
+
+def test_legacy_ids_are_rekeyed(capsys):
+    """Test that entries whose id is missing or differs from their key still load, under their key"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    legacy = entry("old-id")
+    del legacy["id"]
+    data = {"a": entry("a"), "b": entry("old-id"), "c": legacy}
+    with open(test_file, "w") as f:
+        json.dump(data, f, indent=2)
+
+    store = CredentialStore(test_file, read_only=False)
+    assert sorted(c["id"] for c in store.list_credentials()) == ["a", "b", "c"]
+    assert store.get_credential("b").access_token == "token-old-id"
+    assert store.quarantined == []
+    store.load_credentials(force=True)
+    out, err = capsys.readouterr()
+    assert out == "" and err.count("Warning: Credential") == 2
+
+    # The next write stores the corrected IDs and sets nothing aside
+    store.add_credential("Slack", "https://slack.com/api", "token")
+    with open(test_file) as f:
+        saved = json.load(f)
+    assert all(saved[key]["id"] == key for key in saved)
+    assert not os.path.exists(store.quarantine_path)
+
+
+@pytest.mark.parametrize("store_class", [CredentialStore, JournalCredentialStore])
+def test_truncated_store_loads_but_is_not_overwritten(store_class):
+    """Test that a cut-short file keeps its readable records and refuses writes"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    text = json.dumps({"a": entry("a"), "b": entry("b")}, indent=2)
+    with open(test_file, "w") as f:
+        f.write(text[:-40])
+
+    store = store_class(test_file, read_only=False)
+    assert [c["id"] for c in store.list_credentials()] == ["a"]
+    assert store._load_error is not None
+    with pytest.raises(RuntimeError):
+        if store_class is JournalCredentialStore:
+            # Appends leave the snapshot alone, but compaction must not rewrite it
+            store.compact()
+        else:
+            store.add_credential("Slack", "https://slack.com/api", "token")
+    with open(test_file) as f:
+        assert f.read() == text[:-40]
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for latency and I/O metrics
+"""
+
+import json
+import os
+import tempfile
+
+import pytest
+from fastmcp import Client
+
+import credential_manager_mcp.server as credential_manager
+from credential_manager_mcp.journal import JournalCredentialStore
+from credential_manager_mcp.metrics import BUCKETS, Histogram, Metrics, metrics
+from credential_manager_mcp.server import CredentialStore
+
+
+@pytest.fixture
+def enabled_metrics():
+    """Turn metrics on with a clean slate for one test"""
+    metrics.reset()
+    metrics.enabled = True
+    yield metrics
+    metrics.enabled = False
+    metrics.reset()
+
+
+def test_histogram_quantiles():
+    """Test bucket placement and quantile estimates"""
+    histogram = Histogram()
+    for _ in range(99):
+        histogram.observe(0.0002)
+    histogram.observe(3.0)
+    assert histogram.count == 100
+    assert histogram.quantile(0.5) == 0.00025
+    assert histogram.quantile(0.999) == 3.0
+    assert sum(histogram.buckets) == 100 and histogram.buckets[len(BUCKETS)] == 0
+
+
+def test_disabled_metrics_collect_nothing():
+    """Test that instrumented code records nothing while metrics are off"""
+    registry = Metrics(enabled=False)
+
+    @registry.timed("tool")
+    def tool():
+        return {"error": "nope"}
+
+    with registry.timer("lock_wait", "exclusive"):
+        pass
+    registry.add("bytes_read", 10)
+    assert tool() == {"error": "nope"}
+    assert registry.histograms == {} and registry.counters == {} and registry.tool_errors == {}
+
+
+def test_store_operation_metrics(enabled_metrics):
+    """Test load/flush timers, lock waits and byte counters on the JSON and journal backends"""
+    print("\n📈 Testing Store Metrics")
+    print("=" * 40)
+    for store_class in (CredentialStore, JournalCredentialStore):
+        enabled_metrics.reset()
+        store = store_class(os.path.join(tempfile.mkdtemp(), "credentials.json"), read_only=False)
+        store.add_credential("GitHub", "https://api.github.com", "token")
+        store.load_credentials(force=True)
+
+        snapshot = enabled_metrics.snapshot()
+        for operation in ("load_credentials", "flush", "fsync"):
+            assert snapshot["operation"][operation]["count"] >= 1, (store_class, operation)
+        assert snapshot["lock_wait"]["exclusive"]["count"] >= 1
+        assert snapshot["counters"]["bytes_written"] > 0
+        assert snapshot["counters"]["bytes_read"] > 0
+    print("✅ Operations, lock waits and bytes are recorded")
+
+
+@pytest.mark.asyncio
+async def test_metrics_resources(enabled_metrics):
+    """Test per-tool metrics and the JSON and Prometheus resources"""
+    store = CredentialStore(os.path.join(tempfile.mkdtemp(), "credentials.json"), read_only=False)
+    credential_manager.set_store(store)
+    try:
+        async with Client(credential_manager.mcp) as client:
+            await client.call_tool("add_credential", {
+                "app": "GitHub", "base_url": "https://api.github.com", "access_token": "token"
+            })
+            await client.call_tool("list_credentials", {})
+            await client.call_tool("get_credential_details", {"credential_id": "missing"})
+
+            snapshot = json.loads((await client.read_resource("credential://store/metrics"))[0].text)
+            assert snapshot["enabled"] is True
+            assert snapshot["tool"]["list_credentials"]["count"] == 1
+            assert snapshot["tool"]["get_credential_details"]["errors"] == 1
+            assert snapshot["tool"]["add_credential"]["errors"] == 0
+            assert snapshot["fsyncs"] == 1
+
+            text = (await client.read_resource("credential://store/metrics/prometheus"))[0].text
+            assert 'credential_manager_tool_seconds_count{tool="list_credentials"} 1' in text
+            assert 'credential_manager_tool_errors_total{tool="get_credential_details"} 1' in text
+            assert "credential_manager_fsyncs_total 1" in text
+        print("✅ Metrics resources report per-tool calls and errors")
+    finally:
+        credential_manager.set_store(None)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for the response cache
+"""
+
+import json
+import os
+import tempfile
+
+import pytest
+from fastmcp import Client
+
+import credential_manager_mcp.server as credential_manager
+from credential_manager_mcp.responses import ResponseCache
+from credential_manager_mcp.server import CredentialStore
+
+
+def test_cache_is_bounded_and_drops_old_versions():
+    """Test the LRU bound and that answers for an older version are dropped"""
+    cache = ResponseCache(max_entries=2)
+    print("\n📦 Testing Response Cache")
+    print("=" * 40)
+
+    assert cache.put((1, False, "list", None, None), {"count": 0}) == json.dumps({"count": 0}, indent=2)
+    cache.put((1, False, "list", 10, None), {"count": 0})
+    cache.put((None, False, "help"), "help text")
+    assert cache.stats()["entries"] == 2
+    assert cache.get((1, False, "list", None, None)) is None
+
+    # A newer version makes every answer built before it unreachable
+    cache.put((2, False, "list", None, None), {"count": 1})
+    assert cache.get((1, False, "list", 10, None)) is None
+    assert cache.get((None, False, "help")) == "help text"
+    # ...and an answer built from a version that has been superseded isn't kept
+    cache.put((1, False, "list", 5, None), {"count": 0})
+    assert cache.get((1, False, "list", 5, None)) is None
+    print("✅ Cache stays bounded and keeps only current answers")
+
+
+@pytest.mark.asyncio
+async def test_reads_are_served_from_cache_until_a_write():
+    """Test that repeated list and info reads hit the cache and writes invalidate it"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    credential_manager.set_store(CredentialStore(test_file, read_only=False))
+    try:
+        responses = credential_manager.get_async_store().responses
+        async with Client(credential_manager.mcp) as client:
+            await client.call_tool("add_credential", {"app": "GitHub", "base_url": "https://api.github.com",
+                                                      "access_token": "token"})
+            first = (await client.call_tool("list_credentials", {}))[0].text
+            hits = responses.hits
+            assert (await client.call_tool("list_credentials", {}))[0].text == first
+            assert responses.hits == hits + 1
+
+            await client.call_tool("add_credential", {"app": "Slack", "base_url": "https://slack.com/api",
+                                                      "access_token": "token"})
+            listing = json.loads((await client.call_tool("list_credentials", {}))[0].text)
+            assert listing["count"] == 2
+
+            info = (await client.read_resource("credential://store/info"))[0].text
+            assert (await client.read_resource("credential://store/info"))[0].text == info
+            assert json.loads(info)["total_credentials"] == 2
+            # Touching or deleting the file doesn't change the version, but the answer must follow
+            os.utime(test_file, (1_000_000_000, 1_000_000_000))
+            info = json.loads((await client.read_resource("credential://store/info"))[0].text)
+            assert info["last_modified"].startswith("2001-09-")
+            os.unlink(test_file)
+            info = json.loads((await client.read_resource("credential://store/info"))[0].text)
+            assert not info["store_exists"] and info["last_modified"] is None
+            help_text = (await client.read_resource("credential://help"))[0].text
+            assert (await client.read_resource("credential://help"))[0].text == help_text
+    finally:
+        credential_manager.set_store(None)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Tests for the sharded storage backend
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from credential_manager_mcp.server import CredentialStore, StoreBusyError, create_store
+from credential_manager_mcp.sharded import (ShardedCredentialStore, export_sharded_to_json,
+                                            migrate_json_to_sharded)
+
+
+def shard_mtimes(store: ShardedCredentialStore) -> list:
+    return [os.stat(store.shard_path(shard)).st_mtime_ns for shard in range(store.shard_count)]
+
+
+def test_sharded_layout_and_manifest():
+    """Test that credentials land in their hash shard and the manifest maps apps to shards"""
+    test_dir = tempfile.mkdtemp()
+    store = create_store("sharded", os.path.join(test_dir, "credentials.json"), read_only=False, shard_count=4)
+    print("\n🧩 Testing Sharded Layout")
+    print("=" * 40)
+
+    assert store.shard_dir == Path(test_dir) / "credentials.shards"
+    ids = [store.add_credential("GitHub", "https://api.github.com", f"token-{i}", f"user-{i}") for i in range(20)]
+    slack_id = store.add_credential("Slack", "https://slack.com/api", "slack-token")
+
+    for cred_id in ids:
+        with open(store.shard_path(store.shard_of(cred_id))) as f:
+            assert json.load(f)[cred_id]["access_token"].startswith("token-")
+    assert store.shards_for_app("Slack") == [store.shard_of(slack_id)]
+    assert store.shards_for_app("GitHub") == sorted({store.shard_of(cred_id) for cred_id in ids})
+
+    store.delete_credential(slack_id)
+    assert store.shards_for_app("Slack") == []
+
+    reopened = ShardedCredentialStore(str(store.shard_dir))
+    assert reopened.shard_count == 4
+    assert sorted(c["id"] for c in reopened.list_credentials()) == sorted(ids)
+    print("✅ Records are spread over shards and tracked in the manifest")
+
+
+def test_write_touches_only_its_shard():
+    """Test that an update rewrites one shard file and other instances reload only that shard"""
+    test_dir = tempfile.mkdtemp()
+    store = ShardedCredentialStore(os.path.join(test_dir, "credentials.json"), read_only=False)
+    ids = [store.add_credential("App", "https://example.com", f"token-{i}") for i in range(50)]
+    reader = ShardedCredentialStore(os.path.join(test_dir, "credentials.json"))
+    time.sleep(0.05)
+
+    before = shard_mtimes(store)
+    store.update_credential(ids[0], access_token="rotated")
+    after = shard_mtimes(store)
+    changed = [shard for shard in range(store.shard_count) if before[shard] != after[shard]]
+    assert changed == [store.shard_of(ids[0])]
+
+    reads = []
+    original = reader._read_shard
+    reader._read_shard = lambda shard: reads.append(shard) or original(shard)
+    assert reader.get_credential(ids[0]).access_token == "rotated"
+    assert changed[0] in reads and len(set(reads)) < store.shard_count
+    assert len(reader.list_credentials()) == 50
+    print("✅ One write, one shard rewritten and reloaded")
+
+
+def test_writers_to_different_shards_do_not_block():
+    """Test that a held shard lock only blocks writers of that shard"""
+    test_dir = tempfile.mkdtemp()
+    path = os.path.join(test_dir, "credentials.json")
+    holder = ShardedCredentialStore(path, read_only=False)
+    ids = [holder.add_credential("App", "https://example.com", f"token-{i}") for i in range(40)]
+    other = ShardedCredentialStore(path, read_only=False, lock_timeout=0.2)
+
+    locked = holder.shard_of(ids[0])
+    free = next(cred_id for cred_id in ids if holder.shard_of(cred_id) != locked)
+    with holder._write_lock(keys=[ids[0]]):
+        assert other.update_credential(free, access_token="updated")
+        with pytest.raises(StoreBusyError):
+            other.update_credential(ids[0], access_token="blocked")
+    assert other.update_credential(ids[0], access_token="unblocked")
+
+
+def test_concurrent_instances_lose_no_updates():
+    """Test that parallel writers in separate instances keep every change"""
+    test_dir = tempfile.mkdtemp()
+    path = os.path.join(test_dir, "credentials.json")
+    stores = [ShardedCredentialStore(path, read_only=False) for _ in range(4)]
+    added = [[] for _ in stores]
+
+    def writer(n):
+        for i in range(25):
+            added[n].append(stores[n].add_credential(f"App{n}", "https://example.com", f"token-{n}-{i}"))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(len(stores))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    fresh = ShardedCredentialStore(path)
+    assert len(fresh.list_credentials()) == 100
+    assert {c["id"] for c in fresh.list_credentials()} == {cred_id for ids in added for cred_id in ids}
+
+
+def test_migration_round_trip_is_lossless():
+    """Test JSON -> sharded -> JSON keeps every record and field"""
+    test_dir = tempfile.mkdtemp()
+    json_path = os.path.join(test_dir, "credentials.json")
+    source = CredentialStore(json_path, read_only=False)
+    source.add_credential("GitHub", "https://api.github.com", "token", "alice", "2030-01-01T00:00:00")
+    source.add_credential("Slack", "https://slack.com/api", "slack-token")
+    with open(json_path) as f:
+        original = json.load(f)
+
+    shard_dir = os.path.join(test_dir, "elsewhere.shards")
+    assert migrate_json_to_sharded(json_path, shard_dir, shard_count=3) == 2
+    sharded = ShardedCredentialStore(shard_dir)
+    assert sharded.shard_count == 3
+    assert {cred_id: c.to_dict() for cred_id, c in sharded.credentials.items()} == original
+
+    exported = os.path.join(test_dir, "exported.json")
+    assert export_sharded_to_json(shard_dir, exported) == 2
+    with open(exported) as f:
+        assert json.load(f) == original
+
+    # Opening the default sharded store imports the sibling credentials.json
+    auto = ShardedCredentialStore(json_path)
+    assert {cred_id: c.to_dict() for cred_id, c in auto.credentials.items()} == original
+    print("✅ Migration to and from the sharded layout is lossless")
+
+
+def test_bad_entries_are_quarantined():
+    """Test that one malformed entry, in a migrated file or in a shard, doesn't block the rest"""
+    test_dir = tempfile.mkdtemp()
+    json_path = os.path.join(test_dir, "credentials.json")
+    good = {"app": "GitHub", "id": "good", "base_url": "https://api.github.com", "access_token": "t"}
+    with open(json_path, "w") as f:
+        json.dump({"good": good, "bad": {**good, "id": "bad", "expires": "someday"}}, f)
+
+    assert migrate_json_to_sharded(json_path, os.path.join(test_dir, "other.shards"), shard_count=2) == 1
+    store = ShardedCredentialStore(json_path, read_only=False, shard_count=2)
+    assert set(store.credentials) == {"good"}
+    with open(json_path + ".quarantine") as f:
+        assert [json.loads(line)["key"] for line in f] == ["bad", "bad"]
+
+    # A damaged entry inside a shard only sets that entry aside
+    shard = store.shard_of("good")
+    path = store.shard_path(shard)
+    with open(path) as f:
+        data = json.load(f)
+    data["broken"] = {"app": "Broken"}
+    with open(path, "w") as f:
+        json.dump(data, f)
+    store.load_credentials()
+    assert set(store.credentials) == {"good"}
+    assert [entry.key for entry in store.quarantined] == ["broken"]
+    assert store.update_credential("good", access_token="t2")
+    with open(path) as f:
+        assert set(json.load(f)) == {"good"}
+    with open(str(path) + ".quarantine") as f:
+        assert [json.loads(line)["key"] for line in f] == ["broken"]
+    print("✅ Invalid entries are quarantined per file and the rest stays writable")
+
+
+def test_lost_manifest_is_rebuilt():
+    """Test that a deleted manifest is rebuilt from the shard files"""
+    test_dir = tempfile.mkdtemp()
+    store = ShardedCredentialStore(os.path.join(test_dir, "credentials.json"), read_only=False, shard_count=5)
+    cred_id = store.add_credential("GitHub", "https://api.github.com", "token")
+    os.unlink(store.store_path)
+
+    reopened = ShardedCredentialStore(os.path.join(test_dir, "credentials.json"))
+    assert reopened.shard_count == 5
+    assert reopened.get_credential(cred_id).access_token == "token"
+    assert reopened.shards_for_app("GitHub") == [reopened.shard_of(cred_id)]
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for the memory-mapped binary snapshot backend
+"""
+
+import json
+import os
+import tempfile
+
+import pytest
+
+from credential_manager_mcp.server import CredentialStore, create_store
+from credential_manager_mcp.snapshot import (Snapshot, SnapshotCredentialStore, SnapshotRecord,
+                                             json_to_snapshot, snapshot_to_json)
+
+
+def test_snapshot_reads_tokens_on_demand():
+    """Test that loading and listing leave tokens in the mapping and details read one"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    store = create_store("binary", test_file, read_only=False)
+    print("\n🗜️ Testing Binary Snapshot")
+    print("=" * 40)
+
+    assert store.store_path.suffix == ".snap"
+    ids = [store.add_credential("GitHub", "https://api.github.com", f"token-{i}", f"user-{i}") for i in range(10)]
+    slack_id = store.add_credential("Slack", "https://slack.com/api", "slack-token", expires="2030-01-01T00:00:00")
+
+    reader = SnapshotCredentialStore(test_file)
+    assert all(isinstance(record, SnapshotRecord) for record in reader.credentials.values())
+
+    reads = []
+    original = Snapshot.token
+    Snapshot.token = lambda self, slot: reads.append(slot) or original(self, slot)
+    try:
+        assert len(reader.list_credentials()) == 11
+        assert reader.find_credentials(app="Slack")[0]["id"] == slack_id
+        assert reads == [], "Listing must not read any token"
+
+        assert reader.get_credential(ids[3]).access_token == "token-3"
+        assert len(reads) == 1
+    finally:
+        Snapshot.token = original
+
+    slack = reader.get_credential(slack_id)
+    assert (slack.app, slack.base_url, slack.expires) == ("Slack", "https://slack.com/api", "2030-01-01T00:00:00")
+    print("✅ Tokens are read from the mapping one record at a time")
+
+
+def test_snapshot_writes_and_reloads():
+    """Test updates and deletes round-trip through the snapshot and other instances"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    writer = SnapshotCredentialStore(test_file, read_only=False)
+    reader = SnapshotCredentialStore(test_file)
+    cred_id = writer.add_credential("GitHub", "https://api.github.com", "token-1")
+    other_id = writer.add_credential("Slack", "https://slack.com/api", "slack-token")
+
+    # Records still mapped from the old file survive the rewrite
+    assert reader.get_credential(cred_id).access_token == "token-1"
+    writer.update_credential(cred_id, access_token="token-2")
+    writer.delete_credential(other_id)
+
+    assert reader.get_credential(cred_id).access_token == "token-2"
+    assert reader.get_credential(other_id) is None
+    assert [c["id"] for c in reader.list_credentials()] == [cred_id]
+
+
+def test_snapshot_json_round_trip_is_lossless():
+    """Test JSON -> snapshot -> JSON, and importing a sibling credentials.json"""
+    test_dir = tempfile.mkdtemp()
+    json_path = os.path.join(test_dir, "credentials.json")
+    source = CredentialStore(json_path, read_only=False)
+    source.add_credential("GitHub", "https://api.github.com", "tøken ✓", "alice", "2030-01-01T00:00:00")
+    source.add_credential("Slack", "https://slack.com/api", "slack-token")
+    with open(json_path) as f:
+        original = json.load(f)
+
+    snapshot_path = os.path.join(test_dir, "elsewhere.snap")
+    assert json_to_snapshot(json_path, snapshot_path) == 2
+    exported = os.path.join(test_dir, "exported.json")
+    assert snapshot_to_json(snapshot_path, exported) == 2
+    with open(exported) as f:
+        assert json.load(f) == original
+
+    auto = SnapshotCredentialStore(json_path)
+    assert {cred_id: c.to_dict() for cred_id, c in auto.credentials.items()} == original
+
+
+def test_damaged_json_import():
+    """Test that a bad entry in an imported credentials.json is quarantined and a cut-short file is retried"""
+    test_dir = tempfile.mkdtemp()
+    json_path = os.path.join(test_dir, "credentials.json")
+    good = {"app": "GitHub", "id": "good", "base_url": "https://api.github.com", "access_token": "t"}
+    with open(json_path, "w") as f:
+        json.dump({"good": good, "bad": {**good, "id": "bad", "expires": "someday"}}, f)
+
+    store = SnapshotCredentialStore(json_path)
+    assert set(store.credentials) == {"good"}
+    with open(json_path + ".quarantine") as f:
+        assert [json.loads(line)["key"] for line in f] == ["bad"]
+
+    cut_path = os.path.join(test_dir, "cut", "credentials.json")
+    os.mkdir(os.path.dirname(cut_path))
+    text = json.dumps({"a": {**good, "id": "a"}, "b": {**good, "id": "b"}})
+    with open(cut_path, "w") as f:
+        f.write(text[:-20])
+    assert SnapshotCredentialStore(cut_path).credentials == {}
+    with pytest.raises(ValueError):
+        json_to_snapshot(cut_path)
+    with open(cut_path, "w") as f:
+        f.write(text)
+    assert set(SnapshotCredentialStore(cut_path).credentials) == {"a", "b"}
+    assert json_to_snapshot(cut_path) == 2
+
+
+def test_corrupt_snapshot_is_not_overwritten():
+    """Test that an unreadable snapshot loads as an error instead of being replaced"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    store = SnapshotCredentialStore(test_file, read_only=False)
+    with open(store.store_path, "wb") as f:
+        f.write(b"not a snapshot at all, but long enough for a header.")
+    store.invalidate_cache()
+    assert store.list_credentials() == []
+    with pytest.raises(RuntimeError):
+        store.add_credential("GitHub", "https://api.github.com", "token")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite storage backend
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+
+from credential_manager_mcp.server import CredentialStore, create_store
+from credential_manager_mcp.sqlite_store import SQLiteCredentialStore, migrate_json_to_sqlite
+
+
+def test_sqlite_store_round_trip():
+    """Test per-row writes, WAL mode and incremental catch-up between instances"""
+    test_dir = tempfile.mkdtemp()
+    db_file = os.path.join(test_dir, "credentials.db")
+    print("\n🗄️ Testing SQLite Backend")
+    print("=" * 40)
+
+    writer = create_store("sqlite", db_file, read_only=False)
+    reader = SQLiteCredentialStore(db_file)
+    assert isinstance(writer, SQLiteCredentialStore)
+
+    with sqlite3.connect(db_file) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"idx_credentials_app", "idx_credentials_user_name", "idx_credentials_expires"} <= indexes
+    print("✅ Database in WAL mode with app/user_name/expires indexes")
+
+    cred_id = writer.add_credential("GitHub", "https://api.github.com", "token-1", "alice")
+    other_id = writer.add_credential("Slack", "https://slack.com/api", "token-2")
+    assert reader.get_credential(cred_id).access_token == "token-1"
+    misses = reader.cache_misses
+
+    writer.update_credential(cred_id, access_token="token-3")
+    writer.delete_credential(other_id)
+    assert reader.get_credential(cred_id).access_token == "token-3"
+    assert reader.get_credential(other_id) is None
+    assert reader.cache_misses == misses, "Reader should catch up incrementally"
+    assert [c["id"] for c in reader.find_credentials(user_name="alice")] == [cred_id]
+    print("✅ Other instances pick up only the changed rows")
+
+    with sqlite3.connect(db_file) as conn:
+        rows = conn.execute("SELECT id, rev FROM credentials").fetchall()
+    assert rows == [(cred_id, 3)], "Each write should touch only its own row"
+
+
+def test_sqlite_migrates_json_once():
+    """Test the one-shot import of an existing credentials.json"""
+    test_dir = tempfile.mkdtemp()
+    json_file = os.path.join(test_dir, "credentials.json")
+
+    json_store = CredentialStore(json_file, read_only=False)
+    ids = [json_store.add_credential(f"App {i}", "https://example.com", f"t{i}") for i in range(5)]
+
+    # Opening the sqlite backend next to credentials.json imports it once
+    store = create_store("sqlite", json_file, read_only=True)
+    assert set(store.credentials) == set(ids)
+    assert store.get_credential(ids[0]).access_token == "t0"
+    print("✅ credentials.json imported on first open")
+
+    writer = SQLiteCredentialStore(json_file, read_only=False)
+    writer.delete_credential(ids[0])
+    assert ids[0] not in SQLiteCredentialStore(json_file).credentials, "Import must not run twice"
+
+    # Explicit migration into a separate database
+    count = migrate_json_to_sqlite(json_file, os.path.join(test_dir, "other.db"))
+    assert count == 5
+    with open(json_file) as f:
+        assert len(json.load(f)) == 5, "Migration leaves the JSON file untouched"
+
+    # A malformed entry is quarantined, not fatal, and the rest is imported
+    bad_dir = tempfile.mkdtemp()
+    bad_file = os.path.join(bad_dir, "credentials.json")
+    with open(bad_file, "w") as f:
+        json.dump({"good": {"app": "GitHub", "id": "good", "base_url": "https://api.github.com",
+                            "access_token": "t"},
+                   "bad": {"app": "Slack", "id": "bad", "base_url": "https://slack.com"}}, f)
+    store = create_store("sqlite", bad_file, read_only=True)
+    assert set(store.credentials) == {"good"}
+    with open(bad_file + ".quarantine") as f:
+        assert [json.loads(line)["key"] for line in f] == ["bad"]
+    print("✅ Invalid entries quarantined during the import")
+
+    # A cut-short file imports nothing, and is imported in full once repaired
+    cut_dir = tempfile.mkdtemp()
+    cut_file = os.path.join(cut_dir, "credentials.json")
+    text = json.dumps({f"id-{i}": {"app": "App", "id": f"id-{i}", "base_url": "https://example.com",
+                                   "access_token": "t"} for i in range(3)})
+    with open(cut_file, "w") as f:
+        f.write(text[:-30])
+    store = SQLiteCredentialStore(cut_file, read_only=True)
+    assert store.credentials == {} and store._meta("json_imported") == 0
+    with open(cut_file, "w") as f:
+        f.write(text)
+    assert set(SQLiteCredentialStore(cut_file).credentials) == {"id-0", "id-1", "id-2"}
+    print("✅ A truncated file is imported only once it is complete")
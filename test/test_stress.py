@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Multi-process contention stress test (select with `pytest -m stress`)
+
+A small run of benchmarks/stress_store.py against every backend; run the
+script itself for larger ones.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from credential_manager_mcp.server import STORAGE_BACKENDS
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from stress_store import run_stress  # noqa: E402
+
+
+@pytest.mark.stress
+@pytest.mark.parametrize("backend", list(STORAGE_BACKENDS))
+def test_no_lost_or_torn_writes(backend):
+    """Test that concurrent writers in separate processes never lose or tear each other's writes"""
+    report = run_stress(processes=4, ops=40, backend=backend, work_dir=tempfile.mkdtemp())
+    print(f"\n🔥 Stress test ({backend}): {report['ops_per_second']:.0f} ops/s, "
+          f"lock wait p99 {report['lock_wait_ms']['p99']:.2f} ms")
+    assert report["crashed_workers"] == 0
+    assert report["operations"] == 4 * 40
+    assert report["errors"] == 0
+    assert report["anomalies"] == {name: 0 for name in report["anomalies"]}, report["examples"]
+    print("✅ Every acknowledged write survived")
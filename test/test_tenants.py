@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Tests for named stores served from one process
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+import pytest
+from fastmcp import Client
+
+import credential_manager_mcp.server as credential_manager
+from credential_manager_mcp.server import CredentialStore
+from credential_manager_mcp.tenants import StoreRegistry
+
+
+def test_stores_load_lazily_and_evict_least_recently_used():
+    """Test that stores load on first use and the least recently used one is unloaded"""
+    registry = StoreRegistry(tempfile.mkdtemp(), read_only=False, max_open=2)
+    print("\n🏢 Testing Named Stores")
+    print("=" * 40)
+
+    assert registry.loaded() == []
+    team_a = registry.get("team-a", create=True)
+    cred_id = team_a.store.add_credential("GitHub", "https://api.github.com", "token-a")
+    registry.get("team-b", create=True)
+    assert registry.get("team-a") is team_a
+    registry.get("team-c", create=True)
+
+    # team-b was used least recently
+    assert registry.loaded() == ["team-a", "team-c"]
+    assert registry.names() == ["team-a", "team-b", "team-c"]
+    assert (registry.loads, registry.evictions) == (3, 1)
+
+    assert registry.evict("team-a")
+    reloaded = registry.get("team-a")
+    assert reloaded is not team_a
+    assert reloaded.store.get_credential(cred_id).access_token == "token-a"
+    print("✅ Stores are loaded on demand and unloaded least recently used first")
+
+
+def test_idle_stores_are_unloaded():
+    """Test that a store unused for longer than idle_timeout is dropped on the next access"""
+    registry = StoreRegistry(tempfile.mkdtemp(), read_only=False, idle_timeout=0)
+    registry.get("team-a", create=True)
+    registry.get("team-b", create=True)
+    assert registry.loaded() == ["team-b"]
+    assert registry.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_evicted_store_stays_open_while_in_use():
+    """Test that a store evicted in the middle of a call is only unloaded once the call is done"""
+    registry = StoreRegistry(tempfile.mkdtemp(), read_only=False, max_open=1)
+    async with registry.using("team-a", create=True) as team_a:
+        await team_a.add_credential("GitHub", "https://api.github.com", "token-a")
+        async with registry.using("team-b", create=True):
+            assert registry.loaded() == ["team-b"] and registry.evictions == 1
+        # Still usable after its eviction
+        assert len(await team_a.list_credentials()) == 1
+        await team_a.add_credential("Slack", "https://slack.com/api", "token-a2")
+
+    # Unloaded with the last user gone, and nothing written through it was lost
+    with pytest.raises(RuntimeError):
+        await team_a.list_credentials()
+    async with registry.using("team-a") as reloaded:
+        assert reloaded is not team_a
+        assert len(await reloaded.list_credentials()) == 2
+
+
+@pytest.mark.asyncio
+async def test_stores_are_closed_off_the_event_loop():
+    """Test that async unloads run on a worker thread and a store loaded twice at once is closed"""
+    created, closed = [], []
+
+    class RecordingRegistry(StoreRegistry):
+        def _create(self, path):
+            store = super()._create(path)
+            created.append(store)
+            return store
+
+        def _unload(self, evicted, duplicate=None):
+            closed.append((threading.current_thread(), [a.store for a in evicted], duplicate))
+            super()._unload(evicted, duplicate)
+
+    registry = RecordingRegistry(tempfile.mkdtemp(), read_only=False, max_open=1, backend="sqlite")
+    first, second = await asyncio.gather(registry.open("team-a", create=True),
+                                         registry.open("team-a", create=True))
+    assert first is second and registry.loads == 1
+    # Both calls loaded the store; the one that lost the race was closed unused
+    assert len(created) == 2
+    thread, _, duplicate = closed[-1]
+    assert thread is not threading.current_thread()
+    assert duplicate in created and duplicate is not first.store
+    with pytest.raises(sqlite3.ProgrammingError):
+        duplicate.load_credentials()
+
+    async with registry.using("team-b", create=True):
+        pass
+    thread, evicted, _ = closed[-1]
+    assert thread is not threading.current_thread() and evicted == [first.store]
+    with pytest.raises(sqlite3.ProgrammingError):
+        first.store.load_credentials()
+
+
+def test_store_names_are_checked():
+    """Test that unknown stores aren't created by reads and names can't escape the stores dir"""
+    stores_dir = tempfile.mkdtemp()
+    elsewhere = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    registry = StoreRegistry(stores_dir, read_only=True, paths={"work": elsewhere})
+
+    with pytest.raises(ValueError, match="Unknown store"):
+        registry.get("missing", create=True)
+    for name in ("../escape", "default", ".hidden", ""):
+        with pytest.raises(ValueError, match="Invalid store name"):
+            registry.get(name)
+    assert os.listdir(stores_dir) == []
+
+    assert str(registry.get("work").store_path) == elsewhere
+    assert registry.names() == ["work"]
+
+
+@pytest.mark.asyncio
+async def test_tools_take_a_store_name():
+    """Test the store argument on tools and the named store resources"""
+    test_dir = tempfile.mkdtemp()
+    credential_manager.set_store(CredentialStore(os.path.join(test_dir, "credentials.json"), read_only=False))
+    credential_manager.set_store_registry(StoreRegistry(os.path.join(test_dir, "stores"), read_only=False))
+    try:
+        async with Client(credential_manager.mcp) as client:
+            async def call(tool, **arguments):
+                return json.loads((await client.call_tool(tool, arguments))[0].text)
+
+            added = await call("add_credential", app="GitHub", base_url="https://api.github.com",
+                               access_token="team-token", store="team-a")
+            assert added["success"]
+            await call("add_credential", app="Slack", base_url="https://slack.com/api", access_token="default-token")
+
+            assert [c["app"] for c in (await call("list_credentials"))["credentials"]] == ["Slack"]
+            assert [c["app"] for c in (await call("list_credentials", store="team-a"))["credentials"]] == ["GitHub"]
+            details = await call("get_credential_details", credential_id=added["credential_id"], store="team-a")
+            assert details["access_token"] == "team-token"
+            assert "not found" in (await call("get_credential_details", credential_id=added["credential_id"]))["error"]
+
+            assert (await call("list_credentials", store="nobody"))["error"] == "Unknown store 'nobody'"
+            assert not (await call("delete_credential", credential_id="x", store="nobody"))["success"]
+
+            info = json.loads((await client.read_resource("credential://stores/team-a/info"))[0].text)
+            assert (info["store"], info["total_credentials"]) == ("team-a", 1)
+            stores = json.loads((await client.read_resource("credential://stores"))[0].text)
+            assert stores["stores"][0]["name"] == "team-a" and stores["stores"][0]["loaded"]
+    finally:
+        credential_manager.set_store(None)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming bulk import and export
+"""
+
+import io
+import json
+import os
+import stat
+import tempfile
+
+import pytest
+from fastmcp import Client
+
+import credential_manager_mcp.server as credential_manager
+from credential_manager_mcp.server import CredentialStore
+from credential_manager_mcp.transfer import export_stream, import_stream, main
+
+
+def test_import_dedupes_and_saves_once_per_chunk():
+    """Test chunked import: one save per chunk, duplicates skipped or updated, bad lines reported"""
+    test_dir = tempfile.mkdtemp()
+    store = CredentialStore(os.path.join(test_dir, "credentials.json"), read_only=False)
+    existing = store.add_credential("GitHub", "https://api.github.com", "old-token", "alice")
+    print("\n📥 Testing Bulk Import")
+    print("=" * 40)
+
+    lines = [json.dumps({"app": f"App {i}", "base_url": "https://example.com", "access_token": f"token-{i}"})
+             for i in range(25)]
+    # Same identity as the stored credential, up to case and a trailing slash
+    lines.append(json.dumps({"app": "github", "base_url": "https://API.github.com/", "access_token": "new-token",
+                             "user_name": "Alice"}))
+    # Same identity as an earlier record in the same chunk
+    lines.append(json.dumps({"app": "App 24", "base_url": "https://example.com", "access_token": "again"}))
+    lines += ["not json", json.dumps({"app": "Bad", "base_url": "https://example.com", "access_token": "t",
+                                      "expires": "someday"}), ""]
+
+    fsyncs = store.fsyncs
+    report = import_stream(store, lines, "jsonl", chunk_size=10)
+    assert report.counts == {"read": 29, "added": 25, "updated": 0, "skipped": 2, "failed": 2}
+    assert report.chunks == 3 and store.fsyncs - fsyncs == 3
+    assert [error["line"] for error in report.errors] == [28, 29]
+    assert store.get_credential(existing).access_token == "old-token"
+    print("✅ 25 added in 3 saves; duplicates skipped, bad lines reported by line number")
+
+    report = import_stream(store, lines[25:26], "jsonl", on_duplicate="update")
+    assert report.counts["updated"] == 1
+    assert store.get_credential(existing).access_token == "new-token"
+    assert len(store.list_credentials()) == 26
+    print("✅ on_duplicate=update overwrites the matching credential")
+
+
+def test_export_import_round_trip(monkeypatch, capsys):
+    """Test that an export, in JSONL or CSV, imports into an empty store unchanged"""
+    test_dir = tempfile.mkdtemp()
+    # The default store of the command line below
+    monkeypatch.setenv("HOME", test_dir)
+    source = CredentialStore(os.path.join(test_dir, ".credential-manager-mcp", "credentials.json"), read_only=False)
+    source.add_credentials([
+        {"app": f"App {i}", "base_url": "https://example.com", "access_token": f"token,\"{i}\"",
+         "user_name": f"user-{i}" if i % 2 else None, "expires": "2030-01-01T00:00:00" if i % 3 else None}
+        for i in range(12)
+    ])
+    expected = sorted((c.model_dump() for c in source.get_credentials([i["id"] for i in source.list_credentials()])),
+                      key=lambda record: record["id"])
+    print("\n📤 Testing Export and Import Round Trip")
+    print("=" * 40)
+
+    for fmt in ("jsonl", "csv"):
+        out = io.StringIO()
+        assert export_stream(source, out, fmt, chunk_size=5) == 12
+        target = CredentialStore(os.path.join(test_dir, f"{fmt}.json"), read_only=False)
+        report = import_stream(target, io.StringIO(out.getvalue()), fmt)
+        assert report.counts["added"] == 12
+        records = target.get_credentials(sorted(item["id"] for item in target.list_credentials()))
+        assert [record.model_dump() for record in records] == expected
+        print(f"✅ {fmt} round trip keeps every field and ID")
+
+    # The command line writes export files readable by their owner only
+    path = os.path.join(test_dir, "backup.csv")
+    assert main(["export", path]) == 0
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    with open(path) as f:
+        assert f.readline().strip() == "id,app,base_url,access_token,user_name,expires"
+    assert "Exported 12 credentials" in capsys.readouterr().err
+    print("✅ export file is created with mode 0600")
+
+
+@pytest.mark.asyncio
+async def test_import_export_tools():
+    """Test the import_credentials and export_credentials MCP tools"""
+    test_dir = tempfile.mkdtemp()
+    credential_manager.set_store(CredentialStore(os.path.join(test_dir, "credentials.json"), read_only=False))
+    print("\n🧰 Testing Import and Export Tools")
+    print("=" * 40)
+
+    data = "app,base_url,access_token,user_name\n" + "".join(
+        f"App {i},https://example.com,token-{i},\n" for i in range(5)) + "App 0,https://example.com,dupe,\n"
+    try:
+        async with Client(credential_manager.mcp) as client:
+            result = json.loads((await client.call_tool("import_credentials", {"data": data, "format": "csv"}))[0].text)
+            assert result["success"] and (result["added"], result["skipped"]) == (5, 1)
+
+            result = json.loads((await client.call_tool("export_credentials", {"limit": 3}))[0].text)
+            assert result["count"] == 3 and result["next_cursor"]
+            page = json.loads((await client.call_tool("export_credentials", {
+                "limit": 3, "cursor": result["next_cursor"]}))[0].text)
+            assert page["count"] == 2 and page["next_cursor"] is None
+            tokens = [json.loads(line)["access_token"]
+                      for line in (result["data"] + page["data"]).splitlines()]
+            assert sorted(tokens) == [f"token-{i}" for i in range(5)]
+
+            result = json.loads((await client.call_tool("import_credentials", {"data": "{}\n"}))[0].text)
+            assert not result["success"] and result["errors"][0]["line"] == 1
+        print("✅ Tools import CSV text and page through a JSONL export")
+    finally:
+        credential_manager.set_store(None)
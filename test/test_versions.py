@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for store versions and conditional reads
+"""
+
+import json
+import os
+import tempfile
+
+import pytest
+from fastmcp import Client
+
+import credential_manager_mcp.server as credential_manager
+from credential_manager_mcp.server import CredentialStore
+
+
+def test_versions_track_changes():
+    """Test that writes bump the version and changes_since reports exactly what changed"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    store = CredentialStore(test_file, read_only=False)
+    print("\n🏷️ Testing Store Versions")
+    print("=" * 40)
+
+    github = store.add_credential("GitHub", "https://api.github.com", "token", "alice")
+    slack = store.add_credential("Slack", "https://slack.com/api", "token")
+    start = store.version
+    assert store.changes_since(start) == ([], [])
+
+    store.update_credential(slack, access_token="rotated")
+    store.delete_credential(slack)
+    # A second GitHub credential makes the first one's listing show its user name
+    second = store.add_credential("GitHub", "https://api.github.com", "token", "bob")
+    assert store.version > start
+
+    changed, deleted = store.changes_since(start)
+    assert deleted == [slack]
+    assert {item["id"]: item.get("user_name") for item in changed} == {github: "alice", second: "bob"}
+
+    # Versions from before this store existed, or not handed out yet, can't be answered
+    assert store.changes_since(0) is None
+    assert store.changes_since(store.version + 1) is None
+    print("✅ Versions move on every write and deltas name each change")
+
+
+def test_changes_by_other_instances_are_diffed():
+    """Test that a reload after another instance's write reports only what it changed"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    writer = CredentialStore(test_file, read_only=False)
+    ids = [writer.add_credential("App", f"https://{i}.example.com", f"token-{i}", f"user{i}") for i in range(5)]
+    reader = CredentialStore(test_file)
+    start = reader.version
+
+    writer.update_credential(ids[2], access_token="rotated")
+    writer.delete_credential(ids[4])
+    reader.load_credentials(force=True)
+
+    changed, deleted = reader.changes_since(start)
+    assert [item["id"] for item in changed] == [ids[2]]
+    assert deleted == [ids[4]]
+
+    # Reloading an unchanged file leaves the version alone
+    version = reader.version
+    reader.load_credentials(force=True)
+    assert reader.version == version
+
+
+@pytest.mark.asyncio
+async def test_conditional_reads_through_tools():
+    """Test if_none_match and since_version on list_credentials and get_credential_details"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    credential_manager.set_store(CredentialStore(test_file, read_only=False))
+    try:
+        async with Client(credential_manager.mcp) as client:
+            async def call(tool, **arguments):
+                return json.loads((await client.call_tool(tool, arguments))[0].text)
+
+            cred_id = (await call("add_credential", app="GitHub", base_url="https://api.github.com",
+                                  access_token="token"))["credential_id"]
+            listing = await call("list_credentials")
+            version = listing["version"]
+            assert (await call("list_credentials", if_none_match=version))["not_modified"] is True
+
+            details = await call("get_credential_details", credential_id=cred_id)
+            assert details["version"] == version
+            assert (await call("get_credential_details", credential_id=cred_id,
+                               if_none_match=version))["not_modified"] is True
+
+            other_id = (await call("add_credential", app="Slack", base_url="https://slack.com/api",
+                                   access_token="token"))["credential_id"]
+            assert "credentials" in await call("list_credentials", if_none_match=version)
+            delta = await call("list_credentials", since_version=version)
+            assert [item["id"] for item in delta["changed"]] == [other_id]
+            assert delta["deleted"] == [] and delta["version"] > version
+            # The first credential didn't change, so its details are still current
+            assert (await call("get_credential_details", credential_id=cred_id,
+                               if_none_match=version))["not_modified"] is True
+
+            # Too old to answer from the change log: a full list
+            full = await call("list_credentials", since_version=1)
+            assert full["count"] == 2 and "credentials" in full
+
+            info = json.loads((await client.read_resource("credential://store/info"))[0].text)
+            assert info["version"] == delta["version"]
+    finally:
+        credential_manager.set_store(None)
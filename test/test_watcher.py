@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for the filesystem watcher and resource-updated notifications
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import mcp.types
+import pytest
+from fastmcp import Client
+
+import credential_manager_mcp.server as credential_manager
+from credential_manager_mcp.journal import JournalCredentialStore
+from credential_manager_mcp.server import CredentialStore
+from credential_manager_mcp.watcher import StoreWatcher
+
+
+def wait_for(condition, timeout: float = 5.0):
+    """Poll condition until it holds or the timeout passes"""
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def replace_like_editor(path: str, data: dict):
+    """Rewrite a file the way many editors do: delete it, then create a new one"""
+    os.unlink(path)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+@pytest.mark.parametrize("mode", ["inotify", "poll"])
+def test_watcher_sees_external_changes(mode):
+    """Test atomic renames, in-place writes and delete-and-recreate from another writer"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    print(f"\n👀 Testing Store Watcher ({mode})")
+    print("=" * 40)
+
+    reader = CredentialStore(test_file)
+    writer = CredentialStore(test_file, read_only=False)
+    watcher = StoreWatcher(reader, mode=mode, poll_interval=0.02)
+    watcher.start()
+    try:
+        # Atomic write-and-rename
+        cred_id = writer.add_credential("GitHub", "https://api.github.com", "token-1")
+        assert wait_for(lambda: watcher.changes >= 1)
+        assert reader.get_credential(cred_id).access_token == "token-1"
+
+        # An editor replacing the file
+        changes = watcher.changes
+        data = {cred_id: {**writer.credentials[cred_id].to_dict(), "access_token": "token-2"}}
+        replace_like_editor(test_file, data)
+        assert wait_for(lambda: watcher.changes > changes)
+        assert reader.get_credential(cred_id).access_token == "token-2"
+        print("✅ Renames and replaced files are picked up")
+    finally:
+        watcher.stop()
+    assert not reader._watch_fresh, "A stopped watcher must not vouch for the cache"
+
+
+def test_inotify_lets_reads_skip_revalidation():
+    """Test that a trusted watcher lets reads skip the stat until the next change event"""
+    test_dir = tempfile.mkdtemp()
+    test_file = os.path.join(test_dir, "credentials.json")
+    store = JournalCredentialStore(test_file, read_only=False)
+    cred_id = store.add_credential("GitHub", "https://api.github.com", "token-1")
+    watcher = StoreWatcher(store, mode="inotify")
+    watcher.start()
+    try:
+        # Past the racy-mtime window the file fingerprint can be trusted
+        time.sleep(0.1)
+        store.load_credentials(force=True)
+        assert store._watch_fresh
+
+        fingerprints = []
+        original = store._file_fingerprint
+        store._file_fingerprint = lambda *args: fingerprints.append(args) or original(*args)
+        assert store.get_credential(cred_id).access_token == "token-1"
+        assert fingerprints == [], "Reads should not stat while the watcher vouches for the cache"
+
+        other = JournalCredentialStore(test_file, read_only=False)
+        other.update_credential(cred_id, access_token="token-2")
+        assert wait_for(lambda: not store._watch_fresh)
+        assert store.get_credential(cred_id).access_token == "token-2"
+        print("✅ Journal appends invalidate a trusted cache")
+    finally:
+        watcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_store_info_update_notifications():
+    """Test resources/updated notifications for subscribed clients"""
+    test_file = os.path.join(tempfile.mkdtemp(), "credentials.json")
+    credential_manager.set_store(CredentialStore(test_file))
+    updates = []
+
+    async def message_handler(message):
+        if isinstance(message, mcp.types.ServerNotification) and \
+                isinstance(message.root, mcp.types.ResourceUpdatedNotification):
+            updates.append(str(message.root.params.uri))
+
+    try:
+        credential_manager.start_watcher("auto", poll_interval=0.02)
+        async with Client(credential_manager.mcp, message_handler=message_handler) as client:
+            await client.session.subscribe_resource("credential://store/info")
+            CredentialStore(test_file, read_only=False).add_credential("Slack", "https://slack.com/api", "t")
+
+            deadline = time.time() + 5
+            while not updates and time.time() < deadline:
+                await asyncio.sleep(0.01)
+            assert updates and updates[0] == "credential://store/info"
+
+            info = json.loads((await client.read_resource("credential://store/info"))[0].text)
+            assert info["total_credentials"] == 1
+            assert info["watcher"]["changes"] >= 1
+        print("✅ Subscribed clients get resources/updated for credential://store/info")
+    finally:
+        credential_manager.set_store(None)